@@ -0,0 +1,293 @@
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tracemalloc
+
+from time import perf_counter
+from src.bf import BFEngine, BFInterpreter, ProgramState
+from src.bf_input import ListInputProvider
+from src.bf_output import CollectorOutputSink
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+BENCHMARK_DIR = os.path.split(os.path.abspath(__file__))[0]
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "results.json")
+
+# Timings keep the median of this many runs
+REPEAT = 5
+
+
+class BenchmarkProgram():
+
+    def __init__(self, name: str, source: str, memory_size: int, max_value: int, values: list = [],
+                 input_values: list = None):
+        self.name = name
+        self.source = source
+        self.memory_size = memory_size
+        self.max_value = max_value
+        self.values = values
+        self.input_values = input_values
+
+    def createInterpreter(self, engine: BFEngine) -> BFInterpreter:
+        interpreter = BFInterpreter(self.memory_size, self.max_value)
+        interpreter.engine = engine
+        interpreter.output = CollectorOutputSink(self.max_value)
+        interpreter.setMemory(self.values, 0)
+        interpreter.setTape(self.source)
+        if self.input_values is not None:
+            interpreter.input = ListInputProvider(self.input_values)
+        return interpreter
+
+
+# Programs sized so every cell stays inside max_value and each one runs for a few hundred thousand steps
+CORPUS = [
+    # Five levels of nested multiplication loops
+    BenchmarkProgram("nested_loops", "++++++++[>++++++++[>++++++++[>++++++++[>++++++++[>+<-]<-]<-]<-]<-]", 8, 65535),
+
+    # Long straight line runs of +- and <> with no loops
+    BenchmarkProgram("linear_runs", ("+" * 40 + ">" * 7 + "+" * 20 + "<" * 7 + "-" * 30) * 2000, 8, 1 << 20),
+
+    # Scans right across a block of non-zero cells and back to a zero sentinel, one cell at a time
+    BenchmarkProgram("pointer_scan", ">" + "+" * 250 + "[>[>]<[<]>-]", 256, 255, [0, 0] + [1] * 200),
+
+    # Copies a cell into two others and moves one copy back, loops the closed form idioms can apply
+    BenchmarkProgram("copy_loops", "+" * 50 + "[>" + "+" * 200 + "[>+>+<<-]>>[<<+>>-]<[-]<[-]<-]", 4, 255),
+
+    # Reads and echoes every input value
+    BenchmarkProgram("input_echo", ",[.,]", 2, 255, [], [(i % 255) + 1 for i in range(0, 100000)] + [0]),
+]
+
+# Each program runs on every execution path. Stepped drives step() the way the visualizer does
+PATHS = ["stepped", "fused", "generated"]
+
+
+# Peak memory is traced over loading and this many steps, since tracemalloc slows every allocation by orders of
+# magnitude. Interpreter memory is allocated up front, so the peak is reached early
+PEAK_MEMORY_STEPS = 20000
+
+
+def runPath(interpreter: BFInterpreter, path: str, max_steps: int = None):
+    if path == "stepped":
+        while interpreter.canStep() and (max_steps is None or interpreter.step_count < max_steps):
+            interpreter.step()
+    else:
+        interpreter.run(max_steps)
+
+    if max_steps is None and interpreter.state != ProgramState.Halted:
+        raise BenchmarkError(f"Benchmark stopped in state {interpreter.state._name_}: {interpreter.stateDetail}")
+
+
+def engineForPath(path: str) -> BFEngine:
+    return BFEngine.Generated if path == "generated" else BFEngine.Fused
+
+
+def sample(program: BenchmarkProgram, path: str) -> tuple:
+
+    # One timed run as (load, startup, run seconds, steps). Collection pauses land on whichever allocation triggers
+    # them and skew timings of large tapes, so the collector is off while timing, as in timeit
+    engine = engineForPath(path)
+    gc.collect()
+    gc.disable()
+    try:
+        # Load is setTape alone. Startup covers creating the interpreter up to the end of its first step, which
+        # includes compiling the tape for the run() engines
+        interpreter = BFInterpreter(program.memory_size, program.max_value)
+        start = perf_counter()
+        interpreter.setTape(program.source)
+        load_seconds = perf_counter() - start
+
+        start = perf_counter()
+        interpreter = program.createInterpreter(engine)
+        if path == "stepped":
+            interpreter.step()
+        else:
+            interpreter.run(max_steps=1)
+        startup_seconds = perf_counter() - start
+
+        interpreter = program.createInterpreter(engine)
+        start = perf_counter()
+        runPath(interpreter, path)
+        run_seconds = perf_counter() - start
+    finally:
+        gc.enable()
+    return load_seconds, startup_seconds, run_seconds, interpreter.step_count
+
+
+def peakBytes(program: BenchmarkProgram, path: str) -> int:
+    gc.collect()
+    tracemalloc.start()
+    interpreter = program.createInterpreter(engineForPath(path))
+    runPath(interpreter, path, PEAK_MEMORY_STEPS)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak_bytes
+
+
+def summarize(samples: list, peak_bytes: int) -> dict:
+    load_seconds, startup_seconds, run_seconds, steps = zip(*samples)
+    return {
+        "steps": steps[-1],
+        "load_seconds": statistics.median(load_seconds),
+        "startup_seconds": statistics.median(startup_seconds),
+        "run_seconds": statistics.median(run_seconds),
+        "steps_per_second": steps[-1] / statistics.median(run_seconds),
+        "peak_bytes": peak_bytes
+    }
+
+
+def measure(program: BenchmarkProgram, path: str, repeat: int = REPEAT) -> dict:
+    return summarize([sample(program, path) for _ in range(0, repeat)], peakBytes(program, path))
+
+
+def runBenchmarks(names: list = None, paths: list = PATHS, repeat: int = REPEAT) -> dict:
+
+    # Every benchmark runs once per round rather than repeat times in a row, so a few slow seconds on a busy machine
+    # land on one sample of several benchmarks, which the median drops, instead of on every sample of one
+    selected = [(f"{program.name}/{path}", program, path) for program in CORPUS for path in paths
+                if names is None or program.name in names]
+    samples = {key: [] for key, _, _ in selected}
+    for _ in range(0, repeat):
+        for key, program, path in selected:
+            logging.info(f"Running benchmark {key}")
+            samples[key].append(sample(program, path))
+    return {key: summarize(samples[key], peakBytes(program, path)) for key, program, path in selected}
+
+
+# Metrics compared against the baseline, where larger is always worse, with the fractional increase allowed and an
+# absolute noise floor. A metric only regresses when it grows by more than both, so jitter in sub-millisecond
+# timings and small allocations is never reported. Speed is compared as run time, since every path of a program runs
+# the same number of steps. Median timings of identical code vary by up to 45% between processes on a busy machine,
+# so timings allow 60%
+METRIC_THRESHOLDS = {
+    "run_seconds": (0.6, 0.01),
+    "load_seconds": (0.6, 0.005),
+    "startup_seconds": (0.6, 0.005),
+    "peak_bytes": (0.25, 64 * 1024)
+}
+
+
+def compareResults(results: dict, baseline: dict, threshold: float = None) -> list:
+
+    # Returns a description of every metric that is worse than the baseline by more than its threshold. threshold
+    # replaces the fractional threshold of every metric when given. Benchmarks missing from either side are skipped
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric, (fraction, floor) in METRIC_THRESHOLDS.items():
+            fraction = threshold if threshold is not None else fraction
+            expected = baseline[key][metric]
+            found = result[metric]
+            if found - expected > max(expected * fraction, floor):
+                change = (found - expected) / expected if expected > 0 else float("inf")
+                regressions.append(f"{key} {metric}: {found:.6g} against baseline {expected:.6g} ({change:+.1%})")
+    return regressions
+
+
+def fastest(first: dict, second: dict) -> dict:
+
+    # Best of two measurements of one benchmark, metric by metric
+    result = {metric: min(first[metric], second[metric]) for metric in METRIC_THRESHOLDS}
+    result["steps"] = first["steps"]
+    result["steps_per_second"] = first["steps"] / result["run_seconds"]
+    return result
+
+
+def resultsDocument(results: dict) -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "results": results}
+
+
+def resultsTable(results: dict) -> str:
+    lines = [f"{'Benchmark':<24}{'Steps':>10}{'Steps/s':>14}{'Load ms':>10}{'Startup ms':>12}{'Peak KiB':>10}"]
+    for key, result in results.items():
+        lines.append(f"{key:<24}{result['steps']:>10}{result['steps_per_second']:>14.0f}"
+                     f"{result['load_seconds'] * 1000:>10.3f}{result['startup_seconds'] * 1000:>12.3f}"
+                     f"{result['peak_bytes'] / 1024:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: list) -> int:
+
+    # python -m benchmarks.bench [--output FILE] [--baseline FILE] [--threshold F] [--repeat N] [--only NAME]
+    #                            [--update-baseline]
+    output = RESULTS_PATH
+    baseline_path = BASELINE_PATH
+    threshold = None
+    repeat = REPEAT
+    names = None
+    update_baseline = False
+
+    i = 0
+    while i < len(argv):
+        option = argv[i]
+        if option == "--update-baseline":
+            update_baseline = True
+            i += 1
+            continue
+        if option not in ["--output", "--baseline", "--threshold", "--repeat", "--only"] or i + 1 >= len(argv):
+            print(f"Unexpected cli parameter '{option}' found", file=sys.stderr)
+            return 2
+
+        value = argv[i + 1]
+        try:
+            if option == "--output":
+                output = value
+            elif option == "--baseline":
+                baseline_path = value
+            elif option == "--threshold":
+                threshold = float(value)
+            elif option == "--repeat":
+                repeat = max(1, int(value))
+            elif option == "--only":
+                names = (names or []) + [value]
+        except ValueError:
+            print(f"Value for '{option}' must be a number, found '{value}'", file=sys.stderr)
+            return 2
+        i += 2
+
+    results = runBenchmarks(names, PATHS, repeat)
+    print(resultsTable(results))
+
+    with open(output, "w") as f:
+        f.write(json.dumps(resultsDocument(results), indent=4))
+
+    if update_baseline:
+        with open(baseline_path, "w") as f:
+            f.write(json.dumps(resultsDocument(results), indent=4))
+        print(f"Baseline written to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline found at {baseline_path}")
+        return 0
+
+    with open(baseline_path, "r") as f:
+        baseline = json.loads(f.read())["results"]
+
+    # Benchmarks that regressed are measured again, and only regressions both measurements show are reported
+    regressed = {regression.split(" ")[0] for regression in compareResults(results, baseline, threshold)}
+    for key in sorted(regressed):
+        name, path = key.split("/")
+        program = next(program for program in CORPUS if program.name == name)
+        logging.info(f"Measuring {key} again")
+        results[key] = fastest(results[key], measure(program, path, repeat))
+
+    regressions = compareResults(results, baseline, threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    thresholds = f"a threshold of {threshold:.0%}" if threshold is not None else "per metric thresholds"
+    print(f"{len(regressions)} regressions against {baseline_path} at {thresholds}")
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main(sys.argv[1:]))
@@ -1,36 +1,58 @@
-
-import pygame as pg
 import os
 import sys
 import logging
 import time
 import json
-from src.bf import BFInterpreter, BFRuntimeError, ProgramState
-from src.hud_render import HudRenderer
-from src.interpreter_render import BFRenderer
-from src.io_prompt import IOPrompt
-import src.rendering_contants as rc
+from src.bf import BFInterpreter, ProgramState
+from src.bf_analysis import BFPointerAnalysis, analyzePointer
 from src.gamestate import Gamestate
+from src.bf_checkpoint import loadCheckpoint, runWithCheckpoints
+from src.bf_driver import BFDriver, DriverCommand
+from src.bf_input import FileInputProvider, ListInputProvider, StdinInputProvider
+from src.bf_output import CollectorOutputSink, RingOutputSink
+from src.bf_trace import BFTracer, initQueuedLogging
+from src.environment import EnvironmentInitError, loadEnvironment, loadSource # noqa
 
 
 class CliInitError(Exception):
     pass
 
 
-class EnvironmentInitError(Exception):
-    pass
+# pygame and the renderers are only imported once the visualizer starts, so headless runs never load them
+pg = None
+
 
+def importPyGame():
+    global pg, HudRenderer, BFRenderer, MinimapRenderer, BFMemoryOverview, IOPrompt, IOPromptError, rc
+    import pygame as pg
+    from src.bf_overview import BFMemoryOverview
+    from src.hud_render import HudRenderer
+    from src.interpreter_render import BFRenderer
+    from src.minimap_render import MinimapRenderer
+    from src.io_prompt import IOPrompt, IOPromptError
+    import src.rendering_contants as rc
+
+    # see if we can load more than standard BMP
+    if not pg.image.get_extended():
+        raise SystemExit("Sorry, extended image module required")
 
-# see if we can load more than standard BMP
-if not pg.image.get_extended():
-    raise SystemExit("Sorry, extended image module required")
 
 # Constants
-# Rendering Display
-SCREENRECT = pg.Rect(0, 0, 640, 480)
+# Rendering Display. Set by initWindow()
+SCREENRECT = None
 
 # UI Control Values
 UI_INIT_TOPLEFT = (20, 20)
+UI_TARGET_FPS = 60
+
+# Screen layout. Set by initWindow() along with SCREENRECT
+HUD_RECT = None
+INTERPRETER_RECT = None
+PROMPT_RECT = None
+MINIMAP_RECT = None
+
+# Changed rects sent to the display one by one. More than this are merged into one rect
+DIRTY_RECT_LIMIT = 16
 
 # Interpreter Control Values
 INT_SRC = ""
@@ -38,6 +60,38 @@ INT_CELL_COUNT = 8
 INT_CELL_MAX_VALUE = 16
 INT_CELL_DEFAULT_VALUE = 0
 INT_INITIAL_VALUES = []
+INT_CELL_GROWABLE = False
+INT_INPUT_VALUES = []
+
+# Input Control Values. A file of values read by ',', or "-" for stdin
+INPUT_FILE = None
+
+# Steps that can be undone with BACKSPACE. Only recorded at rates up to DRIVER_JOURNAL_MAX_HERTZ
+INT_JOURNAL_CAPACITY = 10000
+
+# Recent printed values shown in the HUD
+INT_OUTPUT_CAPACITY = 12
+
+# Tracing Control Values. Trace every Nth step when verbose
+TRACE_EVERY = 1
+LOG_LISTENER = None
+
+# Headless Control Values. Run to completion and print the result as JSON instead of opening the visualizer
+HEADLESS = False
+HEADLESS_MAX_STEPS = None
+CHECKPOINT_PATH = None
+CHECKPOINT_STEPS = None
+CHECKPOINT_SECONDS = None
+CHECKPOINT_RESUME = False
+
+# Profiling Control Values. Adds a hot spot report to the headless result, or logs it when the visualizer closes
+PROFILE = False
+
+# Loop Detection Control Values. Stops a headless run once the program provably repeats a state
+DETECT_LOOPS = False
+
+# Analysis Control Values. Prints the pointer range analysis as JSON instead of running the program
+ANALYZE = False
 
 main_dir = os.path.split(os.path.abspath(__file__))[0]
 
@@ -63,10 +117,14 @@ def initPyGame():
         pg.mixer = None
 
 
-def initWindow(width=800, height=600) -> pg.Surface:
-    global SCREENRECT
+def initWindow(width=800, height=600) -> "pg.Surface":
+    global SCREENRECT, HUD_RECT, INTERPRETER_RECT, PROMPT_RECT, MINIMAP_RECT
 
     SCREENRECT = pg.Rect(0, 0, width, height)
+    HUD_RECT = pg.Rect(50, 50, 0, 0)
+    INTERPRETER_RECT = pg.Rect(50, 200, 0, 0)
+    PROMPT_RECT = pg.Rect(100, 200, 400, 50)
+    MINIMAP_RECT = pg.Rect(10, 14, width - 20, 30)
     winstyle = 0  # |FULLSCREEN
     bestdepth = pg.display.mode_ok(SCREENRECT.size, winstyle, 32)
     return pg.display.set_mode(SCREENRECT.size, winstyle, bestdepth)
@@ -74,67 +132,47 @@ def initWindow(width=800, height=600) -> pg.Surface:
 
 def initLogging(verbose: bool):
     if verbose:
-        logging.basicConfig(level=logging.DEBUG)
+        return initQueuedLogging(logging.DEBUG)
     else:
         logging.basicConfig(level=logging.INFO)
+        return None
 
 
 def openSrcFile(path: str):
     global INT_SRC
-    logging.info(f"Loading source file from: {path}")
-
-    with open(path, 'r') as f:
-        INT_SRC = f.read()
 
-
-def raiseEnvFileException(message: str):
-    logging.error(message)
-    raise EnvironmentInitError(message)
+    INT_SRC = loadSource(path)
 
 
 def openEnvFile(path: str):
-    global INT_CELL_COUNT, INT_CELL_MAX_VALUE, INT_CELL_DEFAULT_VALUE, INT_INITIAL_VALUES
-
-    logging.info(f"Loading environment file from: {path}")
-
-    with open(path, 'r') as f:
-        content_json = json.loads(f.read())
+    global INT_CELL_COUNT, INT_CELL_MAX_VALUE, INT_CELL_DEFAULT_VALUE, INT_INITIAL_VALUES, INT_CELL_GROWABLE
+    global INT_INPUT_VALUES
 
-        # Setting cell maximum allowed value
-        cell_max = content_json["memory"]["cell_max_value"]
-        if type(cell_max) is not int or cell_max < 1:
-            raiseEnvFileException("Value 'cell_max_value' must be an integer greater than 0")
-        INT_CELL_MAX_VALUE = cell_max
+    environment = loadEnvironment(path)
+    INT_CELL_COUNT = environment.cell_count
+    INT_CELL_MAX_VALUE = environment.max_value
+    INT_CELL_DEFAULT_VALUE = environment.default_value
+    INT_INITIAL_VALUES = environment.initial_values
+    INT_CELL_GROWABLE = environment.growable
+    INT_INPUT_VALUES = environment.input_values if environment.input_values is not None else []
 
-        # Setting cell count
-        cell_count = content_json["memory"]["cell_count"]
-        if type(cell_count) is not int or cell_count < 1:
-            raiseEnvFileException("Value 'cell_count' must be an integer greater than 0")
-        INT_CELL_COUNT = cell_count
 
-        # Setting cell default values
-        cell_default = content_json["memory"]["cell_default_value"]
-        if type(cell_default) is not int or cell_default < 0 or cell_default > INT_CELL_MAX_VALUE:
-            raiseEnvFileException(f"Value 'cell_default_value' must be an integer in the range -> {INT_CELL_MAX_VALUE}")
-        INT_CELL_DEFAULT_VALUE = cell_default
-
-        # Setting cell initial values
-        initial_values = content_json["memory"]["cell_initial_values"]
-
-        # Do basic type and length validation with the settings already loaded
-        if type(initial_values) is not list:
-            raiseEnvFileException(f"List 'cell_initial_values' must be a list of integers in the range 0 -> {INT_CELL_MAX_VALUE}") # noqa
-
-        if len(initial_values) > INT_CELL_COUNT:
-            raiseEnvFileException("List 'cell_initial_values' cannot have more entries that the number of cells")
-
-        for v in initial_values:
-            if type(v) is not int or v < 0 or v > INT_CELL_MAX_VALUE:
-                raiseEnvFileException("Values in list 'cell_initial_values' must be integers in the range 0 -> {INT_CELL_MAX_VALUE}") # noqa
-        INT_INITIAL_VALUES = initial_values
+def parsePositiveNumber(option: str, value: str, number_type: type = int):
+    try:
+        number = number_type(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        message = f"Value for '{option}' must be a number greater than 0, found '{value}'"
+        logging.error(message)
+        raise CliInitError(message)
+    return number
 
 
 def processCLI():
+    global TRACE_EVERY, LOG_LISTENER, HEADLESS, HEADLESS_MAX_STEPS
+    global CHECKPOINT_PATH, CHECKPOINT_STEPS, CHECKPOINT_SECONDS, CHECKPOINT_RESUME, INPUT_FILE, PROFILE, ANALYZE
+    global DETECT_LOOPS
 
     verbose = False
 
@@ -142,7 +180,7 @@ def processCLI():
         if sys.argv[i] in ["-v", "--verbose"]:
             verbose = True
 
-    initLogging(verbose)
+    LOG_LISTENER = initLogging(verbose)
 
     # Load Command Line Arguments
     last_cmd = ""
@@ -153,8 +191,25 @@ def processCLI():
             if sys.argv[i] in ["-v", "--verbose"]:
                 continue
 
+            elif sys.argv[i] == "--headless":
+                HEADLESS = True
+
+            elif sys.argv[i] == "--resume":
+                CHECKPOINT_RESUME = True
+
+            elif sys.argv[i] == "--profile":
+                PROFILE = True
+
+            elif sys.argv[i] == "--analyze":
+                ANALYZE = True
+
+            elif sys.argv[i] == "--detect-loops":
+                DETECT_LOOPS = True
+
             # Explicitely allow only - parameters that are supported
-            elif sys.argv[i] in ["-s", "--src-file", "-e", "--env-file"]:
+            elif sys.argv[i] in ["-s", "--src-file", "-e", "--env-file", "-i", "--input-file", "-t", "--trace-every",
+                                 "--max-steps",
+                                 "--checkpoint", "--checkpoint-steps", "--checkpoint-seconds"]:
                 last_cmd = sys.argv[i]
 
             else:
@@ -170,44 +225,197 @@ def processCLI():
         elif last_cmd in ["-e", "--env-file"]:
             openEnvFile(sys.argv[i])
             last_cmd = ""
+
+        elif last_cmd in ["-i", "--input-file"]:
+            INPUT_FILE = sys.argv[i]
+            last_cmd = ""
+
+        elif last_cmd in ["-t", "--trace-every"]:
+            if not sys.argv[i].isdigit() or int(sys.argv[i]) < 1:
+                message = f"Trace interval must be an integer greater than 0, found '{sys.argv[i]}'"
+                logging.error(message)
+                raise CliInitError(message)
+            TRACE_EVERY = int(sys.argv[i])
+            last_cmd = ""
+
+        elif last_cmd == "--max-steps":
+            HEADLESS_MAX_STEPS = parsePositiveNumber(last_cmd, sys.argv[i])
+            last_cmd = ""
+
+        elif last_cmd == "--checkpoint":
+            CHECKPOINT_PATH = sys.argv[i]
+            last_cmd = ""
+
+        elif last_cmd == "--checkpoint-steps":
+            CHECKPOINT_STEPS = parsePositiveNumber(last_cmd, sys.argv[i])
+            last_cmd = ""
+
+        elif last_cmd == "--checkpoint-seconds":
+            CHECKPOINT_SECONDS = parsePositiveNumber(last_cmd, sys.argv[i], float)
+            last_cmd = ""
         else:
             message = f"Unexpected cli parameter '{last_cmd}' found"
             logging.error(message)
             raise CliInitError(message)
 
+    if last_cmd != "":
+        message = f"Missing value for cli parameter '{last_cmd}'"
+        logging.error(message)
+        raise CliInitError(message)
+
+    if (CHECKPOINT_RESUME or CHECKPOINT_STEPS or CHECKPOINT_SECONDS) and CHECKPOINT_PATH is None:
+        message = "Checkpoint options require '--checkpoint'"
+        logging.error(message)
+        raise CliInitError(message)
+
+    if (HEADLESS_MAX_STEPS or CHECKPOINT_PATH) and not HEADLESS:
+        message = "Step limits and checkpoints are only supported with '--headless'"
+        logging.error(message)
+        raise CliInitError(message)
+
+
+def checkPointerRange(analysis: BFPointerAnalysis):
+
+    # Warns before the run when the environment has too few cells for where the program can move the pointer
+    for loop in analysis.unbalancedLoops():
+        logging.info(f"Loop at commands {loop.start}-{loop.end} moves the pointer by {loop.net if loop.net is not None else 'a varying amount'} each iteration") # noqa
+
+    if analysis.low < 0:
+        logging.warning("Program can move the pointer left of cell 0")
+
+    cell_count = analysis.minimumCellCount()
+    if cell_count is None:
+        logging.info("Program can move the pointer right without bound, so 'cell_count' cannot be checked before the run") # noqa
+    elif cell_count > INT_CELL_COUNT and not INT_CELL_GROWABLE:
+        logging.warning(f"Program can move the pointer to cell {cell_count - 1}, but the environment has {INT_CELL_COUNT} cells. Set 'cell_count' to at least {cell_count}") # noqa
+
+
+def runAnalysis() -> int:
+    bf_interpreter = BFInterpreter(INT_CELL_COUNT, INT_CELL_MAX_VALUE, grow_memory=INT_CELL_GROWABLE)
+    bf_interpreter.setTape(INT_SRC)
+    analysis = analyzePointer(bf_interpreter.tape)
+    checkPointerRange(analysis)
+    print(analysis.reportJson())
+    return 0
+
+
+def createInterpreter() -> BFInterpreter:
+    bf_interpreter = BFInterpreter(INT_CELL_COUNT, INT_CELL_MAX_VALUE, grow_memory=INT_CELL_GROWABLE)
+    bf_interpreter.setMemory(INT_INITIAL_VALUES, INT_CELL_DEFAULT_VALUE)
+    bf_interpreter.setTape(INT_SRC)
+    checkPointerRange(analyzePointer(bf_interpreter.tape))
+
+    # Values from the input file or environment are read by ',' before the program waits for input
+    if INPUT_FILE == "-":
+        bf_interpreter.input = StdinInputProvider()
+    elif INPUT_FILE is not None:
+        bf_interpreter.input = FileInputProvider(INPUT_FILE)
+    else:
+        bf_interpreter.input = ListInputProvider(INT_INPUT_VALUES)
+
+    if LOG_LISTENER is not None:
+        bf_interpreter.tracer = BFTracer(every=TRACE_EVERY)
+    return bf_interpreter
+
+
+def runHeadless() -> int:
+    bf_interpreter = createInterpreter()
+
+    # Printed cells are reported in the result instead of written to the console
+    output = bf_interpreter.output = CollectorOutputSink(bf_interpreter.max_value)
+
+    if CHECKPOINT_RESUME and os.path.exists(CHECKPOINT_PATH):
+        loadCheckpoint(bf_interpreter, CHECKPOINT_PATH)
+
+    if PROFILE:
+        bf_interpreter.enableProfiler()
+
+    if DETECT_LOOPS:
+        bf_interpreter.enableLoopDetector()
+
+    # A resumed program may already have stopped
+    if bf_interpreter.canStep():
+        if CHECKPOINT_PATH is not None:
+            runWithCheckpoints(bf_interpreter, CHECKPOINT_PATH, CHECKPOINT_STEPS, CHECKPOINT_SECONDS,
+                               HEADLESS_MAX_STEPS)
+        else:
+            bf_interpreter.run(HEADLESS_MAX_STEPS)
+
+    result = {
+        "state": bf_interpreter.state._name_,
+        "detail": bf_interpreter.stateDetail,
+        "step_count": bf_interpreter.step_count,
+        "pointer": bf_interpreter.ptr,
+        "memory": list(bf_interpreter.memoryView()),
+        "output": list(output.values)
+    }
+    if PROFILE:
+        result["profile"] = bf_interpreter.profiler.report()
+    print(json.dumps(result))
+    return 0 if bf_interpreter.state == ProgramState.Halted else 1
+
+
+def closeVisualizer(bf_interpreter: BFInterpreter):
+    if PROFILE:
+        logging.info(f"Execution profile:\r\n{bf_interpreter.profiler.reportText()}")
+
 
 def main(winstyle=0):
 
     processCLI()
 
+    if ANALYZE:
+        return runAnalysis()
+
+    if HEADLESS:
+        return runHeadless()
+
     # Init the engine and display window
+    importPyGame()
     initPyGame()
     screen = initWindow(800, 600)
 
     # Init a BF program
-    bf_interpreter = BFInterpreter(INT_CELL_COUNT, INT_CELL_MAX_VALUE)
-    bf_interpreter.setMemory(INT_INITIAL_VALUES, INT_CELL_DEFAULT_VALUE)
-    bf_interpreter.setTape(INT_SRC)
+    bf_interpreter = createInterpreter()
+    if PROFILE:
+        bf_interpreter.enableProfiler()
+
+    # The detector makes run() step command by command, so Unlimited only uses the fused engine without it
+    if DETECT_LOOPS:
+        bf_interpreter.enableLoopDetector()
+
+    # Printed cells are shown on screen instead of written to the console
+    bf_interpreter.output = RingOutputSink(INT_OUTPUT_CAPACITY)
+    gs = Gamestate(step_hertz=1)
+
+    # The program runs on its own thread, so a slow frame never slows it down. From here on the interpreter is only
+    # changed through driver commands, and everything rendered comes from the snapshot the driver last published.
+    # The driver also keeps the minimap's overview of the memory up to date
+    driver = BFDriver(bf_interpreter, gs.step_hertz, UI_TARGET_FPS, INT_JOURNAL_CAPACITY,
+                      BFMemoryOverview(MINIMAP_RECT.width))
+    driver.start()
+    snapshot = driver.snapshot()
 
     # Init Graphics Handlers
-    bf_renderer = BFRenderer(interpreter=bf_interpreter,
+    bf_renderer = BFRenderer(interpreter=snapshot,
                              cell_width=50,
                              cell_buffer=25,
                              camera_speed=100,
                              cell_max_height=300)
-
-    hud_renderer = HudRenderer(interpreter=bf_interpreter)
-    gs = Gamestate(step_hertz=1)
+    hud_renderer = HudRenderer(interpreter=snapshot, output=snapshot.output)
+    minimap_renderer = MinimapRenderer(interpreter=snapshot, width=MINIMAP_RECT.width)
 
     clock = pg.time.Clock()
 
-    # Set up the step execution values
-    step_delay = 1.0/gs.step_hertz
-    step_next_time = time.time() + step_delay
-    step_run = False
-
     # Set up input handling
     readbyte_prompt_running = False
+    readbyte_prompt_shown = False
+
+    # The whole window is drawn on the first frame and whenever the window system asks for it
+    redraw_screen = True
+
+    # Cells in view the driver was last told about
+    sent_view = None
 
     # Set up contextual UI elements
     readbyte_prompt = IOPrompt("Cell Value:")
@@ -216,7 +424,7 @@ def main(winstyle=0):
     
     while True:
         # Hold Framerate to 60 fps
-        clock.tick(60)
+        clock.tick(UI_TARGET_FPS)
         sys_time= time.time()
         
         # Store the seconds elapsed since the last tick
@@ -226,71 +434,123 @@ def main(winstyle=0):
         # Handle Input
         for event in pg.event.get():
             if event.type == pg.QUIT:
-                return
+                driver.stop()
+                return closeVisualizer(bf_interpreter)
             if event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
-                return
+                driver.stop()
+                return closeVisualizer(bf_interpreter)
+            if event.type in [pg.VIDEOEXPOSE, pg.WINDOWEXPOSED]:
+                redraw_screen = True
+
+            # Clicking the minimap sends the camera to the clicked cell
+            if event.type == pg.MOUSEBUTTONUP and event.button == 1 and MINIMAP_RECT.collidepoint(event.pos):
+                bf_renderer.lookAt(minimap_renderer.cellAt(MINIMAP_RECT, event.pos[0]), screen.get_width())
             if readbyte_prompt_running:
                 if event.type == pg.KEYUP:
 
-                    if (event.unicode in "0123456789"):
+                    if (event.unicode in "0123456789,"):
                         readbyte_prompt.appendResponse(event.unicode)
                     elif event.key == pg.K_BACKSPACE:
                         readbyte_prompt.backspaceResponse()
                     elif event.key == pg.K_RETURN and len(readbyte_prompt.response) > 0:
+                        try:
+                            values = readbyte_prompt.responseValues()
+                        except IOPromptError as prompt_error:
+                            logging.warning(prompt_error)
+                            readbyte_prompt.setResponse("")
+                            continue
+
+                        # The first value answers this prompt, the rest are queued for the following ','
                         readbyte_prompt_running = False
-                        bf_interpreter.readByte(int(readbyte_prompt.response))
-                        step_next_time = time.time() + step_delay
+                        driver.send(DriverCommand.ReadBytes, values)
 
             else:
                 # Pressing SPACE will toggle the program run mode
                 if event.type == pg.KEYUP and event.key == pg.K_SPACE:
-                    step_run = not step_run
-                    step_next_time = time.time() + step_delay
+                    driver.send(DriverCommand.Toggle)
+
+                # Pressing BACKSPACE will pause the program and undo the last step
+                if event.type == pg.KEYUP and event.key == pg.K_BACKSPACE:
+                    driver.send(DriverCommand.StepBack)
 
-                    if bf_interpreter.halted():
-                        logging.debug("Disabling auto-run on halted program")
-                        step_run = False
+                # Pressing H will toggle the profiler heatmap on the tape and memory cells
+                if event.type == pg.KEYUP and event.key == pg.K_h:
+                    bf_renderer.heatmap = not bf_renderer.heatmap
+                    driver.send(DriverCommand.SetHeatmap, bf_renderer.heatmap)
 
-                    logging.debug(f"Setting program auto exec to {step_run}")
+                # Pressing F will send the camera back to following the pointer
+                if event.type == pg.KEYUP and event.key == pg.K_f:
+                    bf_renderer.followPointer()
 
                 # Pressing TAB will increase the execution rate by powers of 2
                 if event.type == pg.KEYUP and event.key == pg.K_TAB:
                     gs.multiplyStepHertz(factor=2, loop=True)
+                    driver.send(DriverCommand.SetHertz, gs.step_hertz)
 
-                    step_delay = 1.0/gs.step_hertz
-                    step_next_time = time.time() + step_delay
-
-        # Execute Instructions
-        if step_run and bf_interpreter.canStep() and time.time() >= step_next_time:
-            try:
-                bf_interpreter.step()
-                step_next_time = step_next_time + step_delay
-
-            except BFRuntimeError as runtime_error:
-                logging.warning(f"Program execution failed due to runtime error:\r\n\t{runtime_error}")
+        snapshot = driver.snapshot()
 
         # UI Elements
 
-        if bf_interpreter.state == ProgramState.WaitingForInput and not readbyte_prompt_running:
+        # The prompt waits for the driver to apply every command, so an answer it has not read yet is not asked again
+        if snapshot.state == ProgramState.WaitingForInput and driver.settled(snapshot) and not readbyte_prompt_running:
             readbyte_prompt.setResponse("")
             readbyte_prompt_running = True
 
         # Render Screen
-        screen.fill(rc.CLR_BLACK)
+        # Renderers report what changed since the last frame, and only those rects are redrawn and sent to the
+        # display. Each one is cleared and every layer is redrawn inside it in order, so overlapping layers stay whole
+        hud_renderer.interpreter = snapshot
+        hud_renderer.output = snapshot.output
+        dirty = hud_renderer.update(HUD_RECT, snapshot.hertz, snapshot.achieved_hertz, snapshot.journaling)
 
-        # Render UI Elements
-        hud_renderer.renderHud(screen, pg.Rect(50, 50, 0, 0), gs.step_hertz)
+        bf_renderer.interpreter = snapshot
+        dirty += bf_renderer.update(screen, INTERPRETER_RECT, tick_time)
 
-        if readbyte_prompt_running:
-            readbyte_prompt.renderPrompt(screen, pg.Rect(100, 200, 400, 50))
+        # Snapshots only copy the cells in view, so the driver is told whenever the camera shows other cells
+        view = bf_renderer.visibleCells(screen.get_width(), INTERPRETER_RECT.left, len(snapshot.memoryView()))
+        if view != sent_view:
+            driver.send(DriverCommand.SetView, view)
+            sent_view = view
+
+        minimap_renderer.interpreter = snapshot
+        dirty += minimap_renderer.update(MINIMAP_RECT)
 
-        bf_renderer.render(screen, pg.Rect(50, 200, 0, 0), tick_time)
+        if readbyte_prompt_running:
+            dirty += readbyte_prompt.update(PROMPT_RECT)
+        elif readbyte_prompt_shown:
+            dirty.append(readbyte_prompt.area(PROMPT_RECT))
+        readbyte_prompt_shown = readbyte_prompt_running
+
+        if redraw_screen:
+            dirty = [screen.get_rect()]
+            redraw_screen = False
+
+        if len(dirty) == 0:
+            continue
+        if len(dirty) > DIRTY_RECT_LIMIT:
+            dirty = [dirty[0].unionall(dirty[1:])]
+
+        for rect in dirty:
+            screen.set_clip(rect)
+            screen.fill(rc.CLR_BLACK)
+
+            # Render UI Elements
+            hud_renderer.draw(screen)
+            minimap_renderer.draw(screen, MINIMAP_RECT)
+            if readbyte_prompt_running:
+                readbyte_prompt.draw(screen, PROMPT_RECT)
+            bf_renderer.draw(screen, INTERPRETER_RECT)
+        screen.set_clip(None)
 
-        # Flip the display      
-        pg.display.flip()
+        # Update the changed parts of the display
+        pg.display.update(dirty)
 
 
 # call the "main" function if running this script
 if __name__ == "__main__":
-    main()
-    pg.quit()
+    exit_code = main()
+    if pg is not None:
+        pg.quit()
+    if LOG_LISTENER is not None:
+        LOG_LISTENER.stop()
+    sys.exit(exit_code)
@@ -1,6 +1,19 @@
 import logging
+import sys
 
 from enum import Enum
+from time import perf_counter
+from src.bf_commands import BFCommand, BFCommandToString, StringToBFCommand # noqa
+from src.bf_codegen import CodegenSignal, generateFunction
+from src.bf_journal import BFJournal
+from src.bf_loopcache import LOOP_CACHE_CAPACITY, BFLoopCache
+from src.bf_loops import LOOP_DETECTOR_CAPACITY, BFLoopDetector
+from src.bf_memory import PAGED_MEMORY_THRESHOLD, PagedMemory, createMemory, fillMemory, memoryTypecode, memoryView
+from src.bf_output import BFOutputSink, StreamOutputSink
+from src.bf_input import BFInputError, BFInputProvider
+from src.bf_ir import DEADLINE_CHECK_INTERVAL, OP_PC, BFProgram, BFOpCode, applyLinearLoop, compileTape
+from src.bf_profile import BFProfiler
+from src.bf_trace import BFTracer
 
 
 class BFInitError(Exception):
@@ -8,56 +21,12 @@ class BFInitError(Exception):
 
 
 class BFRuntimeError(Exception):
-    pass
 
+    def __init__(self, message: str, flight_record: list = None):
+        super().__init__(message)
 
-class BFCommand(Enum):
-    Increment = 1
-    Decrement = 2
-    CellPtrLeft = 3
-    CellPtrRight = 4
-    StartWhile = 5
-    EndWhile = 6
-    ReadByte = 7
-    PrintByte = 8
-
-
-def StringToBFCommand(cmd):
-    if cmd == "<":
-        return BFCommand.CellPtrLeft
-    elif cmd == ">":
-        return BFCommand.CellPtrRight
-    elif cmd == "+":
-        return BFCommand.Increment
-    elif cmd == "-":
-        return BFCommand.Decrement
-    elif cmd == "[":
-        return BFCommand.StartWhile
-    elif cmd == "]":
-        return BFCommand.EndWhile
-    elif cmd == ".":
-        return BFCommand.PrintByte
-    elif cmd == ",":
-        return BFCommand.ReadByte
-
-
-def BFCommandToString(cmd):
-    if cmd == BFCommand.CellPtrLeft:
-        return "<"
-    elif cmd == BFCommand.CellPtrRight:
-        return ">"
-    elif cmd == BFCommand.Increment:
-        return "+"
-    elif cmd == BFCommand.Decrement:
-        return "-"
-    elif cmd == BFCommand.StartWhile:
-        return "["
-    elif cmd == BFCommand.EndWhile:
-        return "]"
-    elif cmd == BFCommand.PrintByte:
-        return "."
-    elif cmd == BFCommand.ReadByte:
-        return ","
+        # The journal entries of the steps leading up to the error, oldest first. None when journaling is off
+        self.flight_record = flight_record
 
 
 class ProgramState(Enum):
@@ -66,11 +35,46 @@ class ProgramState(Enum):
     WaitingForInput = 2
     Halted = 3
     Error = 4
+    InfiniteLoop = 5
+
+
+class RunStopReason(Enum):
+    Halted = 0
+    WaitingForInput = 1
+    Error = 2
+    StepBudget = 3
+    Deadline = 4
+    InfiniteLoop = 5
+
+
+class RunResult():
+
+    def __init__(self, reason: RunStopReason, steps: int, detail: str = ""):
+        self.reason = reason
+        self.steps = steps
+        self.detail = detail
+
+    def finished(self) -> bool:
+        return self.reason in [RunStopReason.Halted, RunStopReason.Error, RunStopReason.InfiniteLoop]
+
+
+# Cells shown either side of the pointer by memoryString()
+MEMORY_STRING_RADIUS = 32
+
+# Journal entries attached to a runtime error
+FLIGHT_RECORD_LENGTH = 32
+
+PROGRAM_STATES = list(ProgramState)
+
+
+class BFEngine(Enum):
+    Fused = 0
+    Generated = 1
 
 
 class BFInterpreter():
 
-    def __init__(self, memory_size: int, max_value: int = 256):
+    def __init__(self, memory_size: int, max_value: int = 256, paged: bool = None, grow_memory: bool = False):
 
         if memory_size < 1:
             self.raiseInitError("Memory must be at least 1 cell")
@@ -85,10 +89,54 @@ class BFInterpreter():
         self.pc: int = 0
 
         self.tape: list = []
-        self.whileStack: list = []
+
+        # Matching bracket positions, indexed by pc. Non-loop commands hold -1
+        self.jumpTable: list = []
+        self.openLoops: list = []
+
+        # Optional BFTracer called before every step()
+        self.tracer: BFTracer = None
+
+        # Optional per command and per cell counters updated by every step(). See enableProfiler()
+        self.profiler: BFProfiler = None
+
+        # Receives every printed cell. Flushed when the program halts, waits for input or fails, and after every run()
+        self.output: BFOutputSink = StreamOutputSink()
+
+        # Optional source of values for ','. The program only waits for readByte() once it is exhausted
+        self.input: BFInputProvider = None
+
+        # Optional undo journal written by every step() and readByte(). See enableJournal()
+        self.journal: BFJournal = None
+
+        # Optional detector that stops the program once it provably repeats a state. See enableLoopDetector()
+        self.loopDetector: BFLoopDetector = None
+
+        # Optional results of whole loops reused by run(). See enableLoopCache()
+        self.loopCache: BFLoopCache = None
+
+        # Fused form of the tape used by run(). Built on first use
+        self.program: BFProgram = None
+
+        # Python code generated from the fused program, and the suspended run of it
+        self.engine: BFEngine = BFEngine.Fused
+        self.generatedFunction = None
+        self.generatedUnavailable: bool = False
+        self.generatedRun = None
+        self.generatedResume: tuple = None
+        self.generatedOutput: BFOutputSink = None
 
         self.max_value: int = max_value
-        self.memory: list = [0] * memory_size
+
+        # bytearray or array sized for max_value, or PagedMemory for very large and growable memories.
+        # Read through memoryView() outside of the interpreter
+        self.grow_memory: bool = grow_memory
+        if paged is None:
+            paged = grow_memory or memory_size > PAGED_MEMORY_THRESHOLD
+        if paged:
+            self.memory = PagedMemory(memory_size, max_value)
+        else:
+            self.memory = createMemory(memory_size, max_value)
 
         self.step_count: int = 0
 
@@ -98,36 +146,76 @@ class BFInterpreter():
         if len(values) > len(self.memory):
             self.raiseInitError(f"Attempting to initialize {len(values)} in memory size {len(self.memory)}")
 
-        for i in range(0, len(values)):
-            if type(values[i]) is not int or values[i] < 0 or values[i] > self.max_value:
-                self.raiseInitError(f"Attempting to initialize memory to illegal inital value: {values[i]}. Must be integer in range 0-> {self.max_value}") # noqa
+        # Validate in bulk, and only search for the offending value once the bulk check fails
+        if len(values) > 0 and (set(map(type, values)) != {int} or min(values) < 0 or max(values) > self.max_value):
+            for value in values:
+                if type(value) is not int or value < 0 or value > self.max_value:
+                    self.raiseInitError(f"Attempting to initialize memory to illegal inital value: {value}. Must be integer in range 0-> {self.max_value}") # noqa
 
         if default < 0 or default > self.max_value:
             self.raiseInitError(f"Attempting to initialize memory to illegal default value: {default}. Must be integer in range 0-> {self.max_value}") # noqa
 
-        logging.debug(f"Setting memory to initial values: \r\n\t{values}\r\nDefault Value for Remaining Values: {default}") # noqa
+        logging.debug("Setting memory to initial values: \r\n\t%s\r\nDefault Value for Remaining Values: %s", values, default) # noqa
 
         # Assign memory, setting default after initial values are exhausted
-        for i in range(0, len(self.memory)):
-            if i < len(values):
-                self.memory[i] = values[i]
-            else:
-                self.memory[i] = default
+        fillMemory(self.memory, 0, values, default)
+        if self.loopDetector is not None:
+            self.loopDetector.reset()
 
-        logging.debug(f"Memory after initialization:\r\n\t{self.memory}")
+        logging.debug("Memory after initialization:\r\n\t%s", self.memory)
+
+    def memoryView(self):
+        return memoryView(self.memory)
 
     def setTape(self, program: str):
         if len(program) == 0:
             self.raiseInitError("Tape must contain at least one symbol")
         self.tape = []
+        self.jumpTable = []
+        self.openLoops = []
+        self.program = None
+        self.generatedFunction = None
+        self.generatedUnavailable = False
+        self.generatedRun = None
         for cmd in program:
             self.appendTape(cmd)
 
+        if len(self.openLoops) > 0:
+            self.raiseInitError(f"No close found for loop start at command {self.openLoops[-1]}")
+
+        # Counts from the previous tape no longer map to its commands
+        if self.profiler is not None:
+            self.enableProfiler()
+        if self.loopDetector is not None:
+            self.loopDetector.reset()
+        if self.loopCache is not None:
+            self.enableLoopCache(self.loopCache.capacity)
+
     def appendTape(self, cmd: str):
-        self.tape.append(StringToBFCommand(cmd))
+        bf_cmd = StringToBFCommand(cmd)
+        if bf_cmd is None:
+            self.raiseInitError(f"Illegal symbol {cmd!r} at command {len(self.tape)}")
+
+        # Link loop brackets as they are loaded so step() never has to scan the tape
+        pc = len(self.tape)
+        self.jumpTable.append(-1)
+        if bf_cmd == BFCommand.StartWhile:
+            self.openLoops.append(pc)
+        elif bf_cmd == BFCommand.EndWhile:
+            if len(self.openLoops) == 0:
+                self.raiseInitError(f"End of loop with no matching start at command {pc}")
+            start = self.openLoops.pop()
+            self.jumpTable[start] = pc
+            self.jumpTable[pc] = start
+
+        self.tape.append(bf_cmd)
+        self.program = None
+        self.generatedFunction = None
+        self.generatedUnavailable = False
+        self.generatedRun = None
 
     def halted(self) -> bool:
-        return self.state in [ProgramState.Error, ProgramState.Halted]
+        return self.state in [ProgramState.Error, ProgramState.Halted, ProgramState.InfiniteLoop]
 
     def waitingForInput(self) -> bool:
         return self.state in [ProgramState.WaitingForInput]
@@ -138,8 +226,14 @@ class BFInterpreter():
     def raiseRuntimeError(self, message):
         self.state = ProgramState.Error
         self.stateDetail = message
+        self.output.flush()
         logging.warning(f"BF Runtime Error: {message}")
-        raise BFRuntimeError(message)
+
+        flight_record = None
+        if self.journal is not None:
+            flight_record = self.flightRecord()
+            logging.warning(self.flightRecordString(flight_record))
+        raise BFRuntimeError(message, flight_record)
 
     def raiseInitError(self, message):
         self.state = ProgramState.Error
@@ -150,15 +244,31 @@ class BFInterpreter():
     def step(self):
         cmd: BFCommand
 
+        if self.state in [ProgramState.Error, ProgramState.Halted, ProgramState.WaitingForInput,
+                          ProgramState.InfiniteLoop]:
+            self.raiseRuntimeError(f"Attempting to step program in state {self.state._name_}")
+
+        # Checked before anything changes, so the program stops on the first command of the repeated state
+        if self.loopDetector is not None and self.loopDetector.onStep(self):
+            self.state = ProgramState.InfiniteLoop
+            self.stateDetail = f"Infinite loop at command {self.pc}: state repeats every {self.loopDetector.period} steps" # noqa
+            self.output.flush()
+            logging.info(self.stateDetail)
+            return
+
+        # Recorded before anything changes, so stepBack() also undoes the start of execution
+        if self.journal is not None:
+            self.recordJournal()
+
         # Kick off program execution
         if self.state == ProgramState.Ready:
             self.state = ProgramState.Running
 
-        logging.debug(self.tapeString())
-        logging.debug(self.memoryString())
+        if self.tracer is not None:
+            self.tracer.onStep(self)
 
-        if self.state in [ProgramState.Error, ProgramState.Halted, ProgramState.WaitingForInput]:
-            self.raiseRuntimeError(f"Attempting to step program in state {self.state._name_}")
+        if self.profiler is not None:
+            self.profiler.onStep(self)
 
         cmd = self.tape[self.pc]
 
@@ -175,22 +285,25 @@ class BFInterpreter():
 
             elif cmd == BFCommand.CellPtrRight:
                 self.ptr += 1
-                if self.ptr >= len(self.memory):
+                if self.ptr >= len(self.memory) and self.grow_memory:
+                    self.memory.grow(self.ptr + 1)
+                elif self.ptr >= len(self.memory):
                     self.raiseRuntimeError(
                         f"Memory pointer out of bounds at command {self.pc}. Maximum allowed: {len(self.memory)-1}")
 
+            # Cells are checked before they are written, so they always hold a legal value
             elif cmd == BFCommand.Increment:
-                self.memory[self.ptr] += 1
-                if self.memory[self.ptr] > self.max_value:
+                if self.memory[self.ptr] >= self.max_value:
                     self.raiseRuntimeError(f"Cell Overflow at command {self.pc}: Maximum value {self.max_value}")
+                self.memory[self.ptr] += 1
 
             elif cmd == BFCommand.Decrement:
-                self.memory[self.ptr] -= 1
-                if self.memory[self.ptr] < 0:
+                if self.memory[self.ptr] <= 0:
                     self.raiseRuntimeError(f"Cell Underflow at command {self.pc}. Minimum value 0")
+                self.memory[self.ptr] -= 1
 
             elif cmd == BFCommand.PrintByte:
-                print(format(f"Cell[{self.ptr}]: {self.memory[self.ptr]}"))
+                self.printCell(self.ptr, self.memory[self.ptr])
 
             # Read the next command
             self.pc += 1
@@ -198,7 +311,7 @@ class BFInterpreter():
         # These commands affect program execution by shifting the program counter
         elif cmd in [BFCommand.StartWhile, BFCommand.EndWhile]:
             if cmd == BFCommand.StartWhile:
-                loopEnd = self.findLoopEnd()
+                loopEnd = self.jumpTable[self.pc]
                 if loopEnd < 0:
                     self.raiseRuntimeError(f"No close found for loop start at command {self.pc}")
 
@@ -207,28 +320,354 @@ class BFInterpreter():
                     if self.memory[self.ptr] == 0:
                         self.pc = loopEnd + 1
                     else:
-                        self.whileStack.append(self.pc)
                         self.pc += 1
 
             elif cmd == BFCommand.EndWhile:
-                if len(self.whileStack) == 0:
+                loopStart = self.jumpTable[self.pc]
+                if loopStart < 0:
                     self.raiseRuntimeError(f"End of loop with no matching start at command {self.pc}")
 
                 else:
                     # Return to the start of the loop to reassess
-                    self.pc = self.whileStack.pop()
+                    self.pc = loopStart
 
         elif cmd in [BFCommand.ReadByte]:
-            self.state = ProgramState.WaitingForInput
-            logging.info("Waiting for User Input")
+            if self.readInput():
+                self.pc += 1
+            else:
+                self.state = ProgramState.WaitingForInput
+                self.output.flush()
+                logging.info("Waiting for User Input")
 
         # Detect end of program
         if self.pc >= len(self.tape):
             self.state = ProgramState.Halted
             self.stateDetail = "End of Tape"
+            self.output.flush()
 
         self.step_count += 1
 
+    def compiledProgram(self) -> BFProgram:
+
+        # Moves are proven safe against the current memory size, which a loaded checkpoint can change. Memory that
+        # grows needs every Move checked
+        memory_size = None if self.grow_memory else len(self.memory)
+        if self.program is None or self.program.memory_size != memory_size:
+            if len(self.openLoops) > 0:
+                self.raiseRuntimeError(f"No close found for loop start at command {self.openLoops[-1]}")
+            self.program = compileTape(self.tape, memory_size=memory_size)
+            self.generatedFunction = None
+            self.generatedUnavailable = False
+        return self.program
+
+    def run(self, max_steps: int = None, deadline: float = None) -> RunResult:
+        # Kick off program execution
+        if self.state == ProgramState.Ready:
+            self.state = ProgramState.Running
+
+        if self.state in [ProgramState.Error, ProgramState.Halted, ProgramState.WaitingForInput,
+                          ProgramState.InfiniteLoop]:
+            self.raiseRuntimeError(f"Attempting to run program in state {self.state._name_}")
+
+        start_steps = self.step_count
+        step_limit = sys.maxsize if max_steps is None else self.step_count + max_steps
+
+        try:
+            # Journaled, profiled and loop checked runs need to see every step, so they run one command at a time
+            if self.journal is not None or self.profiler is not None or self.loopDetector is not None:
+                reason = self.runStepped(step_limit, deadline)
+            elif self.engine == BFEngine.Generated and self.loopCache is None:
+                reason = self.runGenerated(step_limit, deadline)
+            else:
+                reason = self.runFused(step_limit, deadline)
+        except BFRuntimeError:
+            reason = RunStopReason.Error
+
+        self.output.flush()
+        return RunResult(reason, self.step_count - start_steps, self.stateDetail)
+
+    def runStepped(self, step_limit: int, deadline: float) -> RunStopReason:
+        ticks = DEADLINE_CHECK_INTERVAL
+        while self.step_count < step_limit:
+            self.step()
+            if self.state == ProgramState.Halted:
+                return RunStopReason.Halted
+            if self.state == ProgramState.WaitingForInput:
+                return RunStopReason.WaitingForInput
+            if self.state == ProgramState.InfiniteLoop:
+                return RunStopReason.InfiniteLoop
+
+            ticks -= 1
+            if ticks == 0:
+                ticks = DEADLINE_CHECK_INTERVAL
+                if deadline is not None and perf_counter() >= deadline:
+                    return RunStopReason.Deadline
+        return RunStopReason.StepBudget
+
+    def runFused(self, step_limit: int, deadline: float) -> RunStopReason:
+        program = self.compiledProgram()
+
+        # step() may have stopped part way through a fused run. Finish it one command at a time
+        while program.opIndex[self.pc] < 0:
+            if self.step_count >= step_limit:
+                return RunStopReason.StepBudget
+            self.step()
+            if self.state == ProgramState.Halted:
+                return RunStopReason.Halted
+            if self.state == ProgramState.WaitingForInput:
+                return RunStopReason.WaitingForInput
+
+        ops = program.ops
+        op_count = len(ops)
+        memory = self.memory
+        memory_size = len(memory)
+        max_value = self.max_value
+        ptr = self.ptr
+        steps = self.step_count
+        i = program.opIndex[self.pc]
+        ticks = DEADLINE_CHECK_INTERVAL
+
+        # Cached loops entered during this run, innermost last, as (exit op, cache key, steps before the '[')
+        cache = self.loopCache
+        windows = cache.windows if cache is not None else None
+        recording = []
+
+        ADD = BFOpCode.Add
+        MOVE = BFOpCode.Move
+        SAFE_MOVE = BFOpCode.SafeMove
+        JUMP_IF_ZERO = BFOpCode.JumpIfZero
+        JUMP_IF_NON_ZERO = BFOpCode.JumpIfNonZero
+        PRINT_BYTE = BFOpCode.PrintByte
+        LINEAR_LOOP = BFOpCode.LinearLoop
+        emit = self.output.write
+
+        while i < op_count:
+            code, arg, pc, length, low, high, data = ops[i]
+
+            if code is ADD:
+                value = memory[ptr]
+                if value + high > max_value or value + low < 0 or steps + length > step_limit:
+                    break
+                memory[ptr] = value + arg
+                steps += length
+                i += 1
+
+            elif code is SAFE_MOVE:
+                if steps + length > step_limit:
+                    break
+                ptr += arg
+                steps += length
+                i += 1
+
+            elif code is MOVE:
+                if ptr + high >= memory_size or ptr + low < 0 or steps + length > step_limit:
+                    break
+                ptr += arg
+                steps += length
+                i += 1
+
+            elif code is JUMP_IF_ZERO:
+                if steps >= step_limit:
+                    break
+                if memory[ptr] == 0:
+                    steps += 1
+                    i = arg
+                    continue
+
+                # Loops in the cache only touch a fixed window of cells around the pointer and always return the
+                # pointer, so a loop entered with the same window before ends the same way in the same steps
+                if windows is not None and pc in windows:
+                    window_low, window_high = windows[pc]
+                    if ptr + window_low >= 0 and ptr + window_high < memory_size:
+                        key = (pc, tuple(memory[ptr + window_low:ptr + window_high + 1]))
+                        result = cache.get(key)
+                        if result is not None and steps + result[1] <= step_limit:
+                            for cell, value in enumerate(result[0], ptr + window_low):
+                                memory[cell] = value
+                            steps += result[1]
+                            i = arg
+                            continue
+                        recording.append((arg, key, steps))
+                steps += 1
+                i += 1
+
+            elif code is LINEAR_LOOP:
+                if steps >= step_limit:
+                    break
+                if memory[ptr] == 0:
+                    steps += 1
+                    i = arg
+                    continue
+
+                iterations = 0
+                if ptr + low >= 0 and ptr + high < memory_size:
+                    max_iterations = (step_limit - steps - 1) // (length + 2)
+                    iterations = applyLinearLoop(memory, ptr, max_value, data, max_iterations)
+
+                if iterations > 0:
+                    # Loop start, then every iteration runs the body, the close and the re-evaluated start
+                    steps += 1 + iterations * (length + 2)
+                    i = arg
+                else:
+                    # Run the loop op by op so errors and budgets land where the naive loop would put them
+                    steps += 1
+                    i += 1
+
+            elif code is JUMP_IF_NON_ZERO:
+                # Counts both the close and the re-evaluated loop start
+                if steps + 2 > step_limit:
+                    break
+                steps += 2
+                if memory[ptr] == 0:
+                    i += 1
+
+                    # Leaving a loop entered in this run completes its cache entry
+                    if len(recording) > 0 and recording[-1][0] == i:
+                        _, key, start_steps = recording.pop()
+                        window_low, window_high = windows[key[0]]
+                        cache.store(key, tuple(memory[ptr + window_low:ptr + window_high + 1]), steps - start_steps)
+                else:
+                    i = arg
+
+                    # Only loops can keep a program running, so the clock is checked on their back edges
+                    ticks -= 1
+                    if ticks == 0:
+                        ticks = DEADLINE_CHECK_INTERVAL
+                        if deadline is not None and perf_counter() >= deadline:
+                            self.ptr = ptr
+                            self.pc = ops[i][OP_PC]
+                            self.step_count = steps
+                            return RunStopReason.Deadline
+
+            elif code is PRINT_BYTE:
+                if steps >= step_limit:
+                    break
+                emit(ptr, memory[ptr])
+                steps += 1
+                i += 1
+
+            else:
+                if steps >= step_limit:
+                    break
+                self.ptr = ptr
+                self.pc = pc
+                self.step_count = steps
+                if self.readInput():
+                    steps += 1
+                    i += 1
+                    continue
+                self.step_count = steps + 1
+                self.state = ProgramState.WaitingForInput
+                logging.info("Waiting for User Input")
+                return RunStopReason.WaitingForInput
+
+        self.ptr = ptr
+        self.step_count = steps
+
+        if i >= op_count:
+            self.pc = len(self.tape)
+            self.state = ProgramState.Halted
+            self.stateDetail = "End of Tape"
+            return RunStopReason.Halted
+
+        # The op would leave the legal range or the step budget. Replay its commands so errors are raised and budgets
+        # are reached exactly where step() would raise or stop
+        self.pc = pc
+        for _ in range(length):
+            if self.step_count >= step_limit:
+                return RunStopReason.StepBudget
+            self.step()
+
+        if self.step_count >= step_limit:
+            return RunStopReason.StepBudget
+        return self.runFused(step_limit, deadline)
+
+    def runGenerated(self, step_limit: int, deadline: float) -> RunStopReason:
+        program = self.compiledProgram()
+        if self.generatedFunction is None and not self.generatedUnavailable:
+            self.generatedFunction = generateFunction(program, len(self.tape))
+            self.generatedUnavailable = self.generatedFunction is None
+
+        # A suspended run can only continue from exactly where it stopped. Anything else starts over from the
+        # beginning of the tape, or uses the fused engine when the program is already under way
+        if (self.generatedRun is not None and self.generatedResume == (self.pc, self.ptr, self.step_count) and
+                self.generatedOutput is self.output):
+            signal, pc, ptr, steps, length = self.generatedRun.send((step_limit, deadline))
+        elif self.pc == 0 and not self.generatedUnavailable:
+            self.generatedRun = self.generatedFunction(self.memory, self.ptr, self.step_count, self.max_value,
+                                                       len(self.memory), step_limit, deadline, applyLinearLoop,
+                                                       self.output.write, perf_counter)
+            self.generatedOutput = self.output
+            signal, pc, ptr, steps, length = next(self.generatedRun)
+        else:
+            self.generatedRun = None
+            return self.runFused(step_limit, deadline)
+
+        # The generated run has already counted the read. Errors are raised at the step count before it, as step() does
+        while signal == CodegenSignal.ReadByte:
+            self.pc = pc
+            self.ptr = ptr
+            self.step_count = steps - 1
+            if not self.readInput():
+                break
+            signal, pc, ptr, steps, length = self.generatedRun.send((step_limit, deadline))
+
+        self.pc = pc
+        self.ptr = ptr
+        self.step_count = steps
+
+        if signal == CodegenSignal.ReadByte:
+            self.generatedResume = (pc + 1, ptr, steps)
+            self.state = ProgramState.WaitingForInput
+            logging.info("Waiting for User Input")
+            return RunStopReason.WaitingForInput
+
+        elif signal == CodegenSignal.StepBudget and steps >= step_limit:
+            self.generatedResume = (pc, ptr, steps)
+            return RunStopReason.StepBudget
+
+        elif signal == CodegenSignal.Deadline:
+            self.generatedResume = (pc, ptr, steps)
+            return RunStopReason.Deadline
+
+        self.generatedRun = None
+        if signal == CodegenSignal.Halt:
+            self.state = ProgramState.Halted
+            self.stateDetail = "End of Tape"
+            return RunStopReason.Halted
+
+        # The ops at pc would leave the legal range, or only part of them fits the budget. Replay their commands so
+        # errors are raised and budgets are reached exactly where step() would raise or stop
+        for _ in range(length):
+            if self.step_count >= step_limit:
+                return RunStopReason.StepBudget
+            self.step()
+
+        if self.step_count >= step_limit:
+            return RunStopReason.StepBudget
+        return self.runFused(step_limit, deadline)
+
+    def printCell(self, ptr: int, value: int):
+        self.output.write(ptr, value)
+
+    def readInput(self) -> bool:
+
+        # Satisfies a ',' at the current cell from the input provider. False when there is no provider or it has
+        # run out, and the program has to wait for readByte()
+        if self.input is None:
+            return False
+        try:
+            value = self.input.read()
+        except BFInputError as input_error:
+            self.raiseRuntimeError(f"Input provider failed at command {self.pc}: {input_error}")
+        if value is None:
+            return False
+
+        if type(value) is not int or value < 0 or value > self.max_value:
+            self.raiseRuntimeError(f"Provided byte input ({value}) must be in the range 0 -> {self.max_value}")
+        self.memory[self.ptr] = value
+        return True
+
     def readByte(self, value: int):
         if self.state != ProgramState.WaitingForInput:
             raise self.raiseRuntimeError(f"Attempting to accept user input in state {self.state._name_}")
@@ -236,6 +675,9 @@ class BFInterpreter():
         if value < 0 or value > self.max_value:
             raise self.raiseRuntimeError(f"Provided byte input ({value}) must be in the range 0 -> {self.max_value}")
 
+        if self.journal is not None:
+            self.recordJournal()
+
         self.memory[self.ptr] = value
 
         # Increment the program counter and reset to steppable state
@@ -247,55 +689,102 @@ class BFInterpreter():
             self.state = ProgramState.Halted
             self.stateDetail = "End of Tape"
 
-    def findLoopEnd(self) -> int:
+    def enableJournal(self, capacity: int = 10000):
+        self.journal = BFJournal(capacity, memoryTypecode(self.max_value))
 
-        # Only attempt at an actual while start
-        if (self.tape[self.pc] != BFCommand.StartWhile):
-            return -2
+    def disableJournal(self):
+        self.journal = None
 
-        # Once the offset counterv reaches zero, the test_pc will be at the tape location for the while group end
-        test_pc = self.pc
-        offsetCounter = 1
-        while offsetCounter > 0:
-            test_pc += 1
+    def enableProfiler(self):
+        self.profiler = BFProfiler(self.tape, len(self.memory))
 
-            # End of tape is reached without finding matching closing command
-            if test_pc >= len(self.tape):
-                break
+    def disableProfiler(self):
+        self.profiler = None
 
-            # Update the the paren tracker based on the commands
-            # Any non-loop command is ignored
-            cmd = self.tape[test_pc]
-            if cmd == BFCommand.EndWhile:
-                offsetCounter -= 1
-            elif cmd == BFCommand.StartWhile:
-                offsetCounter += 1
+    def enableLoopCache(self, capacity: int = LOOP_CACHE_CAPACITY):
+        self.loopCache = BFLoopCache(self.tape, capacity)
 
-        # The current while start at self.pc does not have a close
-        if offsetCounter > 0:
-            return -1
+    def disableLoopCache(self):
+        self.loopCache = None
 
-        return test_pc
+    def enableLoopDetector(self, capacity: int = LOOP_DETECTOR_CAPACITY):
+        self.loopDetector = BFLoopDetector(capacity)
 
-    def tapeString(self):
-        ret = "Tape: "
-        for i in range(0, len(self.tape)):
-            if i == self.pc:
-                ret = format(f"{ret} ({BFCommandToString(self.tape[i])})")
-            else:
-                ret = format(f"{ret} {BFCommandToString(self.tape[i])}")
+    def disableLoopDetector(self):
+        self.loopDetector = None
 
-        if self.pc >= len(self.tape):
-            ret = format(f"{ret} (HALT)")
+    def recordJournal(self):
+        ptr = self.ptr
+        if 0 <= ptr < len(self.memory):
+            self.journal.record(self.pc, ptr, ptr, self.memory[ptr], self.step_count, PROGRAM_STATES.index(self.state))
         else:
-            ret = format(f"{ret} HALT")
+            self.journal.record(self.pc, ptr, -1, 0, self.step_count, PROGRAM_STATES.index(self.state))
+
+    def stepBack(self) -> bool:
+        if self.journal is None:
+            self.raiseRuntimeError("Attempting to step back without a journal")
+
+        entry = self.journal.pop()
+        if entry is None:
+            return False
+
+        pc, ptr, cell, value, step_count, state = entry
+        if cell >= 0:
+            self.memory[cell] = value
+        self.pc = pc
+        self.ptr = ptr
+        self.step_count = step_count
+        self.state = PROGRAM_STATES[state]
+        self.stateDetail = ""
+
+        # A suspended generated run no longer matches the interpreter state
+        self.generatedRun = None
+        if self.loopDetector is not None:
+            self.loopDetector.reset()
+        return True
+
+    def rewind(self, count: int) -> int:
+        undone = 0
+        while undone < count and self.stepBack():
+            undone += 1
+        return undone
+
+    def flightRecord(self, count: int = FLIGHT_RECORD_LENGTH) -> list:
+        return self.journal.recent(count) if self.journal is not None else []
+
+    def flightRecordString(self, flight_record: list) -> str:
+        ret = "Flight Recorder:"
+        for pc, ptr, cell, value, step_count, state in flight_record:
+            cmd = BFCommandToString(self.tape[pc]) if pc < len(self.tape) else "HALT"
+            cell_value = value if cell >= 0 else "-"
+            ret = f"{ret}\r\n\tStep {step_count}: pc {pc} ({cmd}) ptr {ptr} cell {cell_value} {PROGRAM_STATES[state]._name_}" # noqa
         return ret
 
-    def memoryString(self):
-        ret = "Memory Map: "
-        for i in range(0, len(self.memory)):
-            if i == self.ptr:
-                ret = format(f"{ret} ({self.memory[i]})")
-            else:
-                ret = format(f"{ret} {self.memory[i]}")
-        return ret
+    def findLoopEnd(self) -> int:
+
+        # Only attempt at an actual while start
+        if (self.tape[self.pc] != BFCommand.StartWhile):
+            return -2
+
+        # The current while start at self.pc does not have a close (only possible via appendTape)
+        return self.jumpTable[self.pc]
+
+    def tapeString(self):
+        symbols = [BFCommandToString(cmd) for cmd in self.tape] + ["HALT"]
+        marked = min(self.pc, len(self.tape))
+        symbols[marked] = f"({symbols[marked]})"
+        return "Tape:  " + " ".join(symbols)
+
+    def memoryString(self, radius: int = MEMORY_STRING_RADIUS):
+
+        # Large memories only show the cells around the pointer
+        start = max(0, self.ptr - radius)
+        stop = min(len(self.memory), self.ptr + radius + 1)
+        cells = [str(value) for value in self.memory[start:stop]]
+        if start <= self.ptr < stop:
+            cells[self.ptr - start] = f"({cells[self.ptr - start]})"
+        if start > 0:
+            cells.insert(0, "...")
+        if stop < len(self.memory):
+            cells.append("...")
+        return "Memory Map:  " + " ".join(cells)
@@ -0,0 +1,179 @@
+import json
+
+from math import inf
+from src.bf_commands import BFCommand
+
+
+# Pointer positions are intervals relative to a starting cell, or absolute once the pointer is known to start at cell
+# 0. Sides the analysis cannot bound are -inf or inf, and are reported as None
+
+
+class BFRegion():
+
+    # A straight line block of commands, or a loop from its '[' to its ']'
+    #   net:    Pointer change over the block, or over one iteration of the loop. None when nested loops make it vary
+    #   low:    Lowest pointer offset reached from the start of the block or iteration
+    #   high:   Highest pointer offset reached from the start of the block or iteration
+    #   reach:  Absolute (lowest, highest) cell the region can move the pointer to, over every iteration of a loop
+    def __init__(self, loop: bool, start: int, end: int, net_low, net_high, low, high, reach: tuple):
+        self.loop = loop
+        self.start = start
+        self.end = end
+        self.net_low = net_low
+        self.net_high = net_high
+        self.net = net_low if net_low == net_high else None
+        self.low = low
+        self.high = high
+        self.reach = reach
+
+    def balanced(self) -> bool:
+        return self.net == 0
+
+    def toDict(self) -> dict:
+        return {"kind": "loop" if self.loop else "block", "start": self.start, "end": self.end, "net": self.net,
+                "low": bound(self.low), "high": bound(self.high),
+                "reach": [bound(self.reach[0]), bound(self.reach[1])]}
+
+
+def bound(value):
+    return None if value in [inf, -inf] else value
+
+
+def widen(low, high, net_low, net_high) -> tuple:
+
+    # Positions at a loop start over every iteration, given the positions on entry and the net change per iteration
+    if net_low == 0 and net_high == 0:
+        return low, high
+    return (-inf if net_low < 0 else low), (inf if net_high > 0 else high)
+
+
+class BFPointerAnalysis():
+
+    def __init__(self, tape: list):
+        self.tape = tape
+
+        # Absolute pointer interval on entry to every command, for a program starting at cell 0
+        self.entry_low: list = [0] * len(tape)
+        self.entry_high: list = [0] * len(tape)
+
+        self.regions: list = []
+
+        # Absolute interval of every cell the program can move the pointer to
+        self.low = 0
+        self.high = 0
+
+        # Loop '[' position -> (net low, net high, low, high) of one iteration, relative to the '['
+        self.loop_summaries: dict = self.summarizeLoops()
+        self.walk(self.loop_summaries)
+
+    def summarizeLoops(self) -> dict:
+
+        # Net change and reach of one iteration of every loop, relative to its '['. Loops are summarised inside out
+        # with an explicit stack, so deeply nested tapes do not hit the recursion limit. Each frame holds the current
+        # position interval and the reach so far
+        summaries = {}
+        frames = [[0, 0, 0, 0]]
+        starts = []
+        for pc, cmd in enumerate(self.tape):
+            frame = frames[-1]
+            if cmd in [BFCommand.CellPtrLeft, BFCommand.CellPtrRight]:
+                step = 1 if cmd == BFCommand.CellPtrRight else -1
+                frame[0] += step
+                frame[1] += step
+                frame[2] = min(frame[2], frame[0])
+                frame[3] = max(frame[3], frame[1])
+
+            elif cmd == BFCommand.StartWhile:
+                frames.append([0, 0, 0, 0])
+                starts.append(pc)
+
+            elif cmd == BFCommand.EndWhile:
+                net_low, net_high, low, high = frames.pop()
+                summaries[starts.pop()] = (net_low, net_high, low, high)
+                frame = frames[-1]
+                frame[0], frame[1] = widen(frame[0], frame[1], net_low, net_high)
+                frame[2] = min(frame[2], frame[0] + low)
+                frame[3] = max(frame[3], frame[1] + high)
+
+        self.low, self.high = frames[0][2], frames[0][3]
+        return summaries
+
+    def walk(self, summaries: dict):
+
+        # Carries the absolute pointer interval through the tape, recording it on entry to every command
+        low, high = 0, 0
+        loops = []
+        block_start = None
+        for pc, cmd in enumerate(self.tape):
+            if cmd == BFCommand.StartWhile:
+                self.closeBlock(block_start, pc)
+                block_start = None
+                net_low, net_high, body_low, body_high = summaries[pc]
+                low, high = widen(low, high, net_low, net_high)
+                loops.append((pc, low, high))
+
+            elif cmd == BFCommand.EndWhile:
+                self.closeBlock(block_start, pc)
+                block_start = None
+
+            elif block_start is None:
+                block_start = pc
+
+            self.entry_low[pc] = low
+            self.entry_high[pc] = high
+
+            if cmd == BFCommand.CellPtrRight:
+                low += 1
+                high += 1
+            elif cmd == BFCommand.CellPtrLeft:
+                low -= 1
+                high -= 1
+            elif cmd == BFCommand.EndWhile:
+                start, low, high = loops.pop()
+                net_low, net_high, body_low, body_high = summaries[start]
+                self.regions.append(BFRegion(True, start, pc, net_low, net_high, body_low, body_high,
+                                             (low + body_low, high + body_high)))
+
+        self.closeBlock(block_start, len(self.tape))
+        self.regions.sort(key=lambda region: (region.start, -region.end))
+
+    def closeBlock(self, start: int, end: int):
+        if start is None:
+            return
+        offset = 0
+        low = 0
+        high = 0
+        for cmd in self.tape[start:end]:
+            if cmd == BFCommand.CellPtrRight:
+                offset += 1
+            elif cmd == BFCommand.CellPtrLeft:
+                offset -= 1
+            low = min(low, offset)
+            high = max(high, offset)
+        self.regions.append(BFRegion(False, start, end - 1, offset, offset, low, high,
+                                     (self.entry_low[start] + low, self.entry_high[start] + high)))
+
+    def unbalancedLoops(self) -> list:
+        return [region for region in self.regions if region.loop and not region.balanced()]
+
+    def moveSafe(self, pc: int, low: int, high: int, memory_size: int) -> bool:
+
+        # True when moving the pointer from the command at pc through offsets low -> high can never leave memory
+        return self.entry_low[pc] + low >= 0 and self.entry_high[pc] + high < memory_size
+
+    def minimumCellCount(self) -> int:
+
+        # Fewest cells that keep the pointer in memory on every path. None when a loop can move it right without bound
+        return bound(self.high + 1)
+
+    def report(self) -> dict:
+        return {"cell_count": self.minimumCellCount(), "low": bound(self.low), "high": bound(self.high),
+                "unbalanced_loops": [region.toDict() for region in self.unbalancedLoops()],
+                "regions": [region.toDict() for region in self.regions]}
+
+    def reportJson(self) -> str:
+        return json.dumps(self.report(), indent=4)
+
+
+def analyzePointer(tape: list) -> BFPointerAnalysis:
+    return BFPointerAnalysis(tape)
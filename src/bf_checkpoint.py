@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+from time import perf_counter
+from src.bf import PROGRAM_STATES, BFInterpreter, ProgramState, RunResult, RunStopReason
+from src.bf_commands import BFCommandToString
+from src.bf_memory import PagedMemory, memoryTypecode
+
+
+class BFCheckpointError(Exception):
+    pass
+
+
+CHECKPOINT_MAGIC = b"BFCP"
+CHECKPOINT_VERSION = 1
+
+# Fixed size header, followed by the memory image
+#   magic, version, little endian, typecode, item size, paged, pending input, state, tape hash,
+#   pc, ptr, step_count, max_value, cell count, default value, page size, page count
+# Flat memory is stored as one raw block of cell count items. Paged memory stores each allocated page as its
+# index followed by a raw block of page size items
+CHECKPOINT_HEADER = struct.Struct("<4sBBcBBBB32sqqQQQQQQ")
+CHECKPOINT_PAGE_INDEX = struct.Struct("<Q")
+
+# Steps run between checks of the checkpoint interval when only a time interval is given
+CHECKPOINT_SLICE = 1 << 20
+
+
+def tapeHash(tape: list) -> bytes:
+    return hashlib.sha256("".join(BFCommandToString(cmd) for cmd in tape).encode("ascii")).digest()
+
+
+def saveCheckpoint(interpreter: BFInterpreter, path: str):
+    memory = interpreter.memory
+    typecode = memoryTypecode(interpreter.max_value)
+    if typecode is None:
+        raise BFCheckpointError(f"Cells with a maximum value of {interpreter.max_value} are too large to checkpoint")
+    item_size = 1 if typecode == "B" else array(typecode).itemsize
+
+    paged = type(memory) is PagedMemory
+    header = CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, sys.byteorder == "little",
+                                    typecode.encode("ascii"), item_size, paged,
+                                    interpreter.state == ProgramState.WaitingForInput,
+                                    PROGRAM_STATES.index(interpreter.state), tapeHash(interpreter.tape),
+                                    interpreter.pc, interpreter.ptr, interpreter.step_count, interpreter.max_value,
+                                    len(memory), memory.default if paged else 0,
+                                    memory.page_size if paged else 0, len(memory.pages) if paged else 0)
+
+    # Written beside the last good checkpoint and renamed over it, so a crash part way through never leaves a
+    # truncated checkpoint behind
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as checkpoint:
+        checkpoint.write(header)
+        if paged:
+            for page_index in sorted(memory.pages):
+                checkpoint.write(CHECKPOINT_PAGE_INDEX.pack(page_index))
+                checkpoint.write(memory.pages[page_index])
+        else:
+            checkpoint.write(memory)
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+    os.replace(temp_path, path)
+
+    logging.debug(f"Checkpoint written to {path} at step {interpreter.step_count}")
+
+
+def readBlock(image, offset: int, typecode: str, count: int, byteswap: bool):
+    end = offset + count * (1 if typecode == "B" else array(typecode).itemsize)
+    if end > len(image):
+        raise BFCheckpointError("Checkpoint is truncated")
+
+    if typecode == "B":
+        return bytearray(image[offset:end]), end
+    block = array(typecode)
+    block.frombytes(image[offset:end])
+    if byteswap:
+        block.byteswap()
+    return block, end
+
+
+def loadCheckpoint(interpreter: BFInterpreter, path: str):
+
+    # The tape and environment come from the caller. The checkpoint must have been taken with the same tape and
+    # max_value, and replaces the execution state and memory
+    try:
+        with open(path, "rb") as checkpoint, mmap.mmap(checkpoint.fileno(), 0, access=mmap.ACCESS_READ) as image:
+            if len(image) < CHECKPOINT_HEADER.size:
+                raise BFCheckpointError("Checkpoint is truncated")
+
+            (magic, version, little_endian, typecode, item_size, paged, pending_input, state, tape_hash, pc, ptr,
+             step_count, max_value, cell_count, default, page_size, page_count) = CHECKPOINT_HEADER.unpack_from(image)
+
+            if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+                raise BFCheckpointError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+            if tape_hash != tapeHash(interpreter.tape):
+                raise BFCheckpointError("Checkpoint was taken with a different tape")
+            if max_value != interpreter.max_value:
+                raise BFCheckpointError(f"Checkpoint maximum cell value {max_value} does not match {interpreter.max_value}") # noqa
+
+            typecode = typecode.decode("ascii")
+            if typecode != memoryTypecode(max_value) or (typecode != "B" and item_size != array(typecode).itemsize):
+                raise BFCheckpointError(f"Checkpoint cells of {item_size} bytes cannot be read on this platform")
+            if state >= len(PROGRAM_STATES) or pending_input != (PROGRAM_STATES[state] == ProgramState.WaitingForInput):
+                raise BFCheckpointError("Checkpoint program state is corrupt")
+            if pc < 0 or pc > len(interpreter.tape):
+                raise BFCheckpointError(f"Checkpoint program counter {pc} is outside the tape of {len(interpreter.tape)} commands") # noqa
+
+            # A pointer error leaves the pointer one cell past the end of memory it tried to leave
+            low, high = (-1, cell_count) if PROGRAM_STATES[state] == ProgramState.Error else (0, cell_count - 1)
+            if ptr < low or ptr > high:
+                raise BFCheckpointError(f"Checkpoint pointer {ptr} is outside memory of {cell_count} cells")
+            if paged and page_size == 0:
+                raise BFCheckpointError("Checkpoint page size is corrupt")
+
+            byteswap = bool(little_endian) != (sys.byteorder == "little")
+            offset = CHECKPOINT_HEADER.size
+            if paged:
+                memory = PagedMemory(cell_count, max_value, default, page_size)
+                for _ in range(0, page_count):
+                    if offset + CHECKPOINT_PAGE_INDEX.size > len(image):
+                        raise BFCheckpointError("Checkpoint is truncated")
+                    page_index, = CHECKPOINT_PAGE_INDEX.unpack_from(image, offset)
+                    if page_index * page_size >= cell_count:
+                        raise BFCheckpointError(f"Checkpoint page {page_index} is outside memory of {cell_count} cells") # noqa
+                    memory.pages[page_index], offset = readBlock(image, offset + CHECKPOINT_PAGE_INDEX.size,
+                                                                 typecode, page_size, byteswap)
+            else:
+                memory, offset = readBlock(image, offset, typecode, cell_count, byteswap)
+
+    except (OSError, ValueError, struct.error) as read_error:
+        raise BFCheckpointError(f"Unable to read checkpoint {path}: {read_error}")
+
+    interpreter.memory = memory
+    interpreter.pc = pc
+    interpreter.ptr = ptr
+    interpreter.step_count = step_count
+    interpreter.state = PROGRAM_STATES[state]
+    interpreter.stateDetail = ""
+    interpreter.generatedRun = None
+    if interpreter.journal is not None:
+        interpreter.journal.clear()
+    if interpreter.loopDetector is not None:
+        interpreter.loopDetector.reset()
+
+    logging.debug(f"Resumed from checkpoint {path} at step {step_count}")
+
+
+def runWithCheckpoints(interpreter: BFInterpreter, path: str, every_steps: int = None, every_seconds: float = None,
+                       max_steps: int = None, deadline: float = None) -> RunResult:
+
+    # Runs like BFInterpreter.run(), writing a checkpoint every every_steps steps and every every_seconds seconds,
+    # and once more when the run stops
+    if every_steps is not None and every_steps < 1:
+        raise ValueError("Checkpoint interval must be at least 1 step")
+    if every_seconds is not None and every_seconds <= 0:
+        raise ValueError("Checkpoint interval must be greater than 0 seconds")
+
+    steps = 0
+    since_checkpoint = 0
+    next_time = perf_counter() + every_seconds if every_seconds is not None else None
+
+    while True:
+        budget = every_steps - since_checkpoint if every_steps is not None else CHECKPOINT_SLICE
+        if max_steps is not None:
+            budget = min(budget, max_steps - steps)
+        slice_deadline = min([t for t in [next_time, deadline] if t is not None], default=None)
+
+        result = interpreter.run(budget, slice_deadline)
+        steps += result.steps
+        since_checkpoint += result.steps
+
+        if result.reason in [RunStopReason.StepBudget, RunStopReason.Deadline]:
+            out_of_steps = max_steps is not None and steps >= max_steps
+            out_of_time = deadline is not None and perf_counter() >= deadline
+            if not out_of_steps and not out_of_time:
+                step_due = every_steps is not None and since_checkpoint >= every_steps
+                time_due = next_time is not None and perf_counter() >= next_time
+                if step_due or time_due:
+                    saveCheckpoint(interpreter, path)
+                    since_checkpoint = 0
+                    if next_time is not None:
+                        next_time = perf_counter() + every_seconds
+                continue
+
+        saveCheckpoint(interpreter, path)
+        return RunResult(result.reason, steps, result.detail)
@@ -0,0 +1,188 @@
+import logging
+
+from enum import IntEnum
+from src.bf_ir import DEADLINE_CHECK_INTERVAL, OP_ARG, OP_CODE, OP_LENGTH, OP_PC, BFOpCode, BFProgram
+
+
+class CodegenSignal(IntEnum):
+    Halt = 0
+    ReadByte = 1
+    Replay = 2
+    StepBudget = 3
+    Deadline = 4
+
+
+# The generated function is a generator. Every yield hands the interpreter a tuple of
+# (signal, pc, ptr, step_count, length) and the interpreter resumes it by sending (step_limit, deadline)
+#   ReadByte:   Waiting for input at pc. Resumed once readByte() has written the cell
+#   Replay:     The op at pc would leave the legal range. Its length commands must be replayed by step()
+#   StepBudget: The next length commands starting at pc would exceed the step limit. Once the limit is reached
+#               exactly the run can be resumed, otherwise the commands that fit must be replayed by step()
+#   Deadline:   The deadline passed on a loop back edge, execution continues at pc
+#   Halt:       End of tape
+GENERATED_ARGS = "m, p, steps, mx, size, limit, deadline, linear, emit, clock, D"
+
+
+class CodeWriter():
+
+    def __init__(self):
+        self.lines = []
+        self.depth = 1
+
+        # LinearLoop data tuples, passed to the generated function as D
+        self.data = []
+
+    def line(self, text: str):
+        self.lines.append("    " * self.depth + text)
+
+    def waitForBudget(self, cost: int, pc: int):
+        check = "steps >= limit" if cost == 1 else f"steps + {cost} > limit"
+        self.line(f"while {check}:")
+        self.line(f"    limit, deadline = yield ({int(CodegenSignal.StepBudget)}, {pc}, p, steps, {cost})")
+
+    def replay(self, pc: int, steps: str, length: int):
+        self.line(f"    yield ({int(CodegenSignal.Replay)}, {pc}, p, {steps}, {length})")
+        self.line("    return")
+
+
+# Ops written as straight line code
+BLOCK_OPS = [BFOpCode.Add, BFOpCode.Move, BFOpCode.SafeMove, BFOpCode.PrintByte]
+
+
+def rangeCheck(target: str, low: int, high: int, upper: str) -> str:
+    checks = []
+    if high > 0:
+        checks.append(f"{target} + {high} {upper}")
+    if low < 0:
+        checks.append(f"{target} - {-low} < 0")
+    return " or ".join(checks)
+
+
+def writeBlock(writer: CodeWriter, ops: list):
+
+    # Straight line ops share one budget check and one step count update
+    cost = sum(op[OP_LENGTH] for op in ops)
+    writer.waitForBudget(cost, ops[0][OP_PC])
+    writer.line(f"steps += {cost}")
+
+    prefix = 0
+    for code, arg, pc, length, low, high, data in ops:
+        steps_before = f"steps - {cost - prefix}"
+
+        if code == BFOpCode.Add:
+            writer.line("v = m[p]")
+            check = rangeCheck("v", low, high, "> mx")
+            if check:
+                writer.line(f"if {check}:")
+                writer.replay(pc, steps_before, length)
+            if arg != 0:
+                writer.line(f"m[p] = v + {arg}" if arg > 0 else f"m[p] = v - {-arg}")
+
+        elif code in [BFOpCode.Move, BFOpCode.SafeMove]:
+            check = rangeCheck("p", low, high, ">= size") if code == BFOpCode.Move else ""
+            if check:
+                writer.line(f"if {check}:")
+                writer.replay(pc, steps_before, length)
+            if arg != 0:
+                writer.line(f"p += {arg}" if arg > 0 else f"p -= {-arg}")
+
+        elif code == BFOpCode.PrintByte:
+            writer.line("emit(p, m[p])")
+
+        prefix += length
+
+
+def writeLoop(writer: CodeWriter, program: BFProgram, start: int, end: int):
+    start_pc = program.ops[start][OP_PC]
+    end_pc = program.ops[end][OP_PC]
+
+    writer.line("steps += 1")
+    writer.line("while m[p]:")
+    writer.depth += 1
+    writeOps(writer, program, start + 1, end)
+
+    # The close and the re-evaluated loop start
+    writer.waitForBudget(2, end_pc)
+    writer.line("steps += 2")
+    writer.line("ticks -= 1")
+    writer.line("if not ticks:")
+    writer.line(f"    ticks = {DEADLINE_CHECK_INTERVAL}")
+    writer.line("    if deadline is not None and m[p] and clock() >= deadline:")
+    writer.line(f"        limit, deadline = yield ({int(CodegenSignal.Deadline)}, {start_pc + 1}, p, steps, 0)")
+    writer.depth -= 1
+
+
+def writeOps(writer: CodeWriter, program: BFProgram, start: int, end: int):
+    ops = program.ops
+    i = start
+    while i < end:
+        code = ops[i][OP_CODE]
+
+        if code in BLOCK_OPS:
+            block_end = i
+            while block_end < end and ops[block_end][OP_CODE] in BLOCK_OPS:
+                block_end += 1
+            writeBlock(writer, ops[i:block_end])
+            i = block_end
+            continue
+
+        elif code == BFOpCode.ReadByte:
+            pc = ops[i][OP_PC]
+            writer.waitForBudget(1, pc)
+            writer.line("steps += 1")
+            writer.line(f"limit, deadline = yield ({int(CodegenSignal.ReadByte)}, {pc}, p, steps, 0)")
+
+        elif code == BFOpCode.JumpIfZero:
+            writer.waitForBudget(1, ops[i][OP_PC])
+            writeLoop(writer, program, i, ops[i][OP_ARG] - 1)
+            i = ops[i][OP_ARG]
+            continue
+
+        elif code == BFOpCode.LinearLoop:
+            _, arg, pc, length, low, high, data = ops[i]
+            writer.waitForBudget(1, pc)
+            writer.line("n = 0")
+            check = " and ".join(["m[p]"] + ([f"p - {-low} >= 0"] if low < 0 else []) +
+                                 ([f"p + {high} < size"] if high > 0 else []))
+            writer.line(f"if {check}:")
+            writer.line(f"    n = linear(m, p, mx, D[{len(writer.data)}], (limit - steps - 1) // {length + 2})")
+            writer.data.append(data)
+            writer.line("if n:")
+            writer.line(f"    steps += 1 + n * {length + 2}")
+            writer.line("else:")
+            writer.depth += 1
+            writeLoop(writer, program, i, arg - 1)
+            writer.depth -= 1
+            i = arg
+            continue
+
+        i += 1
+
+
+def generateSource(program: BFProgram, tape_length: int) -> tuple:
+    writer = CodeWriter()
+    writer.line(f"ticks = {DEADLINE_CHECK_INTERVAL}")
+    writeOps(writer, program, 0, len(program.ops))
+    writer.line(f"yield ({int(CodegenSignal.Halt)}, {tape_length}, p, steps, 0)")
+
+    source = "\n".join([f"def generated({GENERATED_ARGS}):"] + writer.lines) + "\n"
+    return source, tuple(writer.data)
+
+
+def generateFunction(program: BFProgram, tape_length: int):
+    source, data = generateSource(program, tape_length)
+
+    # Deeply nested loops exceed what the Python compiler accepts. Callers fall back to the fused engine
+    try:
+        namespace = {}
+        exec(compile(source, "<bf-generated>", "exec"), namespace)
+    except (SyntaxError, RecursionError, MemoryError) as compile_error:
+        logging.info(f"Python code generation unavailable for this tape: {compile_error}")
+        return None
+
+    generated = namespace["generated"]
+
+    def start(memory, ptr, steps, max_value, size, limit, deadline, linear, emit, clock):
+        return generated(memory, ptr, steps, max_value, size, limit, deadline, linear, emit, clock, data)
+
+    return start
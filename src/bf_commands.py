@@ -0,0 +1,50 @@
+from enum import Enum
+
+
+class BFCommand(Enum):
+    Increment = 1
+    Decrement = 2
+    CellPtrLeft = 3
+    CellPtrRight = 4
+    StartWhile = 5
+    EndWhile = 6
+    ReadByte = 7
+    PrintByte = 8
+
+
+def StringToBFCommand(cmd):
+    if cmd == "<":
+        return BFCommand.CellPtrLeft
+    elif cmd == ">":
+        return BFCommand.CellPtrRight
+    elif cmd == "+":
+        return BFCommand.Increment
+    elif cmd == "-":
+        return BFCommand.Decrement
+    elif cmd == "[":
+        return BFCommand.StartWhile
+    elif cmd == "]":
+        return BFCommand.EndWhile
+    elif cmd == ".":
+        return BFCommand.PrintByte
+    elif cmd == ",":
+        return BFCommand.ReadByte
+
+
+def BFCommandToString(cmd):
+    if cmd == BFCommand.CellPtrLeft:
+        return "<"
+    elif cmd == BFCommand.CellPtrRight:
+        return ">"
+    elif cmd == BFCommand.Increment:
+        return "+"
+    elif cmd == BFCommand.Decrement:
+        return "-"
+    elif cmd == BFCommand.StartWhile:
+        return "["
+    elif cmd == BFCommand.EndWhile:
+        return "]"
+    elif cmd == BFCommand.PrintByte:
+        return "."
+    elif cmd == BFCommand.ReadByte:
+        return ","
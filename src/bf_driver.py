@@ -0,0 +1,323 @@
+import logging
+import queue
+import threading
+
+from enum import Enum
+from time import perf_counter
+from src.bf import BFInterpreter, BFRuntimeError, RunStopReason
+from src.bf_memory import MemoryWindow, copyMemory, memoryView
+from src.bf_output import RingOutputSink
+
+
+# Longest one batch of steps runs before the driver checks for commands
+DRIVER_SLICE_SECONDS = 0.005
+
+# Frame rate the render loop aims for, and the share of every frame the driver may spend stepping. The rest is left
+# to the render loop, so a program running at an unlimited rate never drags the display below its target frame rate
+DRIVER_TARGET_FPS = 60
+DRIVER_FRAME_SHARE = 0.5
+
+# Steps owed beyond this many seconds at the requested rate are dropped instead of run in one burst
+DRIVER_MAX_LAG_SECONDS = 0.25
+
+# Seconds the achieved step rate is measured over
+DRIVER_RATE_SECONDS = 1.0
+
+# Fastest rate steps are journaled at. Journaling runs every step through step(), so faster rates and unlimited drop
+# the journal and let run() use the fused engines
+DRIVER_JOURNAL_MAX_HERTZ = 4096
+
+# Cells shown until the render loop sends its view, and cells copied either side of the view and of the pointer, so
+# a camera that moved since the view was sent still finds its cells
+DRIVER_VIEW_CELLS = 64
+DRIVER_VIEW_MARGIN = 64
+
+# Commands either side of the program counter whose profiler counts are copied
+DRIVER_HEAT_COMMANDS = 512
+
+
+class DriverCommand(Enum):
+    Toggle = 1
+    Pause = 2
+    SetHertz = 3
+    ReadBytes = 4
+    StepBack = 5
+    SetHeatmap = 6
+    Stop = 7
+    SetView = 8
+
+
+class BFSnapshot():
+
+    # Copy of everything the renderers read from an interpreter, taken by the driver between two batches of steps
+    #   commands:       Commands the driver had applied when the snapshot was taken
+    #   hertz:          Requested steps per second. None when unlimited
+    #   achieved_hertz: Steps per second actually run over the last DRIVER_RATE_SECONDS
+    #   journaling:     Whether steps are being recorded for stepBack()
+    #   view:           First and one past the last cell on screen. Only those cells and the ones around the pointer
+    #                   are copied, and only their profiler counts. None copies everything
+    #   overview:       Copy of the columns of a BFMemoryOverview refreshed by the driver, for the minimap
+    def __init__(self, interpreter: BFInterpreter, running: bool, commands: int, heatmap: bool, hertz: int = None,
+                 achieved_hertz: float = 0.0, view: tuple = None, overview=None):
+        ptr = interpreter.ptr
+        if view is None:
+            self.memory = memoryView(copyMemory(interpreter.memory))
+        else:
+            first, stop = view
+            self.memory = MemoryWindow(interpreter.memory, [(first - DRIVER_VIEW_MARGIN, stop + DRIVER_VIEW_MARGIN),
+                                                            (ptr - DRIVER_VIEW_MARGIN, ptr + DRIVER_VIEW_MARGIN + 1)])
+        self.max_value = interpreter.max_value
+        self.ptr = interpreter.ptr
+        self.pc = interpreter.pc
+        self.step_count = interpreter.step_count
+        self.state = interpreter.state
+        self.stateDetail = interpreter.stateDetail
+        self.running = running
+        self.commands = commands
+        self.hertz = hertz
+        self.achieved_hertz = achieved_hertz
+        self.journaling = interpreter.journal is not None
+
+        # Profiler counts are only copied while they are shown
+        profiler = interpreter.profiler if heatmap else None
+        if profiler is None:
+            self.profiler = None
+        elif view is None:
+            self.profiler = profiler.window(0, len(interpreter.memory), 0, profiler.tapeLength())
+        else:
+            pc = interpreter.pc
+            self.profiler = profiler.window(first - DRIVER_VIEW_MARGIN, stop + DRIVER_VIEW_MARGIN,
+                                            pc - DRIVER_HEAT_COMMANDS, pc + DRIVER_HEAT_COMMANDS)
+        self.overview = overview.copy() if overview is not None else None
+        self.output = interpreter.output.copy() if type(interpreter.output) is RingOutputSink else None
+
+    def memoryView(self):
+        return self.memory
+
+
+class BFDriver():
+
+    # Runs an interpreter on a worker thread, hertz steps per second or as fast as it can when hertz is None. Other
+    # threads never touch the interpreter while the driver runs. They send commands, which the worker applies between
+    # batches, and read the snapshots it publishes. Snapshots only copy the cells in the view the render loop sends,
+    # and the overview given for the minimap is refreshed by the driver, so a snapshot costs the same for any memory
+    # size. While the program runs they are published once a frame, and straight away when a command was applied or
+    # the program stopped
+    def __init__(self, interpreter: BFInterpreter, hertz: int = None, target_fps: int = DRIVER_TARGET_FPS,
+                 journal_capacity: int = None, overview=None):
+        self.interpreter = interpreter
+        self.hertz = hertz
+        self.running = False
+        self.heatmap = False
+        self.view = (0, DRIVER_VIEW_CELLS)
+        self.overview = overview
+
+        # Steps are journaled with this capacity at rates up to DRIVER_JOURNAL_MAX_HERTZ. None leaves the journal as
+        # the interpreter has it
+        self.journal_capacity = journal_capacity
+        self.updateJournal()
+
+        # A profiler the interpreter already has is kept for its report. Otherwise counting runs every step through
+        # step(), so the profiler is only enabled while the heatmap shows it
+        self.keep_profiler = interpreter.profiler is not None
+
+        self.commands = queue.SimpleQueue()
+        self.sent = 0
+        self.applied = 0
+
+        # Fixed timestep. Elapsed time adds hertz steps per second to the accumulator, and every whole step in it is
+        # run, however many that is
+        self.accumulator = 0.0
+        self.accumulated_time = perf_counter()
+
+        # Stepping time used in the current frame, which starts at frame_time
+        self.frame_seconds = 1.0 / target_fps
+        self.frame_time = 0.0
+        self.frame_used = 0.0
+
+        # Step count and time the achieved rate is measured from
+        self.achieved_hertz = 0.0
+        self.rate_steps = interpreter.step_count
+        self.rate_time = perf_counter()
+
+        self.thread: threading.Thread = None
+        self.latest: BFSnapshot = None
+        self.published_time = 0.0
+        self.publish()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.work, name="bf-driver", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.send(DriverCommand.Stop)
+        self.thread.join()
+        self.thread = None
+
+    def send(self, command: DriverCommand, value=None):
+        self.sent += 1
+        self.commands.put((command, value))
+
+    def snapshot(self) -> BFSnapshot:
+        return self.latest
+
+    def settled(self, snapshot: BFSnapshot) -> bool:
+
+        # True when snapshot was taken after every command sent so far was applied
+        return snapshot.commands == self.sent
+
+    def work(self):
+        while True:
+            # Sleeps until the next step is due, or wakes as soon as a command arrives
+            applied = self.applied
+            was_running = self.running
+            try:
+                command, value = self.commands.get(timeout=self.delay())
+                while True:
+                    if command == DriverCommand.Stop:
+                        self.applied += 1
+                        self.publish()
+                        return
+                    self.apply(command, value)
+                    command, value = self.commands.get_nowait()
+            except queue.Empty:
+                pass
+
+            self.runDue()
+            if self.applied != applied or self.running != was_running or not self.interpreter.canStep() or \
+                    perf_counter() - self.published_time >= self.frame_seconds:
+                self.publish()
+
+    def delay(self) -> float:
+        if not self.running or not self.interpreter.canStep():
+            return None
+
+        # Once this frame's stepping time is used, the render loop has the rest of the frame
+        now = perf_counter()
+        if self.frame_used >= self.frame_seconds * DRIVER_FRAME_SHARE:
+            return max(0.0, self.frame_time + self.frame_seconds - now)
+
+        if self.hertz is None:
+            return 0
+        owed = self.accumulator + (now - self.accumulated_time) * self.hertz
+        return max(0.0, (1 - owed) / self.hertz)
+
+    def apply(self, command: DriverCommand, value):
+        self.applied += 1
+        interpreter = self.interpreter
+
+        if command == DriverCommand.Toggle:
+            self.running = not self.running
+            if interpreter.halted():
+                logging.debug("Disabling auto-run on halted program")
+                self.running = False
+            logging.debug(f"Setting program auto exec to {self.running}")
+            self.scheduleNextStep()
+
+        elif command == DriverCommand.Pause:
+            self.running = False
+
+        elif command == DriverCommand.SetHertz:
+            self.hertz = value
+            self.updateJournal()
+            self.scheduleNextStep()
+
+        elif command == DriverCommand.ReadBytes:
+            # The first value answers the waiting ',', the rest are queued for the following ones
+            interpreter.input.push(value[1:])
+            try:
+                interpreter.readByte(value[0])
+            except BFRuntimeError as runtime_error:
+                logging.warning(f"Program execution failed due to runtime error:\r\n\t{runtime_error}")
+            self.scheduleNextStep()
+
+        elif command == DriverCommand.StepBack:
+            self.running = False
+            if not interpreter.stepBack():
+                logging.debug("No steps left to undo")
+
+        elif command == DriverCommand.SetHeatmap:
+            self.heatmap = value
+            if value and interpreter.profiler is None:
+                interpreter.enableProfiler()
+            elif not value and not self.keep_profiler:
+                interpreter.disableProfiler()
+
+        elif command == DriverCommand.SetView:
+            self.view = value
+
+    def updateJournal(self):
+
+        # Dropping the journal forgets every recorded step, so undo starts over once the rate is lowered again
+        if self.journal_capacity is None:
+            return
+        journaling = self.hertz is not None and self.hertz <= DRIVER_JOURNAL_MAX_HERTZ
+        if journaling and self.interpreter.journal is None:
+            self.interpreter.enableJournal(self.journal_capacity)
+        elif not journaling and self.interpreter.journal is not None:
+            logging.debug(f"Dropping the undo journal above {DRIVER_JOURNAL_MAX_HERTZ}Hz")
+            self.interpreter.disableJournal()
+
+    def scheduleNextStep(self):
+
+        # The next step is a full step away at the requested rate
+        self.accumulator = 0.0
+        self.accumulated_time = perf_counter()
+
+    def runDue(self):
+        interpreter = self.interpreter
+        if not self.running or not interpreter.canStep():
+            return
+
+        now = perf_counter()
+        if now >= self.frame_time + self.frame_seconds:
+            self.frame_time = now
+            self.frame_used = 0.0
+        budget = self.frame_seconds * DRIVER_FRAME_SHARE - self.frame_used
+        if budget <= 0:
+            return
+
+        if self.hertz is None:
+            max_steps = None
+        else:
+            self.accumulator = min(self.accumulator + (now - self.accumulated_time) * self.hertz,
+                                   max(1.0, self.hertz * DRIVER_MAX_LAG_SECONDS))
+            self.accumulated_time = now
+            max_steps = int(self.accumulator)
+            if max_steps == 0:
+                return
+
+        result = interpreter.run(max_steps, deadline=now + min(DRIVER_SLICE_SECONDS, budget))
+        self.frame_used += perf_counter() - now
+        if self.hertz is not None:
+            self.accumulator -= result.steps
+
+        if result.reason == RunStopReason.Error:
+            logging.warning(f"Program execution failed due to runtime error:\r\n\t{result.detail}")
+        if result.finished():
+            self.running = False
+
+    def measureRate(self):
+        now = perf_counter()
+        step_count = self.interpreter.step_count
+        if not self.running or not self.interpreter.canStep():
+            self.achieved_hertz = 0.0
+        elif now - self.rate_time < DRIVER_RATE_SECONDS:
+            return
+        else:
+            self.achieved_hertz = max(0, step_count - self.rate_steps) / (now - self.rate_time)
+        self.rate_steps = step_count
+        self.rate_time = now
+
+    def publish(self):
+        self.measureRate()
+        self.published_time = perf_counter()
+
+        if self.overview is not None:
+            self.overview.refresh(self.interpreter.memory, self.interpreter.ptr)
+
+        # Replacing the reference is atomic, so readers always see one whole snapshot
+        self.latest = BFSnapshot(self.interpreter, self.running, self.applied, self.heatmap, self.hertz,
+                                 self.achieved_hertz, self.view, self.overview)
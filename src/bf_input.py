@@ -0,0 +1,115 @@
+import re
+import sys
+
+from collections import deque
+from itertools import chain
+
+
+# Values in text input are integers separated by commas and/or whitespace
+INPUT_SEPARATOR = re.compile(r"[\s,]+")
+
+
+class BFInputError(Exception):
+    pass
+
+
+class BFInputProvider():
+
+    # Supplies values for the ',' command. read() returns None once the provider is exhausted, which leaves the
+    # interpreter waiting for input as if there were no provider
+    def read(self) -> int:
+        raise NotImplementedError
+
+    # Queues values to be read once everything the provider already holds has been read
+    def push(self, values: list):
+        raise NotImplementedError
+
+
+class ListInputProvider(BFInputProvider):
+
+    # Values are consumed in order. More can be queued at any time with push()
+    def __init__(self, values: list = []):
+        self.values = deque(values)
+
+    def read(self) -> int:
+        return self.values.popleft() if len(self.values) > 0 else None
+
+    def push(self, values: list):
+        self.values.extend(values)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class GeneratorInputProvider(BFInputProvider):
+
+    def __init__(self, values):
+        self.values = iter(values)
+
+    def read(self) -> int:
+        return next(self.values, None)
+
+    def push(self, values: list):
+        self.values = chain(self.values, values)
+
+
+class StreamInputProvider(BFInputProvider):
+
+    # Text streams hold integers separated by commas or whitespace and are read one line at a time. Binary streams
+    # supply one value per byte
+    def __init__(self, stream, binary: bool = False):
+        self.stream = stream
+        self.binary = binary
+        self.exhausted = False
+        self.pending = deque()
+        self.pushed = deque()
+
+    def read(self) -> int:
+        while len(self.pending) == 0 and not self.exhausted:
+            self.readStream()
+        if len(self.pending) > 0:
+            return self.pending.popleft()
+        return self.pushed.popleft() if len(self.pushed) > 0 else None
+
+    def readStream(self):
+        if self.binary:
+            data = self.stream.read(1)
+            if len(data) > 0:
+                self.pending.append(data[0])
+            else:
+                self.exhausted = True
+            return
+
+        line = self.stream.readline()
+        if line == "":
+            self.exhausted = True
+        for token in INPUT_SEPARATOR.split(line.strip()):
+            if token == "":
+                continue
+            if not token.isdigit():
+                raise BFInputError(f"Input value '{token}' must be a non-negative integer")
+            self.pending.append(int(token))
+
+    def push(self, values: list):
+        self.pushed.extend(values)
+
+
+class FileInputProvider(StreamInputProvider):
+
+    def __init__(self, path: str, binary: bool = False):
+        super().__init__(open(path, "rb" if binary else "r"), binary)
+
+    def close(self):
+        self.stream.close()
+
+
+class StdinInputProvider(StreamInputProvider):
+
+    # sys.stdin is looked up on first use so it can be replaced after the provider is created
+    def __init__(self, binary: bool = False):
+        super().__init__(None, binary)
+
+    def read(self) -> int:
+        if self.stream is None:
+            self.stream = sys.stdin.buffer if self.binary else sys.stdin
+        return super().read()
@@ -0,0 +1,227 @@
+from enum import IntEnum
+from src.bf_analysis import widen
+from src.bf_commands import BFCommand
+
+
+class BFOpCode(IntEnum):
+    Add = 1
+    Move = 2
+    JumpIfZero = 3
+    JumpIfNonZero = 4
+    PrintByte = 5
+    ReadByte = 6
+    LinearLoop = 7
+    SafeMove = 8
+
+
+# Every op is a tuple of (code, arg, pc, length, low, high, data)
+#   code:   BFOpCode of the fused instruction. SafeMove is a Move proven to stay inside memory, which is never checked
+#   arg:    Net cell/pointer change for Add/Move, target op index for jumps
+#   pc:     Tape position of the first command covered by the op
+#   length: Number of tape commands covered by the op, or by the loop body for LinearLoop
+#   low:    Lowest running total reached while applying the op (Add/Move), or lowest pointer offset (LinearLoop)
+#   high:   Highest running total reached while applying the op (Add/Move), or highest pointer offset (LinearLoop)
+#   data:   LinearLoop only. (counter step, counter low, counter high, ((offset, delta, low, high), ...))
+OP_CODE = 0
+OP_ARG = 1
+OP_PC = 2
+OP_LENGTH = 3
+OP_LOW = 4
+OP_HIGH = 5
+OP_DATA = 6
+
+# Number of loop back edges taken between checks of a run() deadline
+DEADLINE_CHECK_INTERVAL = 1024
+
+
+class BFProgram():
+
+    def __init__(self, ops: list, op_index: list, memory_size: int = None):
+        self.ops = ops
+
+        # Maps every tape position to the op starting there, -1 inside of a fused run
+        self.opIndex = op_index
+
+        # Memory size SafeMove ops were proven for. None when every Move is checked
+        self.memory_size = memory_size
+
+
+def fuseRun(tape: list, pc: int, up: BFCommand, down: BFCommand) -> tuple:
+    total = 0
+    low = 0
+    high = 0
+    end = pc
+    while end < len(tape) and tape[end] in [up, down]:
+        total += 1 if tape[end] == up else -1
+        low = min(low, total)
+        high = max(high, total)
+        end += 1
+    return total, end - pc, low, high
+
+
+def linearLoopProfile(tape: list, start_pc: int, end_pc: int):
+
+    # A loop body made only of +-<> that returns the pointer to where it started changes every cell by a fixed
+    # amount per iteration, so the whole loop can be applied at once
+    offset = 0
+    low_offset = 0
+    high_offset = 0
+    cells = {0: [0, 0, 0]}
+    for pc in range(start_pc + 1, end_pc):
+        cmd = tape[pc]
+        if cmd == BFCommand.CellPtrRight:
+            offset += 1
+            high_offset = max(high_offset, offset)
+        elif cmd == BFCommand.CellPtrLeft:
+            offset -= 1
+            low_offset = min(low_offset, offset)
+        elif cmd in [BFCommand.Increment, BFCommand.Decrement]:
+            cell = cells.setdefault(offset, [0, 0, 0])
+            cell[0] += 1 if cmd == BFCommand.Increment else -1
+            cell[1] = min(cell[1], cell[0])
+            cell[2] = max(cell[2], cell[0])
+        else:
+            return None
+
+    # Loops that count their start cell up or leave it unchanged can only end in an error
+    counter = cells.pop(0)
+    if offset != 0 or counter[0] >= 0:
+        return None
+
+    effects = tuple((o, delta, low, high) for o, (delta, low, high) in sorted(cells.items()))
+    return low_offset, high_offset, (-counter[0], counter[1], counter[2], effects)
+
+
+def applyLinearLoop(memory, ptr: int, max_value: int, data: tuple, max_iterations: int) -> int:
+    counter_step, counter_low, counter_high, effects = data
+
+    # Returns the number of iterations applied, or 0 when any iteration would leave the legal cell range or the
+    # loop needs more than max_iterations
+    value = memory[ptr]
+    if value % counter_step != 0 or counter_step + counter_low < 0 or value + counter_high > max_value:
+        return 0
+    iterations = value // counter_step
+    if iterations > max_iterations:
+        return 0
+
+    # Cell values change linearly with each iteration, so checking the first and last iteration covers every other
+    last = iterations - 1
+    for offset, delta, low, high in effects:
+        start = memory[ptr + offset]
+        final = start + last * delta
+        if min(start, final) + low < 0 or max(start, final) + high > max_value:
+            return 0
+
+    for offset, delta, low, high in effects:
+        memory[ptr + offset] += iterations * delta
+    memory[ptr] = 0
+    return iterations
+
+
+def loopNets(ops: list) -> dict:
+
+    # Net pointer change (low, high) of one iteration of every loop, keyed by the index of its opening op. Loops are
+    # summarised inside out with an explicit stack, as BFPointerAnalysis does for commands
+    nets = {}
+    frames = [[0, 0]]
+    starts = []
+    for index, op in enumerate(ops):
+        code = op[OP_CODE]
+        if code == BFOpCode.Move:
+            frame = frames[-1]
+            frame[0] += op[OP_ARG]
+            frame[1] += op[OP_ARG]
+        elif code in [BFOpCode.JumpIfZero, BFOpCode.LinearLoop]:
+            frames.append([0, 0])
+            starts.append(index)
+        elif code == BFOpCode.JumpIfNonZero:
+            net_low, net_high = frames.pop()
+            nets[starts.pop()] = (net_low, net_high)
+            frame = frames[-1]
+            frame[0], frame[1] = widen(frame[0], frame[1], net_low, net_high)
+    return nets
+
+
+def markSafeMoves(ops: list, memory_size: int, nets: dict):
+
+    # Replaces every Move that can never take the pointer out of memory, for a program starting at cell 0, with
+    # SafeMove. The absolute pointer interval is carried through the fused ops, so every run of '<' and '>' is
+    # checked once rather than command by command. nets holds the loopNets of ops
+    low, high = 0, 0
+    loops = []
+    for index, op in enumerate(ops):
+        code = op[OP_CODE]
+        if code in [BFOpCode.JumpIfZero, BFOpCode.LinearLoop]:
+            low, high = widen(low, high, *nets[index])
+            loops.append((low, high))
+        elif code == BFOpCode.JumpIfNonZero:
+            low, high = loops.pop()
+        elif code == BFOpCode.Move:
+            if low + op[OP_LOW] >= 0 and high + op[OP_HIGH] < memory_size:
+                ops[index] = (BFOpCode.SafeMove,) + op[1:]
+            low += op[OP_ARG]
+            high += op[OP_ARG]
+
+
+def compileTape(tape: list, idioms: bool = True, memory_size: int = None) -> BFProgram:
+
+    # With a fixed memory_size, Moves proven to stay in bounds for a program starting at cell 0 are compiled to
+    # SafeMove
+    ops = []
+    op_index = [-1] * (len(tape) + 1)
+    open_loops = []
+    has_loops = False
+
+    pc = 0
+    while pc < len(tape):
+        cmd = tape[pc]
+        op_index[pc] = len(ops)
+
+        if cmd in [BFCommand.Increment, BFCommand.Decrement]:
+            total, length, low, high = fuseRun(tape, pc, BFCommand.Increment, BFCommand.Decrement)
+            ops.append((BFOpCode.Add, total, pc, length, low, high, None))
+            pc += length
+            continue
+
+        elif cmd in [BFCommand.CellPtrLeft, BFCommand.CellPtrRight]:
+            total, length, low, high = fuseRun(tape, pc, BFCommand.CellPtrRight, BFCommand.CellPtrLeft)
+            ops.append((BFOpCode.Move, total, pc, length, low, high, None))
+            pc += length
+            continue
+
+        elif cmd == BFCommand.StartWhile:
+            # Patched with the jump target once the matching close is compiled
+            open_loops.append((len(ops), pc))
+            ops.append(None)
+
+        elif cmd == BFCommand.EndWhile:
+            if len(open_loops) == 0:
+                raise ValueError(f"End of loop with no matching start at command {pc}")
+            start, start_pc = open_loops.pop()
+            has_loops = True
+            profile = linearLoopProfile(tape, start_pc, pc) if idioms else None
+            if profile is None:
+                ops[start] = (BFOpCode.JumpIfZero, len(ops) + 1, start_pc, 1, 0, 0, None)
+            else:
+                # Behaves as JumpIfZero whenever the closed form cannot be applied
+                low, high, data = profile
+                ops[start] = (BFOpCode.LinearLoop, len(ops) + 1, start_pc, pc - start_pc - 1, low, high, data)
+            ops.append((BFOpCode.JumpIfNonZero, start + 1, pc, 1, 0, 0, None))
+
+        elif cmd == BFCommand.PrintByte:
+            ops.append((BFOpCode.PrintByte, 0, pc, 1, 0, 0, None))
+
+        elif cmd == BFCommand.ReadByte:
+            ops.append((BFOpCode.ReadByte, 0, pc, 1, 0, 0, None))
+
+        pc += 1
+
+    if len(open_loops) > 0:
+        raise ValueError(f"No close found for loop start at command {open_loops[-1][1]}")
+
+    op_index[len(tape)] = len(ops)
+
+    # Without loops the pointer position is known exactly, so no loops need summarising
+    if memory_size is not None:
+        markSafeMoves(ops, memory_size, loopNets(ops) if has_loops else {})
+    return BFProgram(ops, op_index, memory_size)
@@ -0,0 +1,59 @@
+from array import array
+
+
+class BFJournal():
+
+    # Ring buffer of the interpreter state from before each step. Only the one cell a step can change is kept, so
+    # recording costs the same for any memory size. The oldest entries are overwritten once capacity is reached
+    def __init__(self, capacity: int = 10000, value_typecode: str = "Q"):
+        if capacity < 1:
+            raise ValueError("Journal capacity must be at least 1 entry")
+
+        self.capacity = capacity
+        self.pcs = array("q", [0]) * capacity
+        self.ptrs = array("q", [0]) * capacity
+        self.cells = array("q", [0]) * capacity
+        self.values = array(value_typecode, [0]) * capacity if value_typecode is not None else [0] * capacity
+        self.steps = array("Q", [0]) * capacity
+        self.states = array("b", [0]) * capacity
+
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    # cell is -1 when the pointer was outside of memory and no cell value was kept
+    def record(self, pc: int, ptr: int, cell: int, value: int, step_count: int, state: int):
+        head = self.head
+        self.pcs[head] = pc
+        self.ptrs[head] = ptr
+        self.cells[head] = cell
+        self.values[head] = value
+        self.steps[head] = step_count
+        self.states[head] = state
+
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def entry(self, index: int) -> tuple:
+        return (self.pcs[index], self.ptrs[index], self.cells[index], self.values[index], self.steps[index],
+                self.states[index])
+
+    # Removes and returns the newest entry as (pc, ptr, cell, value, step_count, state), or None when empty
+    def pop(self) -> tuple:
+        if self.count == 0:
+            return None
+        self.head = (self.head - 1) % self.capacity
+        self.count -= 1
+        return self.entry(self.head)
+
+    # Returns up to count of the newest entries, oldest first
+    def recent(self, count: int) -> list:
+        count = min(count, self.count)
+        return [self.entry((self.head - count + i) % self.capacity) for i in range(0, count)]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
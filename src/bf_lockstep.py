@@ -0,0 +1,258 @@
+import numpy as np
+
+from time import perf_counter
+from src.bf import BFInitError, BFInterpreter, BFRuntimeError, ProgramState
+from src.bf_input import ListInputProvider
+from src.bf_ir import OP_PC, BFOpCode
+from src.bf_output import CollectorOutputSink
+
+
+# Largest cell value lockstep memories hold. Keeps every intermediate sum well inside int64
+LOCKSTEP_MAX_VALUE = 0xFFFFFFFF
+
+# Lockstep iterations between checks of a run() deadline
+LOCKSTEP_DEADLINE_INTERVAL = 64
+
+
+def lockstepDtype(max_value: int):
+    if max_value <= 0xFF:
+        return np.uint8
+    if max_value <= 0xFFFF:
+        return np.uint16
+    return np.uint32
+
+
+class BFLockstep():
+
+    # Runs one program over many initial memories at once. Memories are the rows of a 2-D array and every lane has
+    # its own pointer, fused op, step count and state. Each iteration executes the lowest op any running lane is
+    # waiting on, for every lane waiting on it, so lanes that diverge in a loop fall back into step once they leave
+    # it. An op that would fail or pass a lane's step budget is replayed for that lane alone through step(), so
+    # states, errors and step counts are exactly those of a BFInterpreter given the same memory
+    def __init__(self, program: str, memories: list, memory_size: int, max_value: int = 256, default_value: int = 0,
+                 input_values: list = None):
+
+        if len(memories) < 1:
+            raise BFInitError("Lockstep execution needs at least 1 memory")
+
+        if max_value > LOCKSTEP_MAX_VALUE:
+            raise BFInitError(f"Lockstep execution supports a maximum cell value up to {LOCKSTEP_MAX_VALUE}")
+
+        # A scalar interpreter validates the tape and every memory the way a single run would
+        self.template = BFInterpreter(memory_size, max_value, paged=False)
+        self.template.setTape(program)
+        self.program = self.template.compiledProgram()
+
+        self.lane_count = len(memories)
+        self.memory_size = memory_size
+        self.max_value = max_value
+        self.memory = np.zeros((self.lane_count, memory_size), dtype=lockstepDtype(max_value))
+        for lane, values in enumerate(memories):
+            self.template.setMemory(values, default_value)
+            self.memory[lane] = list(self.template.memory)
+
+        # Every lane reads the same input values from its own position
+        self.input_values = list(input_values) if input_values is not None else []
+        for value in self.input_values:
+            if type(value) is not int or value < 0 or value > max_value:
+                raise BFInitError(f"Provided byte input ({value}) must be in the range 0 -> {max_value}")
+        self.input_array = np.array(self.input_values + [0], dtype=np.int64)
+        self.input_positions = np.zeros(self.lane_count, dtype=np.int64)
+
+        self.ptrs = np.zeros(self.lane_count, dtype=np.int64)
+        self.pcs = np.zeros(self.lane_count, dtype=np.int64)
+        self.step_counts = np.zeros(self.lane_count, dtype=np.int64)
+
+        # Fused op each lane runs next. -1 while a lane is stopped part way through a fused run
+        self.ops = np.zeros(self.lane_count, dtype=np.int64)
+        self.running = np.ones(self.lane_count, dtype=bool)
+
+        self.states = [ProgramState.Ready] * self.lane_count
+        self.stateDetails = [""] * self.lane_count
+        self.outputs = [[] for _ in range(0, self.lane_count)]
+
+        self.op_pcs = np.array([op[OP_PC] for op in self.program.ops] + [len(self.template.tape)], dtype=np.int64)
+
+    def laneInterpreter(self, lane: int) -> BFInterpreter:
+
+        # A scalar interpreter holding the current state of lane
+        interpreter = BFInterpreter(self.memory_size, self.max_value, paged=False)
+        interpreter.tape = self.template.tape
+        interpreter.jumpTable = self.template.jumpTable
+        interpreter.program = self.program
+        interpreter.setMemory(self.memory[lane].tolist())
+        interpreter.ptr = int(self.ptrs[lane])
+        interpreter.pc = int(self.pcs[lane])
+        interpreter.step_count = int(self.step_counts[lane])
+        interpreter.state = self.states[lane]
+        interpreter.stateDetail = self.stateDetails[lane]
+        interpreter.output = CollectorOutputSink(self.max_value)
+        interpreter.input = ListInputProvider(self.input_values[self.input_positions[lane]:])
+        return interpreter
+
+    def replayLane(self, lane: int, step_limit: int):
+
+        # Steps one lane through step() until it reaches the start of a fused op, stops, or hits step_limit
+        self.pcs[lane] = self.op_pcs[self.ops[lane]] if self.ops[lane] >= 0 else self.pcs[lane]
+        interpreter = self.laneInterpreter(lane)
+        unread = len(interpreter.input)
+        op_index = self.program.opIndex
+        try:
+            while interpreter.step_count < step_limit:
+                interpreter.step()
+                if not interpreter.canStep() or op_index[interpreter.pc] >= 0:
+                    break
+        except BFRuntimeError:
+            pass
+
+        self.memory[lane] = list(interpreter.memory)
+        self.ptrs[lane] = interpreter.ptr
+        self.pcs[lane] = interpreter.pc
+        self.step_counts[lane] = interpreter.step_count
+        self.states[lane] = interpreter.state
+        self.stateDetails[lane] = interpreter.stateDetail
+        self.outputs[lane].extend(interpreter.output.values)
+        self.input_positions[lane] += unread - len(interpreter.input)
+        self.ops[lane] = op_index[interpreter.pc]
+        self.running[lane] = interpreter.canStep()
+
+    def run(self, max_steps: int = None, deadline: float = None) -> int:
+
+        # Runs every lane until it halts, fails, waits for input, or executes max_steps more steps. Returns the number
+        # of lanes that can still run
+        for lane in np.flatnonzero(self.running):
+            self.states[lane] = ProgramState.Running
+
+        if max_steps is None:
+            limits = np.full(self.lane_count, np.iinfo(np.int64).max, dtype=np.int64)
+        else:
+            limits = self.step_counts + max_steps
+
+        # Lanes stopped part way through a fused run finish it one command at a time
+        for lane in np.flatnonzero(self.running & (self.ops < 0)):
+            self.replayLane(lane, int(limits[lane]))
+
+        ops = self.program.ops
+        op_count = len(ops)
+        memory = self.memory
+        ticks = LOCKSTEP_DEADLINE_INTERVAL
+
+        while True:
+            active = np.flatnonzero(self.running & (self.step_counts < limits))
+            if len(active) == 0:
+                break
+
+            ticks -= 1
+            if ticks == 0:
+                ticks = LOCKSTEP_DEADLINE_INTERVAL
+                if deadline is not None and perf_counter() >= deadline:
+                    break
+
+            waiting = self.ops[active]
+            i = int(waiting.min())
+            lanes = active[waiting == i]
+            code, arg, pc, length, low, high, data = ops[i]
+            ptrs = self.ptrs[lanes]
+            remaining = limits[lanes] - self.step_counts[lanes]
+
+            if code == BFOpCode.Add:
+                values = memory[lanes, ptrs].astype(np.int64)
+                fits = (values + high <= self.max_value) & (values + low >= 0) & (remaining >= length)
+                memory[lanes[fits], ptrs[fits]] = values[fits] + arg
+                self.step_counts[lanes[fits]] += length
+                self.ops[lanes[fits]] += 1
+                for lane in lanes[~fits]:
+                    self.replayLane(lane, int(limits[lane]))
+
+            elif code == BFOpCode.SafeMove:
+                fits = remaining >= length
+                self.ptrs[lanes[fits]] += arg
+                self.step_counts[lanes[fits]] += length
+                self.ops[lanes[fits]] += 1
+                for lane in lanes[~fits]:
+                    self.replayLane(lane, int(limits[lane]))
+
+            elif code == BFOpCode.Move:
+                fits = (ptrs + high < self.memory_size) & (ptrs + low >= 0) & (remaining >= length)
+                self.ptrs[lanes[fits]] += arg
+                self.step_counts[lanes[fits]] += length
+                self.ops[lanes[fits]] += 1
+                for lane in lanes[~fits]:
+                    self.replayLane(lane, int(limits[lane]))
+
+            elif code == BFOpCode.JumpIfZero:
+                zero = memory[lanes, ptrs] == 0
+                self.step_counts[lanes] += 1
+                self.ops[lanes] = np.where(zero, arg, i + 1)
+
+            elif code == BFOpCode.LinearLoop:
+                self.runLinearLoop(i, lanes, ptrs, remaining)
+
+            elif code == BFOpCode.JumpIfNonZero:
+                # Counts both the close and the re-evaluated loop start, as the fused engine does
+                fits = remaining >= 2
+                zero = memory[lanes[fits], ptrs[fits]] == 0
+                self.step_counts[lanes[fits]] += 2
+                self.ops[lanes[fits]] = np.where(zero, i + 1, arg)
+                for lane in lanes[~fits]:
+                    self.replayLane(lane, int(limits[lane]))
+
+            elif code == BFOpCode.PrintByte:
+                for lane, value in zip(lanes.tolist(), memory[lanes, ptrs].tolist()):
+                    self.outputs[lane].append(value)
+                self.step_counts[lanes] += 1
+                self.ops[lanes] += 1
+
+            else:
+                # The read is counted whether or not there was a value to read
+                positions = self.input_positions[lanes]
+                has_input = positions < len(self.input_values)
+                memory[lanes[has_input], ptrs[has_input]] = self.input_array[positions[has_input]]
+                self.input_positions[lanes[has_input]] += 1
+                self.ops[lanes[has_input]] += 1
+                self.step_counts[lanes] += 1
+                for lane in lanes[~has_input]:
+                    self.running[lane] = False
+                    self.states[lane] = ProgramState.WaitingForInput
+
+            halted = lanes[self.ops[lanes] == op_count]
+            for lane in halted:
+                self.running[lane] = False
+                self.states[lane] = ProgramState.Halted
+                self.stateDetails[lane] = "End of Tape"
+
+        # Lanes that stopped between ops resume from the start of the next one
+        between = self.ops >= 0
+        self.pcs[between] = self.op_pcs[self.ops[between]]
+        return int(np.count_nonzero(self.running))
+
+    def runLinearLoop(self, i: int, lanes, ptrs, remaining):
+        code, arg, pc, length, low, high, data = self.program.ops[i]
+        counter_step, counter_low, counter_high, effects = data
+        memory = self.memory
+        values = memory[lanes, ptrs].astype(np.int64)
+
+        # Lanes where the loop is skipped, or cannot be applied in closed form, behave as a plain loop start
+        iterations = values // counter_step
+        closed = ((values != 0) & (values % counter_step == 0) & (counter_step + counter_low >= 0) &
+                  (values + counter_high <= self.max_value) & (ptrs + low >= 0) & (ptrs + high < self.memory_size) &
+                  (iterations <= (remaining - 1) // (length + 2)))
+
+        # Cell values change linearly with each iteration, so checking the first and last iteration covers every other
+        cells = []
+        for offset, delta, cell_low, cell_high in effects:
+            cell_ptrs = np.clip(ptrs + offset, 0, self.memory_size - 1)
+            start = memory[lanes, cell_ptrs].astype(np.int64)
+            final = start + (iterations - 1) * delta
+            closed &= (np.minimum(start, final) + cell_low >= 0) & (np.maximum(start, final) + cell_high <= self.max_value) # noqa
+            cells.append((cell_ptrs, start, delta))
+
+        for cell_ptrs, start, delta in cells:
+            memory[lanes[closed], cell_ptrs[closed]] = start[closed] + iterations[closed] * delta
+        memory[lanes[closed], ptrs[closed]] = 0
+        self.step_counts[lanes[closed]] += 1 + iterations[closed] * (length + 2)
+        self.ops[lanes[closed]] = arg
+
+        stepped = lanes[~closed]
+        self.step_counts[stepped] += 1
+        self.ops[stepped] = np.where(values[~closed] == 0, arg, i + 1)
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from src.bf_analysis import analyzePointer
+from src.bf_commands import BFCommand
+
+
+# Loop results kept by default before the least recently used is evicted
+LOOP_CACHE_CAPACITY = 4096
+
+# Widest window of cells a cached loop can touch. Wider windows cost more to compare than most loops cost to run
+LOOP_CACHE_WINDOW_LIMIT = 32
+
+
+class BFLoopCache():
+
+    # Remembers what whole loops did, keyed by the loop and the cells it can touch on entry. A loop is cached when
+    # every iteration returns the pointer to where it started and never reads or prints, so the pointer analysis
+    # bounds it to a fixed window around the pointer and its result only depends on the cells in that window
+    def __init__(self, tape: list, capacity: int = LOOP_CACHE_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Loop cache capacity must be at least 1 entry")
+        self.capacity = capacity
+
+        # Loop '[' position -> (low, high) offsets of its window from the pointer
+        self.windows: dict = {}
+
+        # One pass over the tape finds the loops that read or print, including through nested loops
+        summaries = analyzePointer(tape).loop_summaries
+        open_loops = []
+        for pc, cmd in enumerate(tape):
+            if cmd in [BFCommand.PrintByte, BFCommand.ReadByte] and len(open_loops) > 0:
+                open_loops[-1][1] = True
+            elif cmd == BFCommand.StartWhile:
+                open_loops.append([pc, False])
+            elif cmd == BFCommand.EndWhile:
+                start, io = open_loops.pop()
+                if len(open_loops) > 0:
+                    open_loops[-1][1] = open_loops[-1][1] or io
+                net_low, net_high, low, high = summaries[start]
+                if not io and net_low == 0 and net_high == 0 and high - low + 1 <= LOOP_CACHE_WINDOW_LIMIT:
+                    self.windows[start] = (low, high)
+
+        # (loop position, window on entry) -> (window on exit, steps taken from the '[' to leaving the loop)
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple:
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def store(self, key: tuple, window: tuple, steps: int):
+        self.results[key] = (window, steps)
+        self.results.move_to_end(key)
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from src.bf_commands import BFCommand
+from src.bf_memory import PagedMemory, memorySnapshot
+
+
+# Loop heads remembered by default. Loops whose state takes longer than this many loop closes to repeat are missed
+LOOP_DETECTOR_CAPACITY = 4096
+
+# Memory snapshots kept for states whose fingerprint has already been seen
+LOOP_SNAPSHOT_LIMIT = 8
+
+HASH_MASK = (1 << 64) - 1
+
+
+def cellHash(cell: int, value: int) -> int:
+
+    # 64 bit mix of a cell and its value, so the memory hash is a sum that one write can update
+    h = (cell * 0x9E3779B97F4A7C15 + value * 0xC2B2AE3D27D4EB4F + 0x165667B19E3779F9) & HASH_MASK
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+    return h ^ (h >> 31)
+
+
+class BFLoopDetector():
+
+    # Fingerprints (pc, ptr, memory) at every loop close. Memory is hashed as the sum of cellHash() over every cell
+    # that differs from the default value, updated on each write instead of rehashing the whole memory. A program
+    # that reaches the same full state twice can never halt, since the next state only depends on the current one
+    def __init__(self, capacity: int = LOOP_DETECTOR_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Loop detector capacity must be at least 1 fingerprint")
+        self.capacity = capacity
+
+        self.hash = 0
+        self.default = 0
+
+        # Memory changed outside of step(), so the hash is rebuilt before the next fingerprint
+        self.dirty = True
+
+        # (ptr, old value) of a ',' whose value is only known once the next step starts
+        self.pending_read: tuple = None
+
+        # Fingerprint -> step count it was first seen at, oldest first
+        self.seen = OrderedDict()
+
+        # Fingerprint -> (step count, memory snapshot) for fingerprints seen more than once
+        self.snapshots = OrderedDict()
+
+        # Steps between the repeated states once a loop has been found
+        self.period = 0
+
+    def reset(self):
+        self.dirty = True
+        self.clear()
+
+    def clear(self):
+        self.seen.clear()
+        self.snapshots.clear()
+
+    def rehash(self, memory):
+        self.default = memory.default if type(memory) is PagedMemory else 0
+        self.hash = 0
+        if type(memory) is PagedMemory:
+            for index, page in memory.pages.items():
+                self.hashCells(page, index * memory.page_size)
+        else:
+            self.hashCells(memory, 0)
+        self.dirty = False
+        self.pending_read = None
+
+    def hashCells(self, cells, start: int):
+        default = self.default
+        for cell, value in enumerate(cells, start):
+            if value != default:
+                self.hash = (self.hash + cellHash(cell, value)) & HASH_MASK
+
+    def write(self, cell: int, old: int, new: int):
+        h = self.hash
+        if old != self.default:
+            h -= cellHash(cell, old)
+        if new != self.default:
+            h += cellHash(cell, new)
+        self.hash = h & HASH_MASK
+
+    def onStep(self, interpreter) -> bool:
+
+        # Called before every step. True when the state about to execute has provably been reached before
+        memory = interpreter.memory
+        if self.dirty:
+            self.rehash(memory)
+        elif self.pending_read is not None:
+            ptr, old = self.pending_read
+            self.pending_read = None
+            self.write(ptr, old, memory[ptr])
+
+        cmd = interpreter.tape[interpreter.pc]
+        if cmd == BFCommand.Increment:
+            value = memory[interpreter.ptr]
+            if value < interpreter.max_value:
+                self.write(interpreter.ptr, value, value + 1)
+
+        elif cmd == BFCommand.Decrement:
+            value = memory[interpreter.ptr]
+            if value > 0:
+                self.write(interpreter.ptr, value, value - 1)
+
+        elif cmd == BFCommand.ReadByte:
+            # Input can differ every time the same state reads it, so earlier states prove nothing afterwards
+            self.pending_read = (interpreter.ptr, memory[interpreter.ptr])
+            self.clear()
+
+        elif cmd == BFCommand.EndWhile:
+            return self.repeated(interpreter)
+
+        return False
+
+    def repeated(self, interpreter) -> bool:
+        fingerprint = (interpreter.pc, interpreter.ptr, self.hash)
+        steps = interpreter.step_count
+        if fingerprint not in self.seen:
+            self.seen[fingerprint] = steps
+            if len(self.seen) > self.capacity:
+                self.seen.popitem(last=False)
+            return False
+
+        # Hashes can collide, so a repeat is only proven once the full memory matches a snapshot taken at an earlier
+        # visit. A true loop reaches the state again one period later, where the snapshot is compared
+        snapshot = memorySnapshot(interpreter.memory)
+        if fingerprint in self.snapshots:
+            earlier_steps, earlier = self.snapshots[fingerprint]
+            if earlier == snapshot:
+                self.period = steps - earlier_steps
+                return True
+
+        self.snapshots[fingerprint] = (steps, snapshot)
+        self.snapshots.move_to_end(fingerprint)
+        if len(self.snapshots) > LOOP_SNAPSHOT_LIMIT:
+            self.snapshots.popitem(last=False)
+        return False
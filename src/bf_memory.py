@@ -0,0 +1,194 @@
+from array import array
+
+
+# Memories larger than this are paged unless the caller decides otherwise
+PAGED_MEMORY_THRESHOLD = 1 << 24
+
+
+# Smallest storage for cells in the range 0 -> max_value. None means the cells need a plain list
+def memoryTypecode(max_value: int) -> str:
+    if max_value <= 0xFF:
+        return "B"
+    for typecode in ["H", "I", "L", "Q"]:
+        if max_value < 1 << (8 * array(typecode).itemsize):
+            return typecode
+    return None
+
+
+def createMemory(size: int, max_value: int, value: int = 0):
+    typecode = memoryTypecode(max_value)
+    if typecode == "B":
+        return bytearray([value]) * size
+    elif typecode is not None:
+        return array(typecode, [value]) * size
+    return [value] * size
+
+
+def fillMemory(memory, start: int, values, value: int = 0):
+    if type(memory) is PagedMemory:
+        memory.fill(values, value)
+        return
+
+    # Copies values to memory from start, then sets every remaining cell to value, without a per cell Python loop
+    end = start + len(values)
+    if len(values) > 0:
+        if type(memory) is bytearray:
+            memory[start:end] = bytes(values)
+        elif type(memory) is array:
+            memory[start:end] = array(memory.typecode, values)
+        else:
+            memory[start:end] = list(values)
+
+    remaining = len(memory) - end
+    if remaining > 0:
+        if type(memory) is bytearray:
+            memory[end:] = bytearray([value]) * remaining
+        elif type(memory) is array:
+            memory[end:] = array(memory.typecode, [value]) * remaining
+        else:
+            memory[end:] = [value] * remaining
+
+
+def memoryView(memory):
+
+    # Read-only access for renderers and tests. Lists have no buffer, so they are shown as a tuple copy
+    if type(memory) is PagedMemory:
+        return ReadOnlyMemory(memory)
+    if type(memory) is list:
+        return tuple(memory)
+    return memoryview(memory).toreadonly()
+
+
+def memorySnapshot(memory):
+
+    # An immutable copy that compares equal to the snapshot of any memory holding the same cells. Paged memory is
+    # copied page by page, so it only compares equal when the same pages have been allocated
+    if type(memory) is PagedMemory:
+        return len(memory), tuple(sorted((index, memorySnapshot(page)) for index, page in memory.pages.items()))
+    if type(memory) is bytearray:
+        return bytes(memory)
+    if type(memory) is array:
+        return memory.tobytes()
+    return tuple(memory)
+
+
+def copyMemory(memory):
+
+    # A copy of the same type. Buffers are copied in one block, and paged memory only copies its allocated pages
+    if type(memory) is PagedMemory:
+        copy = PagedMemory(memory.size, memory.max_value, memory.default, memory.page_size)
+        copy.pages = {index: page[:] for index, page in memory.pages.items()}
+        return copy
+    return memory[:]
+
+
+class PagedMemory():
+
+    # Cells are stored in fixed size pages that are only allocated once a cell in them is written. Untouched
+    # cells read as the default value, so very large or growable memories only cost what the program uses
+    def __init__(self, size: int, max_value: int, value: int = 0, page_size: int = 4096):
+        self.size = size
+        self.max_value = max_value
+        self.default = value
+        self.page_size = page_size
+        self.pages: dict = {}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return self.window(*index.indices(self.size)[:2])
+        if index < 0 or index >= self.size:
+            raise IndexError(f"Cell {index} out of range for memory of {self.size} cells")
+        page = self.pages.get(index // self.page_size)
+        if page is None:
+            return self.default
+        return page[index % self.page_size]
+
+    def __setitem__(self, index: int, value: int):
+        if index < 0 or index >= self.size:
+            raise IndexError(f"Cell {index} out of range for memory of {self.size} cells")
+        page_index = index // self.page_size
+        page = self.pages.get(page_index)
+        if page is None:
+            if value == self.default:
+                return
+            page = self.pages[page_index] = createMemory(self.page_size, self.max_value, self.default)
+        page[index % self.page_size] = value
+
+    def __iter__(self):
+        for start in range(0, self.size, self.page_size):
+            yield from self.window(start, min(start + self.page_size, self.size))
+
+    def window(self, start: int, stop: int) -> list:
+        values = []
+        stop = min(stop, self.size)
+        while start < stop:
+            page_index, offset = divmod(start, self.page_size)
+            count = min(self.page_size - offset, stop - start)
+            page = self.pages.get(page_index)
+            if page is None:
+                values.extend([self.default] * count)
+            else:
+                values.extend(page[offset:offset + count])
+            start += count
+        return values
+
+    def fill(self, values, value: int = 0):
+        self.pages = {}
+        self.default = value
+        for i in range(0, len(values)):
+            self[i] = values[i]
+
+    def grow(self, size: int):
+        self.size = max(self.size, size)
+
+    def allocatedPages(self) -> int:
+        return len(self.pages)
+
+
+class ReadOnlyMemory():
+
+    def __init__(self, memory):
+        self.memory = memory
+
+    def __len__(self):
+        return len(self.memory)
+
+    def __getitem__(self, index):
+        return self.memory[index]
+
+    def __iter__(self):
+        return iter(self.memory)
+
+
+class MemoryWindow():
+
+    # Copy of a few spans of cells of a memory, for readers on another thread that only look at part of it. It has
+    # the length of the whole memory, and cells outside every span read as the default value
+    def __init__(self, memory, spans: list):
+        self.size = len(memory)
+        self.default = memory.default if type(memory) is PagedMemory else 0
+        self.spans = []
+        for start, stop in spans:
+            start, stop = max(0, start), min(self.size, stop)
+            if start < stop:
+                self.spans.append((start, stop, memory[start:stop]))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return [self[cell] for cell in range(*index.indices(self.size))]
+        if index < 0 or index >= self.size:
+            raise IndexError(f"Cell {index} out of range for memory of {self.size} cells")
+        for start, stop, values in self.spans:
+            if start <= index < stop:
+                return values[index - start]
+        return self.default
+
+    def __iter__(self):
+        for cell in range(0, self.size):
+            yield self[cell]
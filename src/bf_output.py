@@ -0,0 +1,92 @@
+import sys
+
+from collections import deque
+from src.bf_memory import createMemory
+
+
+# Pending writes a StreamOutputSink holds before flushing on its own
+OUTPUT_BUFFER_LIMIT = 8192
+
+
+class BFOutputSink():
+
+    # Receives every cell printed by the '.' command. The interpreter calls flush() when the program halts, waits for
+    # input, fails, and at the end of every run(), so sinks are free to buffer writes in between
+    def write(self, ptr: int, value: int):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+
+class StreamOutputSink(BFOutputSink):
+
+    # Writes "Cell[ptr]: value" lines to a text stream in bulk. Without a stream, sys.stdout is looked up at flush
+    def __init__(self, stream=None, limit: int = OUTPUT_BUFFER_LIMIT):
+        self.stream = stream
+        self.limit = limit
+        self.pending = []
+
+    def write(self, ptr: int, value: int):
+        self.pending.append(f"Cell[{ptr}]: {value}\n")
+        if len(self.pending) >= self.limit:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending) > 0:
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.write("".join(self.pending))
+            stream.flush()
+            self.pending = []
+
+
+class CollectorOutputSink(BFOutputSink):
+
+    # Keeps every printed value in memory, stored like the interpreter memory for the same max_value
+    def __init__(self, max_value: int = 255):
+        self.values = createMemory(0, max_value)
+
+    def write(self, ptr: int, value: int):
+        self.values.append(value)
+
+    def clear(self):
+        del self.values[:]
+
+
+class RingOutputSink(BFOutputSink):
+
+    # Keeps only the most recent printed values, oldest first
+    def __init__(self, capacity: int = 32):
+        if capacity < 1:
+            raise ValueError("Output capacity must be at least 1 value")
+        self.values = deque(maxlen=capacity)
+
+        # Total values written, including those no longer kept
+        self.count = 0
+
+    def write(self, ptr: int, value: int):
+        self.values.append(value)
+        self.count += 1
+
+    def copy(self) -> "RingOutputSink":
+        sink = RingOutputSink(self.values.maxlen)
+        sink.values.extend(self.values)
+        sink.count = self.count
+        return sink
+
+
+class CallbackOutputSink(BFOutputSink):
+
+    # Calls callback with the list of (ptr, value) pairs written since the last flush
+    def __init__(self, callback):
+        self.callback = callback
+        self.pending = []
+
+    def write(self, ptr: int, value: int):
+        self.pending.append((ptr, value))
+
+    def flush(self):
+        if len(self.pending) > 0:
+            pending = self.pending
+            self.pending = []
+            self.callback(pending)
@@ -0,0 +1,136 @@
+import copy
+import numpy as np
+from src.bf_memory import PagedMemory, ReadOnlyMemory
+
+
+# Cells reduced by the sweep on every refresh after the first, so a frame never costs more than this however large
+# the memory is. Columns around the pointer are reduced on every refresh as well. The driver refreshes between batches
+# of steps, so this is kept to a fraction of a millisecond
+OVERVIEW_SWEEP_CELLS = 1 << 19
+
+# Columns either side of the pointer's column reduced on every refresh
+OVERVIEW_POINTER_COLUMNS = 1
+
+
+def cellArray(cells) -> np.ndarray:
+
+    # Flat cells as a NumPy array of the cell size. Buffers are shared, not copied; lists are converted
+    if type(cells) is memoryview:
+        return np.frombuffer(cells, dtype=np.dtype(cells.format))
+    if type(cells) in [bytearray, bytes]:
+        return np.frombuffer(cells, dtype=np.uint8)
+    if hasattr(cells, "typecode"):
+        return np.frombuffer(cells, dtype=np.dtype(cells.typecode))
+    return np.array(cells)
+
+
+class BFMemoryOverview():
+
+    # Memory reduced to at most width columns of neighbouring cells, each the largest or mean value of its cells.
+    # Memory that grows doubles the number of cells the columns cover, so columns only move when the memory has grown
+    # past twice its size. Only the first refresh after a layout reduces every cell. Later refreshes reduce the
+    # columns around the pointer and the next OVERVIEW_SWEEP_CELLS cells of a sweep through memory. Paged memory is
+    # reduced page by page, with unallocated pages counted as the default value without being expanded
+    def __init__(self, width: int, reduction: str = "max"):
+        if reduction not in ["max", "mean"]:
+            raise ValueError(f"Overview reduction must be 'max' or 'mean', found '{reduction}'")
+
+        self.width = width
+        self.reduction = reduction
+
+        self.cell_count = 0
+        self.capacity = 0
+        self.bucket = 1
+        self.column_count = 0
+        self.columns: np.ndarray = np.zeros(0, dtype=np.float64)
+
+        # First column the next sweep reduces
+        self.sweep = 0
+
+    def layout(self, capacity: int):
+        self.capacity = capacity
+        self.bucket = max(1, -(-capacity // self.width))
+        self.column_count = max(1, -(-capacity // self.bucket))
+        self.columns = np.zeros(self.column_count, dtype=np.float64)
+        self.sweep = 0
+
+    def refresh(self, memory, ptr: int = 0):
+        if type(memory) is ReadOnlyMemory:
+            memory = memory.memory
+        self.cell_count = len(memory)
+        if self.cell_count > self.capacity or self.column_count == 0:
+            self.layout(max(self.cell_count, 2 * self.capacity) if self.capacity > 0 else max(1, self.cell_count))
+            self.reduceColumns(memory, 0, self.column_count)
+            return
+
+        column = min(max(ptr, 0) // self.bucket, self.column_count - 1)
+        self.reduceColumns(memory, max(0, column - OVERVIEW_POINTER_COLUMNS),
+                           min(self.column_count, column + OVERVIEW_POINTER_COLUMNS + 1))
+        stop = min(self.column_count, self.sweep + max(1, OVERVIEW_SWEEP_CELLS // self.bucket))
+        self.reduceColumns(memory, self.sweep, stop)
+        self.sweep = stop % self.column_count
+
+    def reduceColumns(self, memory, start: int, stop: int):
+        first = start * self.bucket
+        end = min(stop * self.bucket, self.cell_count)
+        count = stop - start
+
+        # Largest value or sum of the cells each column found in memory, and how many cells that was
+        found = np.full(count, -np.inf) if self.reduction == "max" else np.zeros(count)
+        covered = np.zeros(count, dtype=np.int64)
+        for offset, values in self.segments(memory, first, end):
+            if len(values) == 0:
+                continue
+            columns = np.arange(offset // self.bucket, (offset + len(values) - 1) // self.bucket + 1)
+            bounds = np.maximum(columns * self.bucket - offset, 0)
+            index = columns - start
+            if self.reduction == "max":
+                found[index] = np.maximum(found[index], np.maximum.reduceat(values, bounds).astype(np.float64))
+            else:
+                found[index] += np.add.reduceat(values, bounds, dtype=np.float64)
+            covered[index] += np.diff(np.append(bounds, len(values)))
+
+        # Cells no segment held are the default. Columns past the end of memory are empty
+        cells = np.clip(self.cell_count - np.arange(start, stop) * self.bucket, 0, self.bucket)
+        missing = cells - covered
+        default = memory.default if type(memory) is PagedMemory else 0
+        if self.reduction == "max":
+            reduced = np.where(missing > 0, np.maximum(found, default), found)
+        else:
+            reduced = (found + missing * default) / np.maximum(cells, 1)
+        self.columns[start:stop] = np.where(cells > 0, reduced, 0)
+
+    def segments(self, memory, first: int, end: int):
+
+        # (first cell, values) for every stretch of stored cells between first and end
+        if first >= end:
+            return
+        if type(memory) is not PagedMemory:
+            if type(memory) in [list, tuple]:
+                yield first, cellArray(memory[first:end])
+            else:
+                yield first, cellArray(memory)[first:end]
+            return
+
+        # Whichever is fewer of the pages in range and the allocated pages is walked
+        page_size = memory.page_size
+        indices = range(first // page_size, (end - 1) // page_size + 1)
+        if len(indices) > len(memory.pages):
+            indices = sorted(index for index in memory.pages if indices.start <= index < indices.stop)
+        for page_index in indices:
+            page = memory.pages.get(page_index)
+            if page is None:
+                continue
+            page_start = page_index * page_size
+            low, high = max(first, page_start), min(end, page_start + page_size)
+            yield low, cellArray(page)[low - page_start:high - page_start]
+
+    def copy(self) -> "BFMemoryOverview":
+
+        # The columns as they are now, for readers on another thread while this overview keeps refreshing
+        overview = copy.copy(self)
+        overview.columns = self.columns.copy()
+        return overview
+
+    def cellAt(self, fraction: float) -> int:
+        return min(int(min(max(fraction, 0.0), 1.0) * self.capacity), max(0, self.cell_count - 1))
@@ -0,0 +1,164 @@
+import json
+
+from array import array
+from src.bf_commands import BFCommand, BFCommandToString
+
+
+# Memories with more cells than this count writes in a dict instead of a preallocated array
+PROFILE_CELL_LIMIT = 1 << 20
+
+# Source shown for each loop in the text report
+PROFILE_SOURCE_WIDTH = 24
+
+
+class BFProfiler():
+
+    # Counts every executed command by pc and every cell written by +, - and ','. Source files hold nothing but
+    # commands, so a pc is also the offset of the command in the source. Loop statistics are derived from the pc
+    # counts when a report is built, so profiling costs two counter updates per step at most
+    def __init__(self, tape: list, memory_size: int):
+        self.tape = tape
+        self.pc_counts = array("Q", [0]) * len(tape)
+        self.cell_writes = array("Q", [0]) * memory_size if memory_size <= PROFILE_CELL_LIMIT else {}
+
+        # Largest count of any command and any cell, kept as they grow so heat can be scaled without a full scan
+        self.pc_peak = 0
+        self.cell_peak = 0
+
+    def onStep(self, interpreter):
+        pc = interpreter.pc
+        count = self.pc_counts[pc] + 1
+        self.pc_counts[pc] = count
+        if count > self.pc_peak:
+            self.pc_peak = count
+
+        if self.tape[pc] in [BFCommand.Increment, BFCommand.Decrement, BFCommand.ReadByte]:
+            ptr = interpreter.ptr
+            writes = self.cell_writes
+            if type(writes) is dict:
+                count = writes[ptr] = writes.get(ptr, 0) + 1
+            else:
+                # Growable memories can move past the cells known when profiling started
+                if ptr >= len(writes):
+                    writes.extend(array("Q", [0]) * (ptr + 1 - len(writes)))
+                count = writes[ptr] = writes[ptr] + 1
+            if count > self.cell_peak:
+                self.cell_peak = count
+
+    def steps(self) -> int:
+        return sum(self.pc_counts)
+
+    def source(self, start: int, end: int) -> str:
+        return "".join(BFCommandToString(cmd) for cmd in self.tape[start:end])
+
+    def loops(self) -> list:
+
+        # Every iteration ends with a ']', so its count is the number of iterations. The '[' also runs once for
+        # every entry to the loop. Cost includes the steps of nested loops
+        loops = []
+        open_loops = []
+        for pc, cmd in enumerate(self.tape):
+            if cmd == BFCommand.StartWhile:
+                open_loops.append(pc)
+            elif cmd == BFCommand.EndWhile and len(open_loops) > 0:
+                start = open_loops.pop()
+                iterations = self.pc_counts[pc]
+                entries = self.pc_counts[start] - iterations
+                if entries > 0:
+                    loops.append({"start": start, "end": pc, "iterations": iterations, "entries": entries,
+                                  "cost": sum(self.pc_counts[start:pc + 1])})
+
+        loops.sort(key=lambda loop: (-loop["cost"], loop["start"]))
+        return loops
+
+    def commands(self, count: int = 10) -> list:
+        pcs = sorted((pc for pc in range(0, len(self.pc_counts)) if self.pc_counts[pc] > 0),
+                     key=lambda pc: (-self.pc_counts[pc], pc))
+        return [{"pc": pc, "command": BFCommandToString(self.tape[pc]), "count": self.pc_counts[pc]}
+                for pc in pcs[:count]]
+
+    def cells(self, count: int = 10) -> list:
+        if type(self.cell_writes) is dict:
+            written = self.cell_writes.items()
+        else:
+            written = ((cell, writes) for cell, writes in enumerate(self.cell_writes) if writes > 0)
+        return [{"cell": cell, "writes": writes}
+                for cell, writes in sorted(written, key=lambda item: (-item[1], item[0]))[:count]]
+
+    def report(self, count: int = 10) -> dict:
+        return {"steps": self.steps(), "loops": self.loops()[:count], "commands": self.commands(count),
+                "cells": self.cells(count)}
+
+    def reportJson(self, count: int = 10) -> str:
+        return json.dumps(self.report(count), indent=4)
+
+    def reportText(self, count: int = 10) -> str:
+        report = self.report(count)
+        steps = max(report["steps"], 1)
+
+        lines = [f"Profile: {report['steps']} steps", "Hot Loops:"]
+        for loop in report["loops"]:
+            source = self.source(loop["start"], loop["end"] + 1)
+            if len(source) > PROFILE_SOURCE_WIDTH:
+                source = f"{source[:PROFILE_SOURCE_WIDTH - 3]}..."
+            lines.append(f"\tSource {loop['start']}-{loop['end']} {source}: {loop['cost']} steps ({100 * loop['cost'] / steps:.1f}%), {loop['iterations']} iterations over {loop['entries']} entries") # noqa
+
+        lines.append("Hot Commands:")
+        for command in report["commands"]:
+            lines.append(f"\tSource {command['pc']} {command['command']}: {command['count']} steps")
+
+        lines.append("Hot Cells:")
+        for cell in report["cells"]:
+            lines.append(f"\tCell {cell['cell']}: {cell['writes']} writes")
+        return "\n".join(lines)
+
+    def window(self, cell_start: int, cell_stop: int, pc_start: int, pc_stop: int) -> "BFProfileWindow":
+        return BFProfileWindow(self, cell_start, cell_stop, pc_start, pc_stop)
+
+    def tapeLength(self) -> int:
+        return len(self.tape)
+
+    def cellWrites(self, start: int, stop: int) -> list:
+        writes = self.cell_writes
+        if type(writes) is dict:
+            return [writes.get(cell, 0) for cell in range(start, stop)]
+        return list(writes[start:stop]) + [0] * max(0, stop - max(start, len(writes)))
+
+    def pcHeat(self, start: int = 0, stop: int = None) -> list:
+
+        # Executions per pc from start to stop scaled to 0 -> 1 against the most executed command
+        counts = self.pc_counts[start:stop]
+        return [count / self.pc_peak if self.pc_peak > 0 else 0.0 for count in counts]
+
+    def cellHeat(self, start: int, stop: int) -> list:
+
+        # Writes per cell from start to stop scaled to 0 -> 1 against the most written cell
+        return [count / self.cell_peak if self.cell_peak > 0 else 0.0 for count in self.cellWrites(start, stop)]
+
+
+class BFProfileWindow():
+
+    # The profiler counts for a span of cells and commands, copied for readers on another thread while the profiler
+    # keeps counting. Heat is scaled against the peaks of the whole profile, and is 0 outside the spans
+    def __init__(self, profiler: BFProfiler, cell_start: int, cell_stop: int, pc_start: int, pc_stop: int):
+        self.tape_length = profiler.tapeLength()
+        self.pc_peak = profiler.pc_peak
+        self.cell_peak = profiler.cell_peak
+        self.pc_start = max(0, pc_start)
+        self.pc_counts = list(profiler.pc_counts[self.pc_start:max(self.pc_start, pc_stop)])
+        self.cell_start = max(0, cell_start)
+        self.cell_writes = profiler.cellWrites(self.cell_start, max(self.cell_start, cell_stop))
+
+    def tapeLength(self) -> int:
+        return self.tape_length
+
+    def pcHeat(self, start: int = 0, stop: int = None) -> list:
+        stop = self.tape_length if stop is None else stop
+        return [heat(self.pc_counts, pc - self.pc_start, self.pc_peak) for pc in range(start, stop)]
+
+    def cellHeat(self, start: int, stop: int) -> list:
+        return [heat(self.cell_writes, cell - self.cell_start, self.cell_peak) for cell in range(start, stop)]
+
+
+def heat(counts: list, index: int, peak: int) -> float:
+    return counts[index] / peak if 0 <= index < len(counts) and peak > 0 else 0.0
@@ -0,0 +1,53 @@
+import logging
+import logging.handlers
+import queue
+
+from src.bf_commands import BFCommand
+
+
+TRACE_LOGGER = "bf.trace"
+
+
+class BFTracer():
+
+    def __init__(self, every: int = 1, loops_only: bool = False, logger: logging.Logger = None):
+        if every < 1:
+            raise ValueError("Trace interval must be at least 1 step")
+
+        self.every = every
+        self.loops_only = loops_only
+        self.logger = logger if logger is not None else logging.getLogger(TRACE_LOGGER)
+        self.countdown = every
+
+    def onStep(self, interpreter):
+        if self.loops_only:
+            if interpreter.pc >= len(interpreter.tape):
+                return
+            if interpreter.tape[interpreter.pc] not in [BFCommand.StartWhile, BFCommand.EndWhile]:
+                return
+
+        self.countdown -= 1
+        if self.countdown > 0:
+            return
+        self.countdown = self.every
+
+        # Strings are only built for steps that are sampled and would actually be logged
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Step {interpreter.step_count}\r\n\t{interpreter.tapeString()}\r\n\t{interpreter.memoryString()}") # noqa
+
+
+def initQueuedLogging(level: int, handler: logging.Handler = None) -> logging.handlers.QueueListener:
+
+    # Records are formatted by the caller and written to the console by a listener thread, so verbose runs do not
+    # block the frame loop on console output. Stop the returned listener to flush pending records
+    handler = handler if handler is not None else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
@@ -0,0 +1,103 @@
+import json
+import logging
+
+from src.bf import BFInterpreter
+from src.bf_input import ListInputProvider
+
+
+class EnvironmentInitError(Exception):
+    pass
+
+
+class BFEnvironment():
+
+    # Memory layout a program runs in. Defaults to 8 cells with a maximum value of 16
+    def __init__(self, cell_count: int = 8, max_value: int = 16, default_value: int = 0, initial_values: list = [],
+                 growable: bool = False, input_values: list = None):
+        self.cell_count = cell_count
+        self.max_value = max_value
+        self.default_value = default_value
+        self.initial_values = initial_values
+        self.growable = growable
+
+        # Values supplied to ',' before the program waits for input. None leaves input to the caller
+        self.input_values = input_values
+
+    def createInterpreter(self, program: str) -> BFInterpreter:
+        interpreter = BFInterpreter(self.cell_count, self.max_value, grow_memory=self.growable)
+        interpreter.setMemory(self.initial_values, self.default_value)
+        interpreter.setTape(program)
+        if self.input_values is not None:
+            interpreter.input = ListInputProvider(self.input_values)
+        return interpreter
+
+
+def raiseEnvFileException(message: str):
+    logging.error(message)
+    raise EnvironmentInitError(message)
+
+
+def loadSource(path: str) -> str:
+    logging.info(f"Loading source file from: {path}")
+
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def loadEnvironment(path: str) -> BFEnvironment:
+    logging.info(f"Loading environment file from: {path}")
+
+    with open(path, 'r') as f:
+        return parseEnvironment(json.loads(f.read()))
+
+
+def parseEnvironment(content_json: dict) -> BFEnvironment:
+    environment = BFEnvironment()
+
+    # Setting cell maximum allowed value
+    cell_max = content_json["memory"]["cell_max_value"]
+    if type(cell_max) is not int or cell_max < 1:
+        raiseEnvFileException("Value 'cell_max_value' must be an integer greater than 0")
+    environment.max_value = cell_max
+
+    # Setting cell count
+    cell_count = content_json["memory"]["cell_count"]
+    if type(cell_count) is not int or cell_count < 1:
+        raiseEnvFileException("Value 'cell_count' must be an integer greater than 0")
+    environment.cell_count = cell_count
+
+    # Setting cell default values
+    cell_default = content_json["memory"]["cell_default_value"]
+    if type(cell_default) is not int or cell_default < 0 or cell_default > cell_max:
+        raiseEnvFileException(f"Value 'cell_default_value' must be an integer in the range -> {cell_max}")
+    environment.default_value = cell_default
+
+    # Setting cell initial values
+    initial_values = content_json["memory"]["cell_initial_values"]
+
+    # Do basic type and length validation with the settings already loaded
+    if type(initial_values) is not list:
+        raiseEnvFileException(f"List 'cell_initial_values' must be a list of integers in the range 0 -> {cell_max}")
+
+    if len(initial_values) > cell_count:
+        raiseEnvFileException("List 'cell_initial_values' cannot have more entries that the number of cells")
+
+    for v in initial_values:
+        if type(v) is not int or v < 0 or v > cell_max:
+            raiseEnvFileException(f"Values in list 'cell_initial_values' must be integers in the range 0 -> {cell_max}") # noqa
+    environment.initial_values = initial_values
+
+    # Optionally let memory grow to the right instead of failing when the pointer passes the last cell
+    cell_growable = content_json["memory"].get("cell_growable", False)
+    if type(cell_growable) is not bool:
+        raiseEnvFileException("Value 'cell_growable' must be true or false")
+    environment.growable = cell_growable
+
+    # Optionally supply the values read by ','
+    input_values = content_json.get("input")
+    if input_values is not None:
+        if type(input_values) is not list or any(type(v) is not int or v < 0 or v > cell_max for v in input_values):
+            raiseEnvFileException(f"List 'input' must be a list of integers in the range 0 -> {cell_max}")
+        environment.input_values = input_values
+
+    return environment
@@ -1,6 +1,8 @@
 class Gamestate():
 
-    maxHertz = 32
+    # Rates run from minHertz to maxHertz steps per second. A step_hertz of None runs the program as fast as it can,
+    # and comes after maxHertz when stepping through the rates
+    maxHertz = 1 << 20
     minHertz = 1
 
     def __init__(self, step_hertz: int):
@@ -11,19 +13,36 @@ class Gamestate():
 
         self.step_hertz = step_hertz
 
+        if self.step_hertz is None:
+            return
+
         if self.step_hertz < self.minHertz:
             if loop_on_underflow:
-                self.step_hertz = self.maxHertz
+                self.step_hertz = None
             else:
                 self.step_hertz = self.minHertz
         elif self.step_hertz > self.maxHertz:
             if loop_on_overflow:
-                self.step_hertz = self.minHertz
+                self.step_hertz = None
             else:
                 self.step_hertz = self.maxHertz
 
     def multiplyStepHertz(self, factor: float = 2.0, loop: bool = True):
+        if self.step_hertz is None:
+            self.stepFromUnlimited(factor > 1, loop)
+            return
         self.setStepHertz(int(self.step_hertz * factor), loop_on_overflow=loop, loop_on_underflow=loop)
 
     def incrementStepHertz(self, increment: int = 1, loop: bool = True):
+        if self.step_hertz is None:
+            self.stepFromUnlimited(increment > 0, loop)
+            return
         self.setStepHertz(self.step_hertz + increment, loop_on_overflow=loop, loop_on_underflow=loop)
+
+    def stepFromUnlimited(self, up: bool, loop: bool):
+
+        # Going up from unlimited rolls over to the slowest rate, going down drops to the fastest
+        if not up:
+            self.step_hertz = self.maxHertz
+        elif loop:
+            self.step_hertz = self.minHertz
@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from src.bf import BFInitError, RunStopReason
+from src.bf_output import CollectorOutputSink
+from src.environment import BFEnvironment, EnvironmentInitError, loadEnvironment, loadSource, parseEnvironment
+
+
+class ChallengeInitError(Exception):
+    pass
+
+
+# Per submission limits used when a challenge does not set its own
+GRADER_MAX_STEPS = 10_000_000
+GRADER_TIME_LIMIT = 1.0
+
+# Submissions handed to a worker process at a time. Larger chunks keep short programs from being dominated by
+# inter-process overhead
+GRADER_CHUNK_SIZE = 64
+
+
+class BFChallenge():
+
+    # An environment to start from and the state a passing program halts in. Expected memory is compared against the
+    # leading cells only, so cells past the end of the list are free. None skips a check
+    def __init__(self, environment: BFEnvironment, expected_memory: list = None, expected_pointer: int = None,
+                 expected_output: list = None, max_steps: int = GRADER_MAX_STEPS,
+                 time_limit: float = GRADER_TIME_LIMIT, detect_loops: bool = False):
+        self.environment = environment
+        self.expected_memory = expected_memory
+        self.expected_pointer = expected_pointer
+        self.expected_output = expected_output
+        self.max_steps = max_steps
+        self.time_limit = time_limit
+
+        # Fails submissions as soon as they provably repeat a state. Checked runs execute one command at a time
+        self.detect_loops = detect_loops
+
+
+class GradeResult():
+
+    def __init__(self, submission: str, passed: bool, step_count: int = 0, state: str = "", detail: str = ""):
+        self.submission = submission
+        self.passed = passed
+        self.step_count = step_count
+        self.state = state
+        self.detail = detail
+
+    def toDict(self) -> dict:
+        return {"submission": self.submission, "passed": self.passed, "step_count": self.step_count,
+                "state": self.state, "detail": self.detail}
+
+
+def raiseChallengeException(message: str):
+    logging.error(message)
+    raise ChallengeInitError(message)
+
+
+def loadChallenge(path: str) -> BFChallenge:
+    logging.info(f"Loading challenge file from: {path}")
+
+    with open(path, 'r') as f:
+        content_json = json.loads(f.read())
+
+    # The environment is either inline or an env file relative to the challenge
+    if "environment" in content_json:
+        environment = loadEnvironment(os.path.join(os.path.dirname(path), content_json["environment"]))
+    elif "memory" in content_json:
+        environment = parseEnvironment(content_json)
+    else:
+        raiseChallengeException("Challenge must have an 'environment' file or a 'memory' section")
+
+    expected = content_json.get("expected", {})
+    expected_memory = expected.get("memory")
+    if expected_memory is not None and (type(expected_memory) is not list or
+                                        any(type(v) is not int for v in expected_memory)):
+        raiseChallengeException("List 'expected.memory' must be a list of integers")
+
+    expected_pointer = expected.get("pointer")
+    if expected_pointer is not None and type(expected_pointer) is not int:
+        raiseChallengeException("Value 'expected.pointer' must be an integer")
+
+    expected_output = expected.get("output")
+    if expected_output is not None and (type(expected_output) is not list or
+                                        any(type(v) is not int for v in expected_output)):
+        raiseChallengeException("List 'expected.output' must be a list of integers")
+
+    limits = content_json.get("limits", {})
+    max_steps = limits.get("max_steps", GRADER_MAX_STEPS)
+    if type(max_steps) is not int or max_steps < 1:
+        raiseChallengeException("Value 'limits.max_steps' must be an integer greater than 0")
+
+    time_limit = limits.get("time_limit", GRADER_TIME_LIMIT)
+    if type(time_limit) not in [int, float] or time_limit <= 0:
+        raiseChallengeException("Value 'limits.time_limit' must be a number of seconds greater than 0")
+
+    detect_loops = limits.get("detect_loops", False)
+    if type(detect_loops) is not bool:
+        raiseChallengeException("Value 'limits.detect_loops' must be true or false")
+
+    return BFChallenge(environment, expected_memory, expected_pointer, expected_output, max_steps, time_limit,
+                       detect_loops)
+
+
+def gradeProgram(challenge: BFChallenge, submission: str, program: str) -> GradeResult:
+    try:
+        interpreter = challenge.environment.createInterpreter(program)
+    except BFInitError as init_error:
+        return GradeResult(submission, False, state="Error", detail=str(init_error))
+
+    output = interpreter.output = CollectorOutputSink(interpreter.max_value)
+    if challenge.detect_loops:
+        interpreter.enableLoopDetector()
+
+    result = interpreter.run(challenge.max_steps, perf_counter() + challenge.time_limit)
+    state = interpreter.state._name_
+
+    if result.reason == RunStopReason.Error:
+        return GradeResult(submission, False, result.steps, state, result.detail)
+    if result.reason == RunStopReason.InfiniteLoop:
+        return GradeResult(submission, False, result.steps, state, result.detail)
+    if result.reason == RunStopReason.WaitingForInput:
+        return GradeResult(submission, False, result.steps, state, "Program is waiting for input")
+    if result.reason == RunStopReason.StepBudget:
+        return GradeResult(submission, False, result.steps, state, f"Step limit of {challenge.max_steps} reached")
+    if result.reason == RunStopReason.Deadline:
+        return GradeResult(submission, False, result.steps, state, f"Time limit of {challenge.time_limit}s reached")
+
+    if challenge.expected_memory is not None:
+        memory = interpreter.memoryView()
+        for cell, expected in enumerate(challenge.expected_memory):
+            found = memory[cell] if cell < len(memory) else None
+            if found != expected:
+                return GradeResult(submission, False, result.steps, state,
+                                   f"Cell {cell} expected {expected}, found {found}")
+
+    if challenge.expected_pointer is not None and interpreter.ptr != challenge.expected_pointer:
+        return GradeResult(submission, False, result.steps, state,
+                           f"Pointer expected at {challenge.expected_pointer}, found {interpreter.ptr}")
+
+    if challenge.expected_output is not None and list(output.values) != challenge.expected_output:
+        return GradeResult(submission, False, result.steps, state,
+                           f"Output expected {challenge.expected_output}, found {list(output.values)}")
+
+    return GradeResult(submission, True, result.steps, state, interpreter.stateDetail)
+
+
+def gradeFile(challenge: BFChallenge, path: str) -> GradeResult:
+    submission = os.path.basename(path)
+    try:
+        program = loadSource(path)
+    except (OSError, UnicodeDecodeError) as read_error:
+        return GradeResult(submission, False, state="Error", detail=str(read_error))
+    return gradeProgram(challenge, submission, program)
+
+
+def gradeDirectory(challenge: BFChallenge, directory: str, workers: int = None) -> list:
+
+    # Every .bf file in the directory is graded in a pool of worker processes. Results keep the sorted file order
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".bf"))
+    if len(paths) == 0:
+        return []
+
+    workers = workers if workers is not None else os.cpu_count() or 1
+    chunk_size = max(1, min(GRADER_CHUNK_SIZE, len(paths) // (4 * workers)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(gradeFile, [challenge] * len(paths), paths, chunksize=chunk_size))
+
+
+def resultsTable(results: list) -> str:
+    headers = ["Submission", "Result", "Steps", "Detail"]
+    rows = [[r.submission, "PASS" if r.passed else "FAIL", str(r.step_count), r.detail] for r in results]
+
+    widths = [max([len(headers[i])] + [len(row[i]) for row in rows]) for i in range(0, 3)]
+    lines = []
+    for row in [headers] + rows:
+        lines.append("  ".join([row[i].ljust(widths[i]) for i in range(0, 3)] + [row[3]]).rstrip())
+
+    passed = sum(1 for r in results if r.passed)
+    lines.append(f"{passed}/{len(results)} passed")
+    return "\n".join(lines)
+
+
+def main(argv: list) -> int:
+
+    # python -m src.grader <challenge file> <submission directory> [-w|--workers N] [--json]
+    workers = None
+    as_json = False
+    positional = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in ["-w", "--workers"] and i + 1 < len(argv) and argv[i + 1].isdigit() and int(argv[i + 1]) > 0:
+            workers = int(argv[i + 1])
+            i += 2
+            continue
+        elif argv[i] == "--json":
+            as_json = True
+        elif argv[i].startswith("-"):
+            print(f"Unexpected cli parameter '{argv[i]}' found", file=sys.stderr)
+            return 2
+        else:
+            positional.append(argv[i])
+        i += 1
+
+    if len(positional) != 2:
+        print("Usage: python -m src.grader <challenge file> <submission directory> [-w N] [--json]", file=sys.stderr)
+        return 2
+
+    try:
+        challenge = loadChallenge(positional[0])
+    except (OSError, KeyError, ValueError, ChallengeInitError, EnvironmentInitError) as challenge_error:
+        print(f"Unable to load challenge: {challenge_error}", file=sys.stderr)
+        return 2
+
+    try:
+        results = gradeDirectory(challenge, positional[1], workers)
+    except OSError as directory_error:
+        print(f"Unable to read submissions: {directory_error}", file=sys.stderr)
+        return 2
+    if as_json:
+        print(json.dumps([r.toDict() for r in results], indent=4))
+    else:
+        print(resultsTable(results))
+    return 0 if all(r.passed for r in results) else 1
+
+
+if __name__ == "__main__":
+    # Runtime errors are reported in the results, so only log problems with the grader itself
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(sys.argv[1:]))
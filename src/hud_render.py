@@ -1,45 +1,102 @@
-
 import pygame as pg
 import src.rendering_contants as rc
 from src.bf import BFInterpreter
+from src.bf_output import RingOutputSink
+
+
+def rateString(hertz: int) -> str:
+    return "Unlimited" if hertz is None else f"{hertz:,}Hz"
 
 
 class HudRenderer():
 
-    def __init__(self, interpreter: BFInterpreter, typeface: str = "freesansbold.ttf", point_size: int = 32):
+    def __init__(self, interpreter: BFInterpreter, typeface: str = "freesansbold.ttf", point_size: int = 32,
+                 output: RingOutputSink = None):
 
         self.interpreter = interpreter
 
+        # Recent printed values shown under the step count. Not shown when None
+        self.output = output
+        self.last_output_count = -1
+
         self.font = pg.font.Font(typeface, point_size)
         self.last_hertz = -1
+        self.last_achieved_hertz = -1
+        self.last_undo = None
         self.last_interpreter_state = -1
         self.last_step_count = -1
 
         self.hertz_text_surface: pg.Surface = None
         self.step_text_surface: pg.Surface = None
         self.state_text_surface: pg.Surface = None
+        self.output_text_surface: pg.Surface = None
+
+        # Where each text surface was last placed, in the order they are drawn
+        self.text_rects: list = []
 
-    def renderHud(self, screen: pg.Surface, hud_rect: pg.Rect, hertz: int):
-        if self.last_hertz != hertz:
-            self.hertz_text_surface = self.font.render(f"CPU: {hertz}Hz", True, rc.CLR_WHITE, rc.CLR_BLACK)
+    def renderHud(self, screen: pg.Surface, hud_rect: pg.Rect, hertz: int, achieved_hertz: float = None,
+                  undo: bool = True) -> list:
+        dirty = self.update(hud_rect, hertz, achieved_hertz, undo)
+        self.draw(screen)
+        return dirty
+
+    def update(self, hud_rect: pg.Rect, hertz: int, achieved_hertz: float = None, undo: bool = True) -> list:
+
+        # Renders the text that changed and returns the screen rects it covered before and after. Draws nothing
+        changed = []
+
+        # The requested rate, followed by the steps per second actually run when they are measured, and a note when
+        # steps are not recorded for undo at this rate
+        achieved_hertz = round(achieved_hertz) if achieved_hertz is not None else None
+        if self.last_hertz != hertz or self.last_achieved_hertz != achieved_hertz or self.last_undo != undo:
+            text = f"CPU: {rateString(hertz)}"
+            if achieved_hertz is not None:
+                text = f"{text} ({achieved_hertz:,} steps/s)"
+            if not undo:
+                text = f"{text} Undo Off"
+            self.hertz_text_surface = self.font.render(text, True, rc.CLR_WHITE, rc.CLR_BLACK)
             self.last_hertz = hertz
+            self.last_achieved_hertz = achieved_hertz
+            self.last_undo = undo
+            changed.append(0)
 
         if self.interpreter.state != self.last_interpreter_state:
-            self.state_text_surface = self.font.render(f"State: {self.interpreter.state._name_}", True, rc.CLR_WHITE, rc.CLR_BLACK) # noqa 
+            self.state_text_surface = self.font.render(f"State: {self.interpreter.state._name_}", True, rc.CLR_WHITE, rc.CLR_BLACK) # noqa
             self.last_interpreter_state = self.interpreter.state
+            changed.append(1)
 
         if self.last_step_count != self.interpreter.step_count:
             self.step_text_surface = self.font.render(f"Step Count: {self.interpreter.step_count}", True, rc.CLR_WHITE, rc.CLR_BLACK) # noqa
             self.last_step_count = self.interpreter.step_count
+            changed.append(2)
+
+        surfaces = [self.hertz_text_surface, self.state_text_surface, self.step_text_surface]
+        if self.output is not None:
+            if self.last_output_count != self.output.count:
+                self.output_text_surface = self.font.render(f"Output: {' '.join(map(str, self.output.values))}", True, rc.CLR_WHITE, rc.CLR_BLACK) # noqa
+                self.last_output_count = self.output.count
+                changed.append(3)
+            surfaces.append(self.output_text_surface)
 
-        hertz_rect = self.hertz_text_surface.get_rect()
-        state_rect = self.state_text_surface.get_rect()
-        step_rect = self.step_text_surface.get_rect()
+        # Each line sits 10 pixels under the one before it
+        rects = []
+        for surface in surfaces:
+            rect = surface.get_rect()
+            if len(rects) == 0:
+                rect.topleft = (10 + hud_rect.left, 10 + hud_rect.top)
+            else:
+                rect.topleft = (rects[-1].left, rects[-1].bottom + 10)
+            rects.append(rect)
 
-        hertz_rect.topleft = (10 + hud_rect.left, 10 + hud_rect.top)
-        state_rect.topleft = (hertz_rect.left, hertz_rect.bottom + 10)
-        step_rect.topleft = (state_rect.left, state_rect.bottom + 10)
+        dirty = []
+        for line, rect in enumerate(rects):
+            if line >= len(self.text_rects):
+                dirty.append(rect)
+            elif line in changed or rect != self.text_rects[line]:
+                dirty.append(rect.union(self.text_rects[line]))
+        self.text_rects = rects
+        return dirty
 
-        screen.blit(self.hertz_text_surface, hertz_rect)
-        screen.blit(self.state_text_surface, state_rect)
-        screen.blit(self.step_text_surface, step_rect)
+    def draw(self, screen: pg.Surface):
+        surfaces = [self.hertz_text_surface, self.state_text_surface, self.step_text_surface, self.output_text_surface]
+        screen.blits(list(zip(surfaces, self.text_rects)), doreturn=False)
@@ -1,10 +1,21 @@
 import logging
+import math
 from operator import le
 import pygame as pg
 import src.rendering_contants as rc
 from src.bf import BFInterpreter
 
 
+# Width and height of each command in the tape heatmap
+TAPE_HEAT_WIDTH = 8
+TAPE_HEAT_HEIGHT = 10
+
+
+def heatColor(heat: float) -> tuple:
+    # Blue for commands and cells never used, through to red for the hottest
+    return (int(255 * heat), 0, int(255 * (1 - heat)))
+
+
 class BFRenderer():
 
     def __init__(self,
@@ -22,6 +33,9 @@ class BFRenderer():
         self.camera_target: int = 0
         self.camera_speed = camera_speed
 
+        # The camera follows the pointer until it is sent elsewhere with lookAt
+        self.follow_pointer = True
+
         # Derive rendering constants
         self.cell_width = cell_width
         self.cell_buffer = cell_buffer
@@ -29,12 +43,41 @@ class BFRenderer():
         self.cell_base_y = cell_max_height
         
         self.first_render = True
+
+        # Overlay the interpreter profiler counts on the memory cells and tape when it is enabled
+        self.heatmap = False
+
+        # Pixel height -> white column of that height. Built on first use
+        self.column_sprites: dict = {}
+
+        # Row of cell bases for the camera position in base_layer_key
+        self.base_layer: pg.Surface = None
+        self.base_layer_key: tuple = None
+
+        # (view, visible values, ptr, heat) seen by the last update()
+        self.last_update: tuple = None
+
     def setCameraOffset(self, x: float):
         self.camera_offset = x
 
     def setCameraTarget(self, x: int):
         self.camera_target = x
 
+    def cameraFor(self, cell: int, screen_width: int) -> float:
+
+        # Camera offset that puts cell in the middle of the screen
+        return (self.cell_width + self.cell_buffer) * cell - (screen_width/2 - (self.cell_buffer + self.cell_width)/2)
+
+    def lookAt(self, cell: int, screen_width: int):
+
+        # Jumps straight to cell and stops following the pointer
+        self.follow_pointer = False
+        self.setCameraOffset(self.cameraFor(cell, screen_width))
+        self.setCameraTarget(self.camera_offset)
+
+    def followPointer(self):
+        self.follow_pointer = True
+
     def moveCamera(self, tick_time: float):
         movement = tick_time * self.camera_speed
 
@@ -45,26 +88,73 @@ class BFRenderer():
         else:
             self.camera_offset -= movement
 
-    def render(self, screen: pg.Surface, interpreter_rect: pg.Rect, tick_time: float):
-        
-        # Calculate the gamespace ptr position
-        ptr_rect = pg.Rect((self.cell_width + self.cell_buffer) * self.interpreter.ptr, # noqa
-                           self.cell_base_y + 20,
-                           self.cell_width,
-                           self.cell_width)
+    def render(self, screen: pg.Surface, interpreter_rect: pg.Rect, tick_time: float) -> list:
+        dirty = self.update(screen, interpreter_rect, tick_time)
+        self.draw(screen, interpreter_rect)
+        return dirty
 
-        # Update Camera Position to target the ptr in gamespace
+    def update(self, screen: pg.Surface, interpreter_rect: pg.Rect, tick_time: float) -> list:
+
+        # Moves the camera and returns the screen rects that look different from the last update. Draws nothing
+
+        # Update Camera Position to target the ptr in gamespace, unless the camera was sent elsewhere
+        camera = self.cameraFor(self.interpreter.ptr, screen.get_width())
         if self.first_render:
-            self.setCameraOffset(ptr_rect.left - (screen.get_width()/2 - (self.cell_buffer + self.cell_width)/2))
+            if self.follow_pointer:
+                self.setCameraOffset(camera)
             self.first_render = False
-        else:
-            self.setCameraTarget(ptr_rect.left - (screen.get_width()/2 - (self.cell_buffer + self.cell_width)/2))
+        elif self.follow_pointer:
+            self.setCameraTarget(camera)
         self.moveCamera(tick_time)
 
-        # Apply offsets to the ptr
-        ptr_rect.left += interpreter_rect.left - self.camera_offset
-        ptr_rect.top += interpreter_rect.top
+        memory = self.interpreter.memoryView()
+        first, stop = self.visibleCells(screen.get_width(), interpreter_rect.left, len(memory))
+        view = (self.camera_offset, screen.get_width(), tuple(interpreter_rect), first, stop)
+        values = list(memory[first:stop])
+        heat = (self.interpreter.pc, self.interpreter.step_count) if self.heatmap else None
+
+        last = self.last_update
+        self.last_update = (view, values, self.interpreter.ptr, heat)
+        if last == self.last_update:
+            return []
+
+        # A camera move or heatmap change touches every cell. Otherwise only the cells and pointer that changed
+        last_view, last_values, last_ptr, last_heat = last if last is not None else (None, None, None, None)
+        if last_view != view or heat is not None or last_heat is not None:
+            return [self.area(screen.get_width(), interpreter_rect)]
+
+        dirty = [self.cellArea(interpreter_rect, i) for i in range(first, stop) if values[i - first] != last_values[i - first]] # noqa
+        if last_ptr != self.interpreter.ptr:
+            dirty.append(self.pointerRect(interpreter_rect, last_ptr).inflate(2, 2))
+            dirty.append(self.pointerRect(interpreter_rect, self.interpreter.ptr).inflate(2, 2))
+        return dirty
+
+    def invalidate(self):
+
+        # The next update reports the whole area as changed
+        self.last_update = None
+
+    def area(self, screen_width: int, interpreter_rect: pg.Rect) -> pg.Rect:
+
+        # Everything render() can draw: the columns, their bases, the pointer and the tape heatmap strip
+        return pg.Rect(0, interpreter_rect.top, screen_width,
+                       self.cell_base_y + self.cell_width + 30 + TAPE_HEAT_HEIGHT)
+
+    def cellArea(self, interpreter_rect: pg.Rect, i: int) -> pg.Rect:
+        draw_x = int(interpreter_rect.left + (self.cell_width + self.cell_buffer) * i - self.camera_offset)
+        overhang = math.ceil(self.cell_buffer / 4) + 1
+        return pg.Rect(draw_x - overhang, interpreter_rect.top, self.cell_width + 2 * overhang, self.cell_base_y + 10)
+
+    def pointerRect(self, interpreter_rect: pg.Rect, ptr: int) -> pg.Rect:
+        return pg.Rect(interpreter_rect.left + (self.cell_width + self.cell_buffer) * ptr - self.camera_offset,
+                       interpreter_rect.top + self.cell_base_y + 20,
+                       self.cell_width,
+                       self.cell_width)
+
+    def draw(self, screen: pg.Surface, interpreter_rect: pg.Rect):
+
         # Render the ptr
+        ptr_rect = self.pointerRect(interpreter_rect, self.interpreter.ptr)
         ptr_color = rc.CLR_WHITE
         pg.draw.polygon(
             surface=screen,
@@ -74,24 +164,86 @@ class BFRenderer():
                 (ptr_rect.centerx, ptr_rect.top),
                 ptr_rect.bottomright])
 
-        # Render the memory cells
-        for i in range(0, len(self.interpreter.memory)):
-            height = self.interpreter.memory[i] * self.cell_unit_height
-            draw_x = interpreter_rect.left + (self.cell_width + self.cell_buffer) * i - self.camera_offset
+        # Only cells that overlap the screen are drawn, so the frame cost depends on the screen width and not the
+        # memory size
+        memory = self.interpreter.memoryView()
+        first, stop = self.visibleCells(screen.get_width(), interpreter_rect.left, len(memory))
+        profiler = self.interpreter.profiler if self.heatmap else None
+        cell_heat = profiler.cellHeat(first, stop) if profiler is not None else None
 
-            # Draw cell reference base
-            cell_base_rect = pg.Rect(draw_x - self.cell_buffer/4,
-                                     interpreter_rect.top + self.cell_base_y,
-                                     self.cell_width + self.cell_buffer/2,
-                                     10)
+        pitch = self.cell_width + self.cell_buffer
+        base_top = interpreter_rect.top + self.cell_base_y
+        blits = []
 
-            pg.draw.rect(screen, rect=cell_base_rect, color=rc.CLR_RED)
+        # Draw cell reference bases. Without the heatmap they only depend on the camera, so the row is kept
+        if cell_heat is None:
+            blits.append((self.baseLayer(screen.get_width(), interpreter_rect.left, first, stop), (0, base_top)))
 
-            # Draw memory
-            cell_rect = pg.Rect(draw_x,
-                                interpreter_rect.top + self.cell_base_y - height,
-                                self.cell_width,
-                                height)
+        for i, value in enumerate(memory[first:stop], first):
+            draw_x = int(interpreter_rect.left + pitch * i - self.camera_offset)
 
-            pg.draw.rect(screen, rect=cell_rect, color=rc.CLR_WHITE)
+            if cell_heat is not None:
+                base_rect = pg.Rect(draw_x - self.cell_buffer/4, base_top, self.cell_width + self.cell_buffer/2, 10)
+                pg.draw.rect(screen, rect=base_rect, color=heatColor(cell_heat[i - first]))
 
+            # Draw memory
+            height = int(value * self.cell_unit_height)
+            if height > 0:
+                blits.append((self.columnSprite(height), (draw_x, base_top - height)))
+
+        screen.blits(blits, doreturn=False)
+
+        if profiler is not None:
+            self.renderTapeHeat(screen, interpreter_rect, profiler)
+
+    def visibleCells(self, screen_width: int, left: int, cell_count: int) -> tuple:
+
+        # First and one past the last cell whose base, which is wider than the cell, overlaps the screen
+        pitch = self.cell_width + self.cell_buffer
+        overhang = self.cell_buffer / 4
+        origin = left - self.camera_offset
+        first = max(0, math.floor((-origin - self.cell_width - overhang) / pitch))
+        stop = min(cell_count, math.floor((screen_width - origin + overhang) / pitch) + 1)
+        return first, max(first, stop)
+
+    def columnSprite(self, height: int) -> pg.Surface:
+
+        # Columns only come in as many heights as there are pixels in cell_max_height, so each is drawn once
+        sprite = self.column_sprites.get(height)
+        if sprite is None:
+            sprite = self.column_sprites[height] = pg.Surface((self.cell_width, height))
+            sprite.fill(rc.CLR_WHITE)
+        return sprite
+
+    def baseLayer(self, screen_width: int, left: int, first: int, stop: int) -> pg.Surface:
+
+        # One screen wide row holding the base of every visible cell, redrawn only when the camera moves
+        key = (self.camera_offset, screen_width, left, first, stop)
+        if self.base_layer_key != key:
+            if self.base_layer is None or self.base_layer.get_width() != screen_width:
+                self.base_layer = pg.Surface((screen_width, 10))
+                self.base_layer.set_colorkey(rc.CLR_BLACK)
+            self.base_layer.fill(rc.CLR_BLACK)
+
+            base = pg.Surface((int(self.cell_width + self.cell_buffer/2), 10))
+            base.fill(rc.CLR_RED)
+            pitch = self.cell_width + self.cell_buffer
+            self.base_layer.blits([(base, (int(left + pitch * i - self.camera_offset) - int(self.cell_buffer/4), 0))
+                                   for i in range(first, stop)], doreturn=False)
+            self.base_layer_key = key
+        return self.base_layer
+
+    def renderTapeHeat(self, screen: pg.Surface, interpreter_rect: pg.Rect, profiler):
+
+        # A strip of the commands around the program counter, each colored by how often it has run
+        visible = max(1, screen.get_width() // TAPE_HEAT_WIDTH)
+        first = max(0, min(self.interpreter.pc - visible // 2, profiler.tapeLength() - visible))
+        stop = min(first + visible, profiler.tapeLength())
+        pc_heat = profiler.pcHeat(first, stop)
+        top = interpreter_rect.top + self.cell_base_y + self.cell_width + 30
+
+        for pc in range(first, stop):
+            heat_rect = pg.Rect((pc - first) * TAPE_HEAT_WIDTH, top, TAPE_HEAT_WIDTH - 1, TAPE_HEAT_HEIGHT)
+            pg.draw.rect(screen, rect=heat_rect, color=heatColor(pc_heat[pc - first]))
+            if pc == self.interpreter.pc:
+                pg.draw.rect(screen, rect=heat_rect, color=rc.CLR_WHITE, width=1)
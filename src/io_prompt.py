@@ -13,20 +13,37 @@ class IOPrompt():
         self.response = def_response
         self.font = pg.font.Font(typeface, point_size)
 
-        self.text_surface = pg.Surface = None
+        self.text_surface: pg.Surface = None
         self.redraw = True
 
-    def renderPrompt(self, screen: pg.Surface, prompt_rect: pg.Rect):
+        # Where the text was last placed. Text longer than the prompt box runs past its right edge
+        self.text_rect: pg.Rect = None
 
-        if self.redraw:
-            self.text_surface = self.font.render(self.toString(), True, rc.CLR_WHITE, rc.CLR_BLACK)
-            self.redraw = False
+    def renderPrompt(self, screen: pg.Surface, prompt_rect: pg.Rect) -> list:
+        dirty = self.update(prompt_rect)
+        self.draw(screen, prompt_rect)
+        return dirty
 
-        pg.draw.rect(screen, rc.CLR_RED, prompt_rect, width=1)
+    def update(self, prompt_rect: pg.Rect) -> list:
+
+        # Renders the text when it changed and returns the screen rects it covered before and after. Draws nothing
+        if not self.redraw and self.text_rect is not None:
+            return []
+
+        last_area = self.area(prompt_rect)
+        self.text_surface = self.font.render(self.toString(), True, rc.CLR_WHITE, rc.CLR_BLACK)
+        self.redraw = False
+
+        self.text_rect = self.text_surface.get_rect()
+        self.text_rect.topleft = (prompt_rect.left + 5, prompt_rect.top + 5)
+        return [self.area(prompt_rect).union(last_area)]
 
-        text_rect = self.text_surface.get_rect()
-        text_rect.topleft = (prompt_rect.left + 5, prompt_rect.top + 5)
-        screen.blit(self.text_surface, text_rect)
+    def area(self, prompt_rect: pg.Rect) -> pg.Rect:
+        return prompt_rect.union(self.text_rect) if self.text_rect is not None else pg.Rect(prompt_rect)
+
+    def draw(self, screen: pg.Surface, prompt_rect: pg.Rect):
+        pg.draw.rect(screen, rc.CLR_RED, prompt_rect, width=1)
+        screen.blit(self.text_surface, self.text_rect)
 
     def appendResponse(self, text: str):
         self.response = f"{self.response}{text}"
@@ -45,5 +62,15 @@ class IOPrompt():
             self.response = self.response[:len(self.response)-1]
             self.redraw = True
 
+    def responseValues(self) -> list:
+
+        # The response may hold a batch of values separated by commas, such as "1,2,3"
+        values = []
+        for token in self.response.split(","):
+            if not token.strip().isdigit():
+                raise IOPromptError(f"Response '{self.response}' must be integers separated by commas")
+            values.append(int(token))
+        return values
+
     def toString(self):
         return f"{self.prompt} {self.response}"
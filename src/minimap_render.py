@@ -0,0 +1,93 @@
+import numpy as np
+import pygame as pg
+import src.rendering_contants as rc
+from src.bf import BFInterpreter
+from src.bf_overview import BFMemoryOverview
+
+
+# Width of the pointer marker drawn over the strip
+MINIMAP_MARKER_WIDTH = 2
+
+
+class MinimapRenderer():
+
+    # A strip showing the whole memory, one pixel column per column of a BFMemoryOverview, drawn as a bar of the
+    # largest or mean value of its cells. A driver snapshot carries the overview the driver refreshes. Otherwise the
+    # renderer refreshes its own from the interpreter on every update. Only columns whose value differs from what was
+    # last painted are written into the strip surface with surfarray
+    def __init__(self, interpreter: BFInterpreter, width: int, height: int = 30, reduction: str = "max"):
+        self.interpreter = interpreter
+        self.height = height
+        self.overview = BFMemoryOverview(width, reduction)
+
+        # Column values last painted into the strip, and the cells the strip covers
+        self.painted: np.ndarray = None
+        self.capacity = 0
+        self.last_ptr = None
+
+        # Strip with one pixel column per overview column, and the same strip scaled to the full width. Built on first
+        # update
+        self.surface: pg.Surface = None
+        self.scaled: pg.Surface = None
+
+    def update(self, rect: pg.Rect) -> list:
+
+        # Brings the strip up to date with the interpreter and returns the screen rects that changed. Draws nothing
+        ptr = self.interpreter.ptr
+        if getattr(self.interpreter, "overview", None) is not None:
+            self.overview = self.interpreter.overview
+        else:
+            self.overview.refresh(self.interpreter.memoryView(), ptr)
+        overview = self.overview
+        dirty = []
+        if self.surface is None or overview.capacity != self.capacity:
+            self.surface = pg.Surface((overview.column_count, self.height), 0, 32)
+            self.painted = np.full(overview.column_count, np.nan)
+            self.capacity = overview.capacity
+            self.last_ptr = None
+        changed = np.flatnonzero(overview.columns != self.painted)
+
+        # Changed columns are sent to the display as one rect from the first to the last
+        if len(changed) > 0:
+            self.paintColumns(changed)
+            self.painted[changed] = overview.columns[changed]
+            self.scaled = None
+            dirty.append(self.columnRect(rect, changed[0]).union(self.columnRect(rect, changed[-1])))
+
+        if ptr != self.last_ptr:
+            if self.last_ptr is not None:
+                dirty.append(self.markerRect(rect, self.last_ptr))
+            dirty.append(self.markerRect(rect, ptr))
+            self.last_ptr = ptr
+        return dirty
+
+    def paintColumns(self, changed: np.ndarray):
+
+        # Each column is a white bar rising from the bottom of the strip, scaled against the maximum cell value
+        heights = np.rint(self.overview.columns[changed] / self.interpreter.max_value * self.height).astype(np.int64)
+        rows = np.arange(0, self.height)
+        filled = rows[np.newaxis, :] >= (self.height - heights)[:, np.newaxis]
+        pixels = pg.surfarray.pixels2d(self.surface)
+        pixels[changed] = np.where(filled, self.surface.map_rgb(rc.CLR_WHITE), self.surface.map_rgb(rc.CLR_BLACK))
+        del pixels
+
+    def columnRect(self, rect: pg.Rect, column: int) -> pg.Rect:
+        scale = rect.width / self.overview.column_count
+        left = rect.left + int(column * scale)
+        return pg.Rect(left, rect.top, max(1, rect.left + int((column + 1) * scale) - left), rect.height)
+
+    def markerRect(self, rect: pg.Rect, ptr: int) -> pg.Rect:
+        overview = self.overview
+        x = rect.left + int(min(ptr, max(0, overview.cell_count - 1)) / max(1, overview.capacity) * rect.width)
+        return pg.Rect(x - MINIMAP_MARKER_WIDTH // 2, rect.top - 4, MINIMAP_MARKER_WIDTH, rect.height + 8)
+
+    def cellAt(self, rect: pg.Rect, x: int) -> int:
+
+        # The cell under screen column x, for jumping the camera to where the strip was clicked
+        return self.overview.cellAt((x - rect.left) / rect.width)
+
+    def draw(self, screen: pg.Surface, rect: pg.Rect):
+        if self.scaled is None or self.scaled.get_size() != rect.size:
+            self.scaled = pg.transform.scale(self.surface, rect.size)
+        screen.blit(self.scaled, rect)
+        pg.draw.rect(screen, rc.CLR_RED, self.markerRect(rect, self.interpreter.ptr))
@@ -0,0 +1,25 @@
+import pytest
+
+from src.bf import BFEngine, BFInterpreter
+from src.bf_input import ListInputProvider
+from src.bf_output import BFOutputSink
+
+
+@pytest.fixture
+def createInterpreter():
+
+    # Builds an interpreter for program with memory set before the tape is loaded. Input and output are only replaced
+    # when given
+    def create(program: str, memory_size: int = 8, max_value: int = 16, values: list = [], paged: bool = None,
+               engine: BFEngine = BFEngine.Fused, input_values: list = None, output: BFOutputSink = None):
+        interpreter = BFInterpreter(memory_size, max_value, paged=paged)
+        interpreter.engine = engine
+        interpreter.setMemory(values, 0)
+        interpreter.setTape(program)
+        if input_values is not None:
+            interpreter.input = ListInputProvider(input_values)
+        if output is not None:
+            interpreter.output = output
+        return interpreter
+
+    return create
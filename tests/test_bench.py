@@ -0,0 +1,61 @@
+from benchmarks.bench import CORPUS, compareResults, fastest, measure, runBenchmarks, runPath, engineForPath
+
+
+def result(steps_per_second: float = 1000.0, load_seconds: float = 0.01, startup_seconds: float = 0.01,
+           peak_bytes: int = 4096) -> dict:
+    return {"steps": 100, "steps_per_second": steps_per_second, "load_seconds": load_seconds,
+            "startup_seconds": startup_seconds, "run_seconds": 100 / steps_per_second, "peak_bytes": peak_bytes}
+
+
+# Groups tests for the benchmark suite and its baseline comparison
+class TestBenchmarks:
+
+    def test_corpus_halts_on_every_path(self):
+        for program in CORPUS:
+            steps = set()
+            for path in ["fused", "generated"]:
+                interpreter = program.createInterpreter(engineForPath(path))
+                runPath(interpreter, path)
+                steps.add(interpreter.step_count)
+            assert len(steps) == 1
+
+    def test_measure(self):
+        measured = measure(CORPUS[0], "fused", repeat=1)
+
+        assert measured["steps"] == 262137
+        assert measured["steps_per_second"] > 0
+        assert measured["peak_bytes"] > 0
+
+    def test_run_benchmarks(self):
+        results = runBenchmarks(["input_echo"], ["fused", "generated"], repeat=2)
+
+        assert list(results) == ["input_echo/fused", "input_echo/generated"]
+        assert {measured["steps"] for measured in results.values()} == {400002}
+
+    def test_fastest(self):
+        best = fastest(result(steps_per_second=500.0, load_seconds=0.02), result(peak_bytes=8192))
+
+        # Every metric keeps the better measurement
+        assert best == result(load_seconds=0.01)
+
+    def test_compare_within_threshold(self):
+        baseline = {"a/fused": result()}
+
+        assert compareResults({"a/fused": result(steps_per_second=700.0, load_seconds=0.015)}, baseline) == []
+        assert compareResults({"b/fused": result(steps_per_second=1.0)}, baseline) == []
+
+    def test_compare_regressions(self):
+        baseline = {"a/fused": result(peak_bytes=1 << 20)}
+        regressions = compareResults({"a/fused": result(steps_per_second=500.0, peak_bytes=2 << 20)}, baseline)
+
+        assert regressions == ["a/fused run_seconds: 0.2 against baseline 0.1 (+100.0%)",
+                               "a/fused peak_bytes: 2.09715e+06 against baseline 1.04858e+06 (+100.0%)"]
+
+        # One threshold given on the command line replaces every fractional threshold
+        assert len(compareResults({"a/fused": result(steps_per_second=900.0)}, baseline, 0.05)) == 1
+
+    def test_compare_noise_floor(self):
+        baseline = {"a/fused": result(load_seconds=0.00001, peak_bytes=4096)}
+
+        # Large fractional changes in tiny timings and allocations are jitter
+        assert compareResults({"a/fused": result(load_seconds=0.0005, peak_bytes=12288)}, baseline) == []
@@ -1,6 +1,54 @@
+import io
+import json
+import logging
 import pytest
 
-from src.bf import BFCommand, BFInitError, BFInterpreter, BFRuntimeError, ProgramState
+from time import perf_counter
+
+from src.bf import BFCommand, BFEngine, BFInitError, BFInterpreter, BFRuntimeError, ProgramState, RunStopReason
+from src.bf_input import GeneratorInputProvider, ListInputProvider, StreamInputProvider
+from src.bf_loopcache import BFLoopCache
+from src.bf_memory import MemoryWindow
+from src.bf_output import CallbackOutputSink, CollectorOutputSink, RingOutputSink, StreamOutputSink
+from src.bf_trace import TRACE_LOGGER, BFTracer
+
+
+def stepToEnd(interpreter: BFInterpreter) -> str:
+    try:
+        while interpreter.canStep():
+            interpreter.step()
+    except BFRuntimeError as runtime_error:
+        return str(runtime_error)
+    return ""
+
+
+def runToEnd(interpreter: BFInterpreter, max_steps: int = None) -> str:
+    while interpreter.canStep():
+        result = interpreter.run(max_steps)
+        if result.reason == RunStopReason.Error:
+            return result.detail
+    return ""
+
+
+def assertSameExecution(program: str, memory_size: int = 8, max_value: int = 16, values: list = [],
+                        max_steps: int = None, engine: BFEngine = BFEngine.Fused):
+    stepped = BFInterpreter(memory_size, max_value)
+    stepped.setMemory(values, 0)
+    stepped.setTape(program)
+
+    ran = BFInterpreter(memory_size, max_value)
+    ran.engine = engine
+    ran.setMemory(values, 0)
+    ran.setTape(program)
+
+    assert runToEnd(ran, max_steps) == stepToEnd(stepped)
+    assert list(ran.memory) == list(stepped.memory)
+    assert ran.ptr == stepped.ptr
+    assert ran.pc == stepped.pc
+    assert ran.state == stepped.state
+    assert ran.stateDetail == stepped.stateDetail
+    assert ran.step_count == stepped.step_count
+    return ran
 
 
 # Groups tests related to initialization of a BF Interpreter
@@ -46,6 +94,28 @@ class TestBFInit:
         with pytest.raises(BFInitError):
             BFInterpreter(1).setTape("")
 
+    def test_setTape_jumpTable(self):
+        interpreter = BFInterpreter(1)
+        interpreter.setTape("+[[-]+]")
+
+        assert interpreter.jumpTable == [-1, 6, 4, -1, 2, -1, 1]
+        assert interpreter.findLoopEnd() == -2
+
+    def test_setTape_unclosed_loop_error(self):
+
+        with pytest.raises(BFInitError):
+            BFInterpreter(1).setTape("+[[-]")
+
+    def test_setTape_unopened_loop_error(self):
+
+        with pytest.raises(BFInitError):
+            BFInterpreter(1).setTape("+]")
+
+    def test_setTape_illegal_symbol_error(self):
+
+        with pytest.raises(BFInitError):
+            BFInterpreter(1).setTape("+ +")
+
 
 # Groups tests related to execution of a BF Interpreter
 class TestBFRuntime:
@@ -396,3 +466,827 @@ class TestBFRuntime:
 
         assert interpreter.state == ProgramState.Error
         assert not interpreter.canStep()
+
+
+# Groups tests related to the fused execution path of a BF Interpreter
+class TestBFFusedRuntime:
+
+    def test_run_to_halt(self):
+        interpreter = assertSameExecution(">>+++++[->++<]>-<<", values=[1, 2, 3])
+
+        assert interpreter.state == ProgramState.Halted
+        assert interpreter.memory[3] == 15
+
+    def test_run_nested_loops(self):
+        assertSameExecution("++[>+++[>+<-]<-]>>[-<+>]")
+
+    def test_run_mixed_runs(self):
+        assertSameExecution("+++--+>><<>+-<-+", values=[3])
+
+    def test_run_overflow_error(self):
+        interpreter = assertSameExecution("+++++", max_value=3, values=[1])
+
+        assert interpreter.state == ProgramState.Error
+        assert interpreter.pc == 2
+
+    def test_run_underflow_error(self):
+        interpreter = assertSameExecution("+--", values=[0])
+
+        assert interpreter.pc == 2
+
+    def test_run_ptr_out_of_bounds_error(self):
+        interpreter = assertSameExecution("+[>+]", memory_size=4)
+
+        assert interpreter.state == ProgramState.Error
+
+    def test_run_ptr_less_than_zero_error(self):
+        assertSameExecution("><<")
+
+    def test_run_waits_for_input(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("++,[->+<]")
+
+        interpreter.run()
+        assert interpreter.state == ProgramState.WaitingForInput
+        assert interpreter.pc == 2
+        assert interpreter.step_count == 3
+
+        interpreter.readByte(4)
+        interpreter.run()
+        assert interpreter.state == ProgramState.Halted
+        assert interpreter.memory[1] == 4
+
+    def test_run_after_partial_step(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("+++>++")
+
+        interpreter.step()
+        interpreter.run()
+
+        assert interpreter.state == ProgramState.Halted
+        assert interpreter.memory[0] == 3
+        assert interpreter.memory[1] == 2
+        assert interpreter.step_count == 6
+
+    def test_run_after_halt_error(self):
+        interpreter = BFInterpreter(1)
+        interpreter.setTape("+")
+        interpreter.run()
+
+        with pytest.raises(BFRuntimeError):
+            interpreter.run()
+
+
+# Groups tests comparing loop idioms against the naive loop they replace
+class TestBFIdiomRuntime:
+
+    def test_clear_loop(self):
+        interpreter = assertSameExecution("[-]>[-]", values=[16, 0])
+
+        assert interpreter.memory[0] == 0
+        assert interpreter.step_count == 1 + 16 * 3 + 1 + 1
+
+    def test_move_loop(self):
+        assertSameExecution("[->+<]", values=[9, 4])
+
+    def test_multiply_loop(self):
+        interpreter = assertSameExecution(">[-<++>>+++<]", values=[0, 5, 1])
+
+        assert list(interpreter.memory[:3]) == [10, 0, 16]
+
+    def test_step_two_counter(self):
+        assertSameExecution("[-->+<]", values=[8])
+
+    def test_step_two_counter_underflow_error(self):
+        interpreter = assertSameExecution("[-->+<]", values=[7])
+
+        assert interpreter.state == ProgramState.Error
+
+    def test_counter_dips_below_zero_error(self):
+        assertSameExecution("[--+>+<]", values=[3])
+
+    def test_multiply_overflow_error(self):
+        interpreter = assertSameExecution("[->+++<]", values=[6, 0])
+
+        assert interpreter.state == ProgramState.Error
+        assert interpreter.stateDetail == "Cell Overflow at command 4: Maximum value 16"
+
+    def test_intermediate_overflow_error(self):
+        assertSameExecution("[->++-<]", values=[3, 14])
+
+    def test_intermediate_underflow_error(self):
+        assertSameExecution("[->-+<]", values=[3, 0])
+
+    def test_pointer_out_of_bounds_error(self):
+        assertSameExecution(">>>[->>+<<]", memory_size=5, values=[0, 0, 0, 2])
+
+    def test_pointer_less_than_zero_error(self):
+        assertSameExecution("[-<+>]", values=[2])
+
+    def test_idioms_inside_outer_loop(self):
+        assertSameExecution("+++[>+++[->+<]>[-<+>]<<-]", max_value=32)
+
+    def test_initial_memories(self):
+        for a in range(0, 17):
+            for b in range(0, 17, 3):
+                assertSameExecution("[->+>++<<]>>[-<<+>>]", values=[a, b, 2])
+
+
+# Groups tests related to running a BF Interpreter with step and time budgets
+class TestBFRunBudget:
+
+    def test_run_result_halted(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("+++[->+<]")
+
+        result = interpreter.run()
+        assert result.reason == RunStopReason.Halted
+        assert result.steps == interpreter.step_count
+        assert result.detail == "End of Tape"
+        assert result.finished()
+
+    def test_run_result_error(self):
+        interpreter = BFInterpreter(1, 16)
+        interpreter.setTape("+<")
+
+        result = interpreter.run()
+        assert result.reason == RunStopReason.Error
+        assert result.steps == 1
+        assert result.detail == "Memory pointer less than 0 at command 1"
+        assert interpreter.state == ProgramState.Error
+
+    def test_run_result_waiting_for_input(self):
+        interpreter = BFInterpreter(1, 16)
+        interpreter.setTape("+,")
+
+        result = interpreter.run()
+        assert result.reason == RunStopReason.WaitingForInput
+        assert not result.finished()
+
+    def test_step_budget_is_exact(self):
+        for budget in range(1, 40):
+            interpreter = BFInterpreter(8, 16)
+            interpreter.setMemory([3])
+            interpreter.setTape("+++[->++<]>[-<+>]>+++++")
+
+            result = interpreter.run(max_steps=budget)
+            assert result.reason == RunStopReason.StepBudget
+            assert result.steps == budget
+            assert interpreter.step_count == budget
+
+    def test_step_budget_matches_stepping(self):
+        for budget in range(1, 60):
+            stepped = BFInterpreter(8, 16)
+            stepped.setMemory([3])
+            stepped.setTape("+++[->++<]>[-<+>]>+++++")
+            for _ in range(budget):
+                stepped.step()
+
+            ran = BFInterpreter(8, 16)
+            ran.setMemory([3])
+            ran.setTape("+++[->++<]>[-<+>]>+++++")
+            ran.run(max_steps=budget)
+
+            assert list(ran.memory) == list(stepped.memory)
+            assert ran.ptr == stepped.ptr
+            assert ran.pc == stepped.pc
+            assert ran.step_count == stepped.step_count
+
+    def test_resume_in_slices(self):
+        for budget in [1, 2, 3, 7]:
+            assertSameExecution("++[>+++[>+<-]<-]>>[-<+>]+++++[-]", max_steps=budget)
+            assertSameExecution("+[->+++<]>[->+<]>>>+", max_steps=budget, memory_size=4, values=[5])
+
+    def test_deadline_reached(self):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.setTape("+[>+-<]")
+
+        result = interpreter.run(deadline=perf_counter() + 0.05)
+        assert result.reason == RunStopReason.Deadline
+        assert interpreter.state == ProgramState.Running
+        assert interpreter.canStep()
+
+
+# Groups tests related to tracing a BF Interpreter
+class TestBFTrace:
+
+    def test_tracer_samples_steps(self, caplog):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.setTape("++++++")
+        interpreter.tracer = BFTracer(every=3)
+
+        with caplog.at_level(logging.DEBUG, logger=TRACE_LOGGER):
+            while interpreter.canStep():
+                interpreter.step()
+
+        messages = [record.getMessage() for record in caplog.records if record.name == TRACE_LOGGER]
+        assert len(messages) == 2
+        assert messages[0].startswith("Step 2")
+        assert "Tape:  + + (+) + + + HALT" in messages[0]
+
+    def test_tracer_loops_only(self, caplog):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.setTape("++[-]")
+        interpreter.tracer = BFTracer(loops_only=True)
+
+        with caplog.at_level(logging.DEBUG, logger=TRACE_LOGGER):
+            while interpreter.canStep():
+                interpreter.step()
+
+        assert len([record for record in caplog.records if record.name == TRACE_LOGGER]) == 5
+
+    def test_tracer_not_formatted_when_disabled(self, caplog):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.setTape("+")
+        interpreter.tracer = BFTracer()
+
+        with caplog.at_level(logging.INFO, logger=TRACE_LOGGER):
+            interpreter.step()
+
+        assert len(caplog.records) == 0
+
+    def test_trace_strings(self):
+        interpreter = BFInterpreter(3, 16)
+        interpreter.setMemory([1, 2])
+        interpreter.setTape("+>")
+        interpreter.step()
+        interpreter.step()
+
+        assert interpreter.tapeString() == "Tape:  + > (HALT)"
+        assert interpreter.memoryString() == "Memory Map:  2 (2) 0"
+
+
+# Groups tests related to the memory storage of a BF Interpreter
+class TestBFMemory:
+
+    def test_memory_type_from_max_value(self):
+        assert type(BFInterpreter(4, 255).memory) is bytearray
+        assert BFInterpreter(4, 256).memory.typecode == "H"
+        assert BFInterpreter(4, 65536).memory.itemsize == 4
+        assert type(BFInterpreter(4, 1 << 70).memory) is list
+
+    def test_setMemory_wide_cells(self):
+        interpreter = BFInterpreter(6, 70000)
+        interpreter.setMemory(values=[70000, 2], default=65536)
+
+        assert list(interpreter.memory) == [70000, 2, 65536, 65536, 65536, 65536]
+
+    def test_setMemory_bool_value_error(self):
+        interpreter = BFInterpreter(4, 16)
+        with pytest.raises(BFInitError):
+            interpreter.setMemory(values=[1, True], default=0)
+
+    def test_overflow_keeps_cell_legal(self):
+        interpreter = BFInterpreter(1, 255)
+        interpreter.setMemory([255])
+        interpreter.setTape("+")
+
+        with pytest.raises(BFRuntimeError):
+            interpreter.step()
+        assert interpreter.memory[0] == 255
+
+    def test_underflow_keeps_cell_legal(self):
+        interpreter = BFInterpreter(1, 255)
+        interpreter.setTape("-")
+
+        assert interpreter.run().reason == RunStopReason.Error
+        assert interpreter.memory[0] == 0
+
+    def test_memoryView_is_read_only(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.setMemory([1, 2, 3])
+        view = interpreter.memoryView()
+
+        assert list(view) == [1, 2, 3, 0]
+        with pytest.raises(TypeError):
+            view[0] = 5
+
+
+# Groups tests related to paged and growable memory
+class TestBFPagedMemory:
+
+    def test_paged_reads_default(self):
+        interpreter = BFInterpreter(1 << 30, 16, paged=True)
+        interpreter.setMemory([1, 2], 3)
+
+        assert len(interpreter.memory) == 1 << 30
+        assert interpreter.memory[0] == 1
+        assert interpreter.memory[(1 << 30) - 1] == 3
+        assert interpreter.memory.allocatedPages() == 1
+
+    def test_paged_matches_flat(self):
+        for engine in BFEngine:
+            interpreter = BFInterpreter(8, 16, paged=True)
+            interpreter.engine = engine
+            interpreter.setMemory([3, 1])
+            interpreter.setTape("[->++<]>[->>>>>+<<<<<]>>>>>+")
+
+            assert interpreter.run().reason == RunStopReason.Halted
+            assert list(interpreter.memory) == [0, 0, 0, 0, 0, 0, 8, 0]
+            assert interpreter.memoryView()[6] == 8
+
+    def test_memory_window(self):
+        interpreter = BFInterpreter(1 << 30, 16, paged=True)
+        interpreter.setMemory([1, 2, 4], 3)
+        window = MemoryWindow(interpreter.memory, [(1, 3), ((1 << 30) - 2, (1 << 30) + 5)])
+        interpreter.memory[1] = 9
+
+        # Only the spans are copied. Cells outside them read as the default
+        assert len(window) == 1 << 30
+        assert window[0:4] == [3, 2, 4, 3]
+        assert window[(1 << 30) - 1] == 3
+        with pytest.raises(IndexError):
+            window[1 << 30]
+
+    def test_paged_error_matches_flat(self):
+        assertSameExecution("+[>+]", memory_size=4)
+        stepped = BFInterpreter(4, 16, paged=True)
+        stepped.setTape("+[>+]")
+
+        assert stepToEnd(stepped) == "Memory pointer out of bounds at command 2. Maximum allowed: 3"
+
+    def test_grow_memory(self):
+        for engine in BFEngine:
+            interpreter = BFInterpreter(2, 16, grow_memory=True)
+            interpreter.engine = engine
+            interpreter.setMemory([5])
+            interpreter.setTape("[->>>>>>+<<<<<<]>>>>>>>>>+")
+
+            assert interpreter.run().reason == RunStopReason.Halted
+            assert len(interpreter.memory) == 10
+            assert interpreter.memory[6] == 5
+            assert interpreter.memory[9] == 1
+
+    def test_memoryString_window(self):
+        interpreter = BFInterpreter(1000, 16, paged=True)
+        interpreter.setTape(">>>")
+        interpreter.run()
+
+        assert interpreter.memoryString(radius=2) == "Memory Map:  ... 0 0 (0) 0 0 ..."
+
+
+# Groups tests for the undo journal and flight recorder
+class TestBFJournal:
+
+    def test_step_back_restores_state(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.enableJournal()
+        interpreter.setTape("++>+[-]")
+        for _ in range(0, 5):
+            interpreter.step()
+
+        assert interpreter.stepBack()
+        assert interpreter.pc == 4
+        assert interpreter.ptr == 1
+        assert interpreter.step_count == 4
+        assert list(interpreter.memory) == [2, 1, 0, 0]
+
+        assert interpreter.rewind(10) == 4
+        assert interpreter.state == ProgramState.Ready
+        assert interpreter.pc == 0
+        assert list(interpreter.memory) == [0, 0, 0, 0]
+        assert not interpreter.stepBack()
+
+    def test_rewind_matches_replay(self):
+        program = "+++[>++<-]>[>+>+<<-],>."
+        forward = BFInterpreter(8, 16)
+        forward.enableJournal()
+        forward.setTape(program)
+        assert forward.run().reason == RunStopReason.WaitingForInput
+        forward.readByte(7)
+        assert forward.run().reason == RunStopReason.Halted
+
+        assert forward.rewind(12) == 12
+        replayed = BFInterpreter(8, 16)
+        replayed.setTape(program)
+        replayed.run(max_steps=forward.step_count)
+
+        assert list(forward.memory) == list(replayed.memory)
+        assert (forward.pc, forward.ptr, forward.state) == (replayed.pc, replayed.ptr, replayed.state)
+
+    def test_step_back_from_input(self):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.enableJournal()
+        interpreter.setTape(",")
+        interpreter.step()
+        interpreter.readByte(9)
+
+        assert interpreter.stepBack()
+        assert interpreter.state == ProgramState.WaitingForInput
+        assert interpreter.memory[0] == 0
+
+    def test_step_back_from_error(self):
+        interpreter = BFInterpreter(2, 1)
+        interpreter.enableJournal()
+        interpreter.setTape("++")
+        assert interpreter.run().reason == RunStopReason.Error
+
+        assert interpreter.stepBack()
+        assert interpreter.state == ProgramState.Running
+        assert interpreter.stateDetail == ""
+        assert interpreter.pc == 1
+        assert interpreter.run(max_steps=1).reason == RunStopReason.Error
+
+    def test_journal_capacity(self):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.enableJournal(capacity=3)
+        interpreter.setTape("+++++")
+        interpreter.run()
+
+        assert interpreter.rewind(5) == 3
+        assert interpreter.memory[0] == 2
+
+    def test_flight_record(self):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.enableJournal()
+        interpreter.setTape("+>>")
+
+        assert stepToEnd(interpreter) == "Memory pointer out of bounds at command 2. Maximum allowed: 1"
+
+        record = interpreter.flightRecord()
+        assert [entry[0] for entry in record] == [0, 1, 2]
+        assert interpreter.flightRecordString(record[-1:]) == "Flight Recorder:\r\n\tStep 2: pc 2 (>) ptr 1 cell 0 Running" # noqa
+
+    def test_flight_record_on_error(self):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.setTape(">>")
+        interpreter.step()
+        with pytest.raises(BFRuntimeError) as runtime_error:
+            interpreter.step()
+        assert runtime_error.value.flight_record is None
+
+        interpreter = BFInterpreter(2, 16)
+        interpreter.enableJournal()
+        interpreter.setTape(">>")
+        interpreter.step()
+        with pytest.raises(BFRuntimeError) as runtime_error:
+            interpreter.step()
+        assert [entry[1] for entry in runtime_error.value.flight_record] == [0, 1]
+
+
+# Groups tests for the output sinks receiving printed cells
+class TestBFOutput:
+
+    def test_stream_output_flushed_in_bulk(self):
+        stream = io.StringIO()
+        interpreter = BFInterpreter(2, 16)
+        interpreter.output = StreamOutputSink(stream)
+        interpreter.setTape("+.+.")
+
+        interpreter.step()
+        interpreter.step()
+        assert stream.getvalue() == ""
+
+        stepToEnd(interpreter)
+        assert stream.getvalue() == "Cell[0]: 1\nCell[0]: 2\n"
+
+    def test_stream_output_default(self, capsys):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.setTape("+.>++.")
+        interpreter.run()
+
+        assert capsys.readouterr().out == "Cell[0]: 1\nCell[1]: 2\n"
+
+    def test_collector_output(self):
+        for engine in BFEngine:
+            interpreter = BFInterpreter(2, 300)
+            interpreter.engine = engine
+            interpreter.output = CollectorOutputSink(300)
+            interpreter.setMemory([290])
+            interpreter.setTape("[.-]")
+
+            assert interpreter.run().reason == RunStopReason.Halted
+            assert list(interpreter.output.values) == list(range(290, 0, -1))
+
+    def test_output_flushed_at_boundaries(self):
+        flushes = []
+        interpreter = BFInterpreter(2, 16)
+        interpreter.output = CallbackOutputSink(flushes.append)
+        interpreter.setTape("+.+.,.+.")
+
+        interpreter.run(max_steps=2)
+        assert flushes == [[(0, 1)]]
+        interpreter.run()
+        assert flushes[-1] == [(0, 2)]
+        interpreter.readByte(7)
+        interpreter.run()
+        assert flushes[-1] == [(0, 7), (0, 8)]
+
+    def test_output_flushed_on_error(self):
+        flushes = []
+        interpreter = BFInterpreter(2, 16)
+        interpreter.output = CallbackOutputSink(flushes.append)
+        interpreter.setTape("+.<")
+
+        assert stepToEnd(interpreter) == "Memory pointer less than 0 at command 2"
+        assert flushes == [[(0, 1)]]
+
+    def test_ring_output(self):
+        interpreter = BFInterpreter(2, 16)
+        interpreter.output = RingOutputSink(3)
+        interpreter.setTape("+.+.+.+.+.")
+        interpreter.run()
+
+        assert list(interpreter.output.values) == [3, 4, 5]
+        assert interpreter.output.count == 5
+
+
+# Groups tests for input providers satisfying ',' inside the run loop
+class TestBFInput:
+
+    def test_input_read_inline(self):
+        for engine in BFEngine:
+            interpreter = BFInterpreter(4, 16)
+            interpreter.engine = engine
+            interpreter.input = ListInputProvider([3, 4])
+            interpreter.setTape(",>,[-<+>]<")
+
+            result = interpreter.run()
+            assert result.reason == RunStopReason.Halted
+            assert list(interpreter.memory) == [7, 0, 0, 0]
+
+    def test_input_matches_stepping(self):
+        program = ",[->+>,<<],."
+        stepped = BFInterpreter(8, 16)
+        stepped.input = ListInputProvider([3, 1, 2, 5, 9])
+        stepped.setTape(program)
+        stepToEnd(stepped)
+
+        for engine in BFEngine:
+            for budget in [None, 1, 3]:
+                ran = BFInterpreter(8, 16)
+                ran.engine = engine
+                ran.input = ListInputProvider([3, 1, 2, 5, 9])
+                ran.setTape(program)
+                runToEnd(ran, budget)
+
+                assert list(ran.memory) == list(stepped.memory)
+                assert ran.step_count == stepped.step_count
+                assert ran.state == stepped.state
+
+    def test_input_exhausted_waits(self):
+        for engine in BFEngine:
+            interpreter = BFInterpreter(4, 16)
+            interpreter.engine = engine
+            interpreter.input = ListInputProvider([3])
+            interpreter.setTape(",>,")
+
+            assert interpreter.run().reason == RunStopReason.WaitingForInput
+            assert interpreter.pc == 2
+            assert interpreter.step_count == 3
+
+            interpreter.readByte(5)
+            assert list(interpreter.memory)[:2] == [3, 5]
+
+    def test_input_illegal_value(self):
+        for engine in BFEngine:
+            interpreter = BFInterpreter(4, 16)
+            interpreter.engine = engine
+            interpreter.input = ListInputProvider([17])
+            interpreter.setTape("+,")
+
+            result = interpreter.run()
+            assert result.reason == RunStopReason.Error
+            assert result.detail == "Provided byte input (17) must be in the range 0 -> 16"
+            assert interpreter.step_count == 1
+
+    def test_stream_input(self):
+        provider = StreamInputProvider(io.StringIO("1, 2\n\n3 4,5\n"))
+        assert [provider.read() for _ in range(0, 6)] == [1, 2, 3, 4, 5, None]
+
+        provider.push([6])
+        assert provider.read() == 6
+
+        provider = StreamInputProvider(io.BytesIO(b"\x01\xff"), binary=True)
+        assert [provider.read() for _ in range(0, 3)] == [1, 255, None]
+
+    def test_stream_input_error(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.input = StreamInputProvider(io.StringIO("1\na"))
+        interpreter.setTape(",>,")
+
+        result = interpreter.run()
+        assert result.reason == RunStopReason.Error
+        assert result.detail == "Input provider failed at command 2: Input value 'a' must be a non-negative integer"
+
+    def test_generator_input(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.input = GeneratorInputProvider(v for v in range(1, 4))
+        interpreter.setTape(",>,>,")
+        interpreter.run()
+
+        assert list(interpreter.memory) == [1, 2, 3, 0]
+
+
+# Groups tests for the execution profiler
+class TestBFProfile:
+
+    def test_profile_counts(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("+++[>++[>+<-]<-]>>[->+<]")
+        interpreter.enableProfiler()
+        interpreter.run()
+
+        profiler = interpreter.profiler
+        assert profiler.steps() == interpreter.step_count
+        assert list(profiler.pc_counts[:4]) == [1, 1, 1, 4]
+        assert profiler.cells(2) == [{"cell": 1, "writes": 12}, {"cell": 2, "writes": 12}]
+
+    def test_profile_loops(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("+++[>++[>+<-]<-]>>[->+<]")
+        interpreter.enableProfiler()
+        interpreter.run()
+
+        loops = interpreter.profiler.loops()
+        assert [(loop["start"], loop["end"]) for loop in loops] == [(3, 15), (7, 12), (18, 23)]
+        assert loops[0] == {"start": 3, "end": 15, "iterations": 3, "entries": 1, "cost": 61}
+        assert loops[1]["iterations"] == 6
+        assert loops[1]["entries"] == 3
+
+    def test_profile_matches_stepping(self):
+        stepped = BFInterpreter(8, 16)
+        stepped.setTape("++[>+++<-]>[-]")
+        stepped.enableProfiler()
+        stepToEnd(stepped)
+
+        ran = BFInterpreter(8, 16)
+        ran.engine = BFEngine.Generated
+        ran.setTape("++[>+++<-]>[-]")
+        ran.enableProfiler()
+        ran.run()
+
+        assert list(ran.profiler.pc_counts) == list(stepped.profiler.pc_counts)
+
+    def test_profile_reports(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("++[>+<-]")
+        interpreter.enableProfiler()
+        interpreter.run()
+
+        text = interpreter.profiler.reportText().splitlines()
+        assert text[:3] == ["Profile: 15 steps", "Hot Loops:", "\tSource 2-7 [>+<-]: 13 steps (86.7%), 2 iterations over 1 entries"] # noqa
+        assert json.loads(interpreter.profiler.reportJson())["loops"][0]["cost"] == 13
+
+    def test_profile_heat(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.setTape("++>+")
+        interpreter.enableProfiler()
+        interpreter.run()
+
+        assert interpreter.profiler.cellHeat(0, 3) == [1.0, 0.5, 0.0]
+        assert interpreter.profiler.pcHeat() == [1.0, 1.0, 1.0, 1.0]
+
+        # A window copies the counts of some cells and commands, scaled against the peaks of the whole profile
+        window = interpreter.profiler.window(1, 2, 2, 10)
+        interpreter.profiler.cell_writes[1] += 10
+        assert window.cellHeat(0, 3) == [0.0, 0.5, 0.0]
+        assert window.pcHeat() == [0.0, 0.0, 1.0, 1.0]
+        assert window.tapeLength() == 4
+
+    def test_profile_paged_and_growable(self):
+        interpreter = BFInterpreter(2, 16, grow_memory=True)
+        interpreter.setTape(">>>>+")
+        interpreter.enableProfiler()
+        interpreter.run()
+
+        assert interpreter.profiler.cells() == [{"cell": 4, "writes": 1}]
+
+
+# Groups tests for stopping programs that provably repeat a state
+class TestBFLoopDetector:
+
+    def test_detects_repeated_state(self):
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("+[>+[-]<]")
+        interpreter.enableLoopDetector()
+
+        result = interpreter.run()
+        assert result.reason == RunStopReason.InfiniteLoop
+        assert result.finished()
+        assert interpreter.state == ProgramState.InfiniteLoop
+        assert interpreter.stateDetail == "Infinite loop at command 6: state repeats every 9 steps"
+        assert interpreter.halted()
+        assert not interpreter.canStep()
+        with pytest.raises(BFRuntimeError):
+            interpreter.step()
+
+    def test_terminating_programs_run_unchanged(self):
+        for program in ["+++[>++[>+<-]<-]>>[->+<]", "++++[>+>+<<-]>[-]>[-<+>]"]:
+            checked = BFInterpreter(8, 16)
+            checked.setTape(program)
+            checked.enableLoopDetector()
+            checked.run()
+
+            plain = BFInterpreter(8, 16)
+            plain.setTape(program)
+            plain.run()
+            assert checked.state == ProgramState.Halted
+            assert checked.step_count == plain.step_count
+            assert list(checked.memory) == list(plain.memory)
+
+        # Counting loops never repeat a state, and still end in an overflow
+        interpreter = BFInterpreter(4, 16)
+        interpreter.setTape("+[>+<]")
+        interpreter.enableLoopDetector()
+        assert interpreter.run().reason == RunStopReason.Error
+
+    def test_input_clears_fingerprints(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.setTape("+[,]")
+        interpreter.input = ListInputProvider([1] * 20 + [0])
+        interpreter.enableLoopDetector()
+
+        assert interpreter.run().reason == RunStopReason.Halted
+
+    def test_memory_changes_rehash(self):
+        interpreter = BFInterpreter(4, 16)
+        interpreter.setTape("[]")
+        interpreter.enableLoopDetector()
+        interpreter.enableJournal(10)
+        interpreter.setMemory([1])
+
+        assert interpreter.run().reason == RunStopReason.InfiniteLoop
+        assert interpreter.stepBack()
+        interpreter.memory[0] = 0
+        interpreter.loopDetector.reset()
+        assert interpreter.run().reason == RunStopReason.Halted
+
+    def test_paged_memory(self):
+        interpreter = BFInterpreter(1 << 25, 16)
+        interpreter.setTape(">>>+[<+>[-]+]")
+        interpreter.enableLoopDetector()
+
+        assert interpreter.run(max_steps=10000).reason == RunStopReason.Error
+
+        interpreter = BFInterpreter(1 << 25, 16)
+        interpreter.setTape(">>>+[<[-]+>[-]+]")
+        interpreter.enableLoopDetector()
+        assert interpreter.run().reason == RunStopReason.InfiniteLoop
+
+
+class TestBFLoopCache:
+
+    PROGRAM = ">" + "+" * 20 + "[>[-]" + "+" * 5 + "[>[-]+++[-]<-]<-]"
+
+    def test_hits_match_uncached_run(self):
+        cached = BFInterpreter(8, 255)
+        cached.setTape(self.PROGRAM)
+        cached.enableLoopCache()
+        assert cached.run().reason == RunStopReason.Halted
+
+        plain = BFInterpreter(8, 255)
+        plain.setTape(self.PROGRAM)
+        plain.run()
+        assert cached.loopCache.hits == 19
+        assert cached.step_count == plain.step_count
+        assert cached.ptr == plain.ptr
+        assert list(cached.memory) == list(plain.memory)
+
+    def test_step_budget(self):
+        plain = BFInterpreter(8, 255)
+        plain.setTape(self.PROGRAM)
+        cached = BFInterpreter(8, 255)
+        cached.setTape(self.PROGRAM)
+        cached.enableLoopCache()
+
+        # A hit that does not fit in the budget runs the loop instead, so every stop matches an uncached run
+        for budget in [1, 37, 120, 500]:
+            assert cached.run(max_steps=budget).reason == plain.run(max_steps=budget).reason
+            assert cached.step_count == plain.step_count
+            assert cached.pc == plain.pc
+            assert list(cached.memory) == list(plain.memory)
+
+    def test_windows(self):
+        interpreter = BFInterpreter(8, 255)
+        interpreter.setTape("+[>+<-]+[>.<-]+[,-]+[>]+[>[-]<-]")
+        interpreter.enableLoopCache()
+        assert interpreter.loopCache.windows == {1: (0, 1), 24: (0, 1), 26: (0, 0)}
+
+    def test_capacity(self):
+        interpreter = BFInterpreter(8, 255)
+        interpreter.setTape("+[>[-]<-]")
+        cache = BFLoopCache(interpreter.tape, capacity=2)
+        cache.store((1, (1, 0)), (0, 0), 5)
+        cache.store((1, (2, 0)), (0, 0), 9)
+        assert cache.get((1, (1, 0))) == ((0, 0), 5)
+        cache.store((1, (3, 0)), (0, 0), 13)
+
+        # The least recently used entry is evicted
+        assert cache.get((1, (2, 0))) is None
+        assert cache.get((1, (1, 0))) == ((0, 0), 5)
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        with pytest.raises(ValueError):
+            interpreter.enableLoopCache(capacity=0)
+
+    def test_errors_match_uncached_run(self):
+        for program in ["+[>" + "+" * 10 + "[>+<-]<+]", ">+[>[-]<<-]"]:
+            cached = BFInterpreter(4, 255)
+            cached.setTape(program)
+            cached.enableLoopCache()
+            plain = BFInterpreter(4, 255)
+            plain.setTape(program)
+            assert cached.run().reason == plain.run().reason == RunStopReason.Error
+            assert cached.stateDetail == plain.stateDetail
+            assert cached.step_count == plain.step_count
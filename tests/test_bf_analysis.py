@@ -0,0 +1,81 @@
+from math import inf
+from src.bf import BFEngine, BFInterpreter
+from src.bf_analysis import analyzePointer
+from src.bf_ir import OP_HIGH, OP_LOW, OP_PC, BFOpCode, compileTape
+from tests.test_bf import assertSameExecution
+
+
+# Groups tests for the static pointer range analysis
+class TestBFPointerAnalysis:
+
+    def test_straight_line(self, createInterpreter):
+        analysis = analyzePointer(createInterpreter(">>+<<<>").tape)
+
+        assert (analysis.low, analysis.high) == (-1, 2)
+        assert analysis.minimumCellCount() == 3
+        assert len(analysis.regions) == 1
+        region = analysis.regions[0]
+        assert (region.loop, region.start, region.end, region.net, region.low, region.high) == (False, 0, 6, 0, -1, 2)
+
+    def test_balanced_loops(self, createInterpreter):
+        analysis = analyzePointer(createInterpreter(">+[->>+<<]>>").tape)
+
+        assert analysis.unbalancedLoops() == []
+        assert analysis.minimumCellCount() == 4
+        loop = [region for region in analysis.regions if region.loop][0]
+        assert (loop.start, loop.end, loop.net, loop.low, loop.high, loop.reach) == (2, 9, 0, 0, 2, (1, 3))
+
+        # The pointer is known exactly inside the loop and after it
+        assert (analysis.entry_low[6], analysis.entry_high[6]) == (3, 3)
+        assert (analysis.entry_low[10], analysis.entry_high[10]) == (1, 1)
+
+    def test_unbalanced_loops(self, createInterpreter):
+        analysis = analyzePointer(createInterpreter(">>[>]<[<<]+").tape)
+
+        loops = analysis.unbalancedLoops()
+        assert [(loop.start, loop.net) for loop in loops] == [(2, 1), (6, -2)]
+        assert (analysis.low, analysis.high) == (-inf, inf)
+        assert analysis.minimumCellCount() is None
+        assert (analysis.entry_low[2], analysis.entry_high[2]) == (2, inf)
+        assert analysis.report()["unbalanced_loops"][0]["reach"] == [2, None]
+
+    def test_nested_unbalanced_loop(self, createInterpreter):
+        analysis = analyzePointer(createInterpreter("+[>[>]<-]").tape)
+
+        outer = analysis.regions[1]
+        assert (outer.loop, outer.net, outer.net_low, outer.net_high) == (True, None, 0, inf)
+        assert analysis.low == 0
+
+    def test_safe_moves(self):
+        interpreter = BFInterpreter(4)
+        interpreter.setTape(">+[->>+<<]>>[>]")
+
+        codes = [op[0] for op in compileTape(interpreter.tape, memory_size=4).ops]
+        assert codes.count(BFOpCode.SafeMove) == 4
+        assert codes[-2] == BFOpCode.Move
+
+        # Memory too small for the loop body keeps its moves checked
+        codes = [op[0] for op in compileTape(interpreter.tape, memory_size=3).ops]
+        assert codes.count(BFOpCode.SafeMove) == 1
+
+        # Without loops the pointer position is exact
+        interpreter.setTape(">>+<<<")
+        codes = [op[0] for op in compileTape(interpreter.tape, memory_size=4).ops]
+        assert codes == [BFOpCode.SafeMove, BFOpCode.Add, BFOpCode.Move]
+
+    def test_safe_moves_match_analysis(self, createInterpreter):
+        for program in [">+[->>+<<]>>[>]", "+[>+[>]<<-]>>", ">>[-<+>]<[<<+>>-]", "+[[->+<]>]<<"]:
+            tape = createInterpreter(program).tape
+            analysis = analyzePointer(tape)
+
+            # Moves proven safe from the fused ops are the ones the per command analysis proves safe
+            for op in compileTape(tape, idioms=False, memory_size=6).ops:
+                if op[0] in [BFOpCode.Move, BFOpCode.SafeMove]:
+                    safe = analysis.moveSafe(op[OP_PC], op[OP_LOW], op[OP_HIGH], 6)
+                    assert (op[0] == BFOpCode.SafeMove) == safe, (program, op)
+
+    def test_safe_moves_execution(self):
+        for engine in [BFEngine.Fused, BFEngine.Generated]:
+            assertSameExecution(">+[->>+<<]>>[>]", memory_size=4, engine=engine)
+            assertSameExecution(">+++[->>+<<]>>[<]", memory_size=8, engine=engine)
+            assertSameExecution(">+>+<[->>>+<<<]>>>>>>", memory_size=6, engine=engine)
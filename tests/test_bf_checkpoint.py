@@ -0,0 +1,141 @@
+import os
+import pytest
+
+from src.bf import BFEngine, ProgramState, RunStopReason
+from src.bf_checkpoint import BFCheckpointError, loadCheckpoint, runWithCheckpoints, saveCheckpoint
+
+
+# Groups tests for writing and resuming checkpoints
+class TestBFCheckpoint:
+
+    def test_resume_matches_uninterrupted(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        program = "+++[>++++[>+<-]<-]>>[->+<]"
+        for max_value, paged in [(16, None), (300, None), (70000, None), (16, True), (1 << 40, True)]:
+            expected = createInterpreter(program, max_value=max_value, paged=paged)
+            expected.run()
+
+            first = createInterpreter(program, max_value=max_value, paged=paged)
+            first.run(max_steps=50)
+            saveCheckpoint(first, path)
+
+            resumed = createInterpreter(program, max_value=max_value, paged=paged)
+            loadCheckpoint(resumed, path)
+            assert resumed.step_count == 50
+            assert list(resumed.memory) == list(first.memory)
+
+            assert resumed.run().reason == RunStopReason.Halted
+            assert list(resumed.memory) == list(expected.memory)
+            assert resumed.step_count == expected.step_count
+
+    def test_resume_generated_engine(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        first = createInterpreter("+++[>++<-]>[>+<-]")
+        first.engine = BFEngine.Generated
+        first.run(max_steps=7)
+        saveCheckpoint(first, path)
+
+        resumed = createInterpreter("+++[>++<-]>[>+<-]")
+        resumed.engine = BFEngine.Generated
+        loadCheckpoint(resumed, path)
+        assert resumed.run().reason == RunStopReason.Halted
+        assert list(resumed.memory)[:3] == [0, 0, 6]
+
+    def test_resume_waiting_for_input(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        first = createInterpreter("+,+")
+        first.run()
+        saveCheckpoint(first, path)
+
+        resumed = createInterpreter("+,+")
+        loadCheckpoint(resumed, path)
+        assert resumed.state == ProgramState.WaitingForInput
+        resumed.readByte(4)
+        assert resumed.run().reason == RunStopReason.Halted
+        assert resumed.memory[0] == 5
+
+    def test_mismatched_tape(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        saveCheckpoint(createInterpreter("+++"), path)
+
+        with pytest.raises(BFCheckpointError, match="different tape"):
+            loadCheckpoint(createInterpreter("++-"), path)
+
+    def test_mismatched_max_value(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        saveCheckpoint(createInterpreter("+++"), path)
+
+        with pytest.raises(BFCheckpointError, match="maximum cell value"):
+            loadCheckpoint(createInterpreter("+++", max_value=300), path)
+
+    def test_truncated_checkpoint(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        saveCheckpoint(createInterpreter("+++", memory_size=64), path)
+        with open(path, "rb+") as checkpoint:
+            checkpoint.truncate(os.path.getsize(path) - 1)
+
+        with pytest.raises(BFCheckpointError, match="truncated"):
+            loadCheckpoint(createInterpreter("+++", memory_size=64), path)
+
+    def test_corrupt_positions(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+
+        # Checkpoints are written without checks, so positions no run could reach are set by hand
+        for field, value, message in [("ptr", 8, "pointer 8"), ("ptr", -1, "pointer -1"), ("pc", 4, "counter 4")]:
+            interpreter = createInterpreter("+++")
+            setattr(interpreter, field, value)
+            saveCheckpoint(interpreter, path)
+            with pytest.raises(BFCheckpointError, match=message):
+                loadCheckpoint(createInterpreter("+++"), path)
+
+        interpreter = createInterpreter("+++", memory_size=64, paged=True)
+        interpreter.memory.pages[1 << 20] = interpreter.memory.pages.get(0, bytearray(interpreter.memory.page_size))
+        saveCheckpoint(interpreter, path)
+        with pytest.raises(BFCheckpointError, match="outside memory"):
+            loadCheckpoint(createInterpreter("+++", memory_size=64, paged=True), path)
+
+    def test_resume_pointer_error(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        interpreter = createInterpreter("<")
+        assert interpreter.run().reason == RunStopReason.Error
+        saveCheckpoint(interpreter, path)
+
+        # The pointer is left past the edge of memory it failed to leave
+        resumed = createInterpreter("<")
+        loadCheckpoint(resumed, path)
+        assert resumed.state == ProgramState.Error
+        assert resumed.ptr == interpreter.ptr
+
+    def test_save_replaces_atomically(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        interpreter = createInterpreter("+++")
+        saveCheckpoint(interpreter, path)
+        interpreter.run()
+        saveCheckpoint(interpreter, path)
+
+        assert os.listdir(tmp_path) == ["run.bfcp"]
+
+    def test_run_with_checkpoints_every_steps(self, createInterpreter, tmp_path, monkeypatch):
+        path = str(tmp_path / "run.bfcp")
+        saved = []
+        monkeypatch.setattr("src.bf_checkpoint.saveCheckpoint",
+                            lambda interpreter, path: saved.append(interpreter.step_count))
+
+        interpreter = createInterpreter("+++++[>++<-]")
+        result = runWithCheckpoints(interpreter, path, every_steps=10)
+
+        assert result.reason == RunStopReason.Halted
+        assert result.steps == interpreter.step_count
+        assert saved == [10, 20, 30, 40, 41]
+
+    def test_run_with_checkpoints_max_steps(self, createInterpreter, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        interpreter = createInterpreter("+++++[>++<-]")
+        result = runWithCheckpoints(interpreter, path, every_seconds=60, max_steps=12)
+        assert result.reason == RunStopReason.StepBudget
+        assert result.steps == 12
+
+        resumed = createInterpreter("+++++[>++<-]")
+        loadCheckpoint(resumed, path)
+        assert resumed.step_count == 12
+        assert list(resumed.memory) == list(interpreter.memory)
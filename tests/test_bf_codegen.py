@@ -0,0 +1,94 @@
+from src.bf import BFEngine, BFInterpreter, ProgramState, RunStopReason
+from src.bf_codegen import generateFunction
+from src.bf_ir import compileTape
+from tests.test_bf import assertSameExecution
+
+
+# Groups tests comparing generated Python code against the naive step() execution
+class TestBFGeneratedRuntime:
+
+    def test_run_to_halt(self):
+        interpreter = assertSameExecution(">>+++++[->++<]>-<<", values=[1, 2, 3], engine=BFEngine.Generated)
+
+        assert interpreter.state == ProgramState.Halted
+        assert interpreter.memory[3] == 15
+
+    def test_nested_loops(self):
+        assertSameExecution("++[>+++[>+<-]<-]>>[-<+>]", engine=BFEngine.Generated)
+        assertSameExecution("+++[>+++[->+<]>[-<+>]<<-]", max_value=32, engine=BFEngine.Generated)
+
+    def test_empty_loop_body(self):
+        assertSameExecution("[]+", engine=BFEngine.Generated)
+
+    def test_errors(self):
+        assertSameExecution("+++++", max_value=3, values=[1], engine=BFEngine.Generated)
+        assertSameExecution("+--", engine=BFEngine.Generated)
+        assertSameExecution("+[>+]", memory_size=4, engine=BFEngine.Generated)
+        assertSameExecution("><<", engine=BFEngine.Generated)
+        assertSameExecution("[->+++<]", values=[6, 0], engine=BFEngine.Generated)
+        assertSameExecution("[-<+>]", values=[2], engine=BFEngine.Generated)
+
+    def test_step_budget_slices(self):
+        for budget in [1, 2, 3, 7]:
+            assertSameExecution("++[>+++[>+<-]<-]>>[-<+>]+++++[-]", max_steps=budget, engine=BFEngine.Generated)
+            assertSameExecution("+[->+++<]>[->+<]>>>+", max_steps=budget, memory_size=4, values=[5],
+                                engine=BFEngine.Generated)
+
+    def test_step_budget_is_exact(self, createInterpreter):
+        for budget in range(1, 40):
+            interpreter = createInterpreter("+++[->++<]>[-<+>]>+++++", values=[3], engine=BFEngine.Generated)
+
+            result = interpreter.run(max_steps=budget)
+            assert result.reason == RunStopReason.StepBudget
+            assert result.steps == budget
+            assert interpreter.step_count == budget
+
+    def test_step_budget_resumes_generated_run(self, createInterpreter):
+        interpreter = createInterpreter("+++[>+++++<-]>[->+<]", engine=BFEngine.Generated)
+
+        # The first block ends exactly on the budget, so the suspended generated run carries on
+        assert interpreter.run(max_steps=3).reason == RunStopReason.StepBudget
+        assert interpreter.generatedRun is not None
+        assert interpreter.run().reason == RunStopReason.Halted
+        assert interpreter.memory[2] == 15
+
+    def test_read_byte_resumes(self, createInterpreter):
+        program = ",[>+>+<<-]>[-<+>]<,[>>+<<-]>>."
+        inputs = [3, 4]
+
+        stepped = createInterpreter(program, engine=BFEngine.Generated)
+        ran = createInterpreter(program, engine=BFEngine.Generated)
+        for value in inputs:
+            while stepped.canStep():
+                stepped.step()
+
+            assert ran.run().reason == RunStopReason.WaitingForInput
+            assert ran.pc == stepped.pc
+            assert ran.step_count == stepped.step_count
+
+            stepped.readByte(value)
+            ran.readByte(value)
+
+        while stepped.canStep():
+            stepped.step()
+
+        assert ran.run().reason == RunStopReason.Halted
+        assert ran.generatedRun is None
+        assert list(ran.memory) == list(stepped.memory)
+        assert ran.step_count == stepped.step_count
+
+    def test_falls_back_after_step(self, createInterpreter):
+        interpreter = createInterpreter("+++>++", engine=BFEngine.Generated)
+        interpreter.step()
+
+        assert interpreter.run().reason == RunStopReason.Halted
+        assert interpreter.step_count == 6
+        assert interpreter.generatedRun is None
+
+    def test_deep_nesting_falls_back(self):
+        program = "+" + "[" * 60 + "-" + "]" * 60
+        interpreter = BFInterpreter(1, 16)
+        interpreter.setTape(program)
+
+        assert generateFunction(compileTape(interpreter.tape), len(interpreter.tape)) is None
+        assertSameExecution(program, engine=BFEngine.Generated)
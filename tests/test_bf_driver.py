@@ -0,0 +1,214 @@
+import pytest
+
+from time import perf_counter, sleep
+
+from src.bf import ProgramState
+from src.bf_driver import DRIVER_FRAME_SHARE, DRIVER_JOURNAL_MAX_HERTZ, DRIVER_VIEW_MARGIN, BFDriver, DriverCommand
+from src.bf_overview import BFMemoryOverview
+from src.bf_output import RingOutputSink
+
+
+def waitFor(driver: BFDriver, condition, timeout: float = 10.0):
+
+    # Waits until a snapshot published after every command sent so far meets condition
+    end = perf_counter() + timeout
+    while perf_counter() < end:
+        snapshot = driver.snapshot()
+        if driver.settled(snapshot) and condition(snapshot):
+            return snapshot
+        sleep(0.001)
+    pytest.fail("Driver did not reach the expected state")
+
+
+# Groups tests for running an interpreter on the driver thread
+class TestBFDriver:
+
+    def test_full_speed_matches_run(self, createInterpreter):
+        program = "++++++++[>++++++++[>+++<-]<-]>>."
+        plain = createInterpreter(program, max_value=255, output=RingOutputSink(4))
+        plain.run()
+
+        driver = BFDriver(createInterpreter(program, max_value=255, output=RingOutputSink(4)))
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        snapshot = waitFor(driver, lambda snapshot: snapshot.state == ProgramState.Halted)
+        driver.stop()
+
+        assert not snapshot.running
+        assert snapshot.step_count == plain.step_count
+        assert snapshot.ptr == plain.ptr
+        assert list(snapshot.memoryView()) == list(plain.memoryView())
+        assert list(snapshot.output.values) == [192]
+
+    def test_paced_steps(self, createInterpreter):
+        driver = BFDriver(createInterpreter("+" * 100, max_value=255), hertz=50)
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        waitFor(driver, lambda snapshot: snapshot.step_count >= 5)
+        driver.send(DriverCommand.Pause)
+        snapshot = waitFor(driver, lambda snapshot: not snapshot.running)
+        sleep(0.1)
+        driver.stop()
+
+        # Paused programs do not step, and 50 steps per second is nowhere near the end of the tape
+        assert driver.snapshot().step_count == snapshot.step_count
+        assert 5 <= snapshot.step_count < 100
+
+    def test_read_bytes(self, createInterpreter):
+        driver = BFDriver(createInterpreter(",>,>,", input_values=[]))
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        waitFor(driver, lambda snapshot: snapshot.state == ProgramState.WaitingForInput)
+
+        driver.send(DriverCommand.ReadBytes, [3, 4, 5])
+        snapshot = waitFor(driver, lambda snapshot: snapshot.state == ProgramState.Halted)
+        driver.stop()
+        assert list(snapshot.memoryView()[:3]) == [3, 4, 5]
+
+    def test_step_back_pauses(self, createInterpreter):
+        interpreter = createInterpreter("+++[]")
+        interpreter.enableJournal(10)
+        driver = BFDriver(interpreter, hertz=1000)
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        waitFor(driver, lambda snapshot: snapshot.step_count >= 3)
+
+        driver.send(DriverCommand.StepBack)
+        snapshot = waitFor(driver, lambda snapshot: not snapshot.running)
+        driver.stop()
+        assert snapshot.step_count == interpreter.step_count
+        assert not driver.snapshot().running
+
+    def test_toggle_halted(self, createInterpreter):
+        interpreter = createInterpreter("+")
+        interpreter.run()
+        driver = BFDriver(interpreter)
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        snapshot = waitFor(driver, lambda snapshot: True)
+        driver.stop()
+        assert not snapshot.running
+
+    def test_error_stops(self, createInterpreter):
+        driver = BFDriver(createInterpreter("-"))
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        snapshot = waitFor(driver, lambda snapshot: snapshot.state == ProgramState.Error)
+        driver.stop()
+        assert not snapshot.running
+        assert snapshot.stateDetail == "Cell Underflow at command 0. Minimum value 0"
+
+    def test_snapshot_is_a_copy(self, createInterpreter):
+        interpreter = createInterpreter("+>+")
+        interpreter.enableProfiler()
+        driver = BFDriver(interpreter)
+        driver.start()
+        driver.send(DriverCommand.SetHeatmap, True)
+        snapshot = waitFor(driver, lambda snapshot: snapshot.profiler is not None)
+        driver.send(DriverCommand.Toggle)
+        waitFor(driver, lambda snapshot: snapshot.state == ProgramState.Halted)
+        driver.stop()
+
+        assert snapshot.step_count == 0
+        assert list(snapshot.memoryView()[:2]) == [0, 0]
+        assert snapshot.profiler.pcHeat() == [0.0, 0.0, 0.0]
+        assert interpreter.profiler.steps() == 3
+
+    def test_snapshot_view(self, createInterpreter):
+        interpreter = createInterpreter(">" * 200 + "+", memory_size=100000, paged=True)
+        interpreter.setMemory([7] * 1500)
+        overview = BFMemoryOverview(100)
+        driver = BFDriver(interpreter, overview=overview)
+        driver.start()
+        driver.send(DriverCommand.SetView, (500, 520))
+        driver.send(DriverCommand.Toggle)
+        snapshot = waitFor(driver, lambda snapshot: snapshot.state == ProgramState.Halted)
+        driver.stop()
+
+        # Cells in view and around the pointer are copied, the rest read as the default
+        memory = snapshot.memoryView()
+        assert len(memory) == 100000
+        assert memory[200] == 8 and memory[500] == 7 and memory[900] == 0
+        assert memory[500 - DRIVER_VIEW_MARGIN] == 7 and memory[520 + DRIVER_VIEW_MARGIN] == 0
+
+        # The overview is refreshed by the driver and copied
+        assert list(snapshot.overview.columns[:3]) == [8, 7, 0]
+        assert snapshot.overview is not overview
+
+    def test_rates_beyond_frame_rate(self, createInterpreter):
+        driver = BFDriver(createInterpreter("+[>+<]" + "-" * 10, 8, 1 << 30), hertz=2000)
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        sleep(0.5)
+        driver.send(DriverCommand.Pause)
+        snapshot = waitFor(driver, lambda snapshot: not snapshot.running)
+        driver.stop()
+
+        # Far more than one step per frame, without running ahead of the requested rate
+        assert 250 <= snapshot.step_count <= 1100
+
+    def test_achieved_rate(self, createInterpreter):
+        driver = BFDriver(createInterpreter("+[>+<]", 8, 1 << 30))
+        driver.start()
+        driver.send(DriverCommand.Toggle)
+        snapshot = waitFor(driver, lambda snapshot: snapshot.achieved_hertz > 0)
+        assert snapshot.hertz is None
+
+        driver.send(DriverCommand.SetHertz, 100)
+        snapshot = waitFor(driver, lambda snapshot: snapshot.achieved_hertz < 200)
+        driver.stop()
+        assert snapshot.hertz == 100
+        assert 50 <= snapshot.achieved_hertz <= 110
+
+    def test_frame_share(self, createInterpreter):
+        interpreter = createInterpreter("+[>+<]", 8, 1 << 30)
+        driver = BFDriver(interpreter, target_fps=10)
+        driver.running = True
+        while driver.frame_used < driver.frame_seconds * DRIVER_FRAME_SHARE:
+            driver.runDue()
+
+        # An unlimited rate stops stepping for the rest of the frame once its share is used
+        steps = interpreter.step_count
+        driver.runDue()
+        assert interpreter.step_count == steps > 0
+        assert 0 < driver.delay() <= driver.frame_seconds
+
+    def test_journal_only_at_slow_rates(self, createInterpreter):
+        interpreter = createInterpreter("+[>+<]", 8, 1 << 30)
+        driver = BFDriver(interpreter, hertz=1, journal_capacity=10)
+        assert interpreter.journal is not None and driver.snapshot().journaling
+        driver.start()
+
+        # Faster rates drop the journal so run() can use the fused engine, and slower ones start a new one
+        driver.send(DriverCommand.SetHertz, DRIVER_JOURNAL_MAX_HERTZ * 2)
+        waitFor(driver, lambda snapshot: not snapshot.journaling)
+        driver.send(DriverCommand.SetHertz, None)
+        driver.send(DriverCommand.Toggle)
+        waitFor(driver, lambda snapshot: snapshot.step_count > 1000)
+        driver.send(DriverCommand.SetHertz, DRIVER_JOURNAL_MAX_HERTZ)
+        waitFor(driver, lambda snapshot: snapshot.journaling)
+        driver.stop()
+        assert interpreter.journal is not None
+
+    def test_profiler_follows_heatmap(self, createInterpreter):
+        interpreter = createInterpreter("+>+")
+        driver = BFDriver(interpreter)
+        driver.start()
+        driver.send(DriverCommand.SetHeatmap, True)
+        waitFor(driver, lambda snapshot: snapshot.profiler is not None)
+        assert interpreter.profiler is not None
+
+        # Hiding the heatmap stops counting, unless the profiler was enabled before the driver started
+        driver.send(DriverCommand.SetHeatmap, False)
+        waitFor(driver, lambda snapshot: snapshot.profiler is None)
+        driver.stop()
+        assert interpreter.profiler is None
+
+        interpreter.enableProfiler()
+        driver = BFDriver(interpreter)
+        driver.start()
+        driver.send(DriverCommand.SetHeatmap, True)
+        driver.send(DriverCommand.SetHeatmap, False)
+        waitFor(driver, lambda snapshot: True)
+        driver.stop()
+        assert interpreter.profiler is not None
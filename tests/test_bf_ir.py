@@ -0,0 +1,66 @@
+from src.bf import BFInterpreter
+from src.bf_ir import BFOpCode, compileTape
+
+
+# Groups tests related to compiling a tape into fused ops
+class TestBFCompile:
+
+    def test_fuse_add_runs(self, createInterpreter):
+        program = compileTape(createInterpreter("+++--").tape)
+
+        assert len(program.ops) == 1
+        assert program.ops[0] == (BFOpCode.Add, 1, 0, 5, 0, 3, None)
+        assert program.opIndex == [0, -1, -1, -1, -1, 1]
+
+    def test_fuse_move_runs(self, createInterpreter):
+        program = compileTape(createInterpreter("<<>").tape)
+
+        assert len(program.ops) == 1
+        assert program.ops[0] == (BFOpCode.Move, -1, 0, 3, -2, 0, None)
+
+    def test_loop_jump_targets(self, createInterpreter):
+        program = compileTape(createInterpreter("+[->+<.]").tape)
+
+        codes = [op[0] for op in program.ops]
+        assert codes == [BFOpCode.Add, BFOpCode.JumpIfZero, BFOpCode.Add, BFOpCode.Move,
+                         BFOpCode.Add, BFOpCode.Move, BFOpCode.PrintByte, BFOpCode.JumpIfNonZero]
+
+        # Loop start skips past the close, loop close returns to the first op of the body
+        assert program.ops[1][1] == 8
+        assert program.ops[7][1] == 2
+        assert program.ops[7][2] == 7
+
+    def test_io_ops(self, createInterpreter):
+        program = compileTape(createInterpreter(",.").tape)
+
+        assert program.ops[0] == (BFOpCode.ReadByte, 0, 0, 1, 0, 0, None)
+        assert program.ops[1] == (BFOpCode.PrintByte, 0, 1, 1, 0, 0, None)
+
+    def test_idiom_clear_loop(self, createInterpreter):
+        program = compileTape(createInterpreter("[-]").tape)
+
+        assert program.ops[0] == (BFOpCode.LinearLoop, 3, 0, 1, 0, 0, (1, -1, 0, ()))
+
+    def test_idiom_multiply_loop(self, createInterpreter):
+        program = compileTape(createInterpreter("[->++>+++<<]").tape)
+
+        assert program.ops[0][0] == BFOpCode.LinearLoop
+        assert program.ops[0][4:] == (0, 2, (1, -1, 0, ((1, 2, 0, 2), (2, 3, 0, 3))))
+
+    def test_idiom_rejects_unbalanced_loop(self, createInterpreter):
+        assert compileTape(createInterpreter("[->+]").tape).ops[0][0] == BFOpCode.JumpIfZero
+
+    def test_idiom_rejects_counting_up_loop(self, createInterpreter):
+        assert compileTape(createInterpreter("[+>+<]").tape).ops[0][0] == BFOpCode.JumpIfZero
+
+    def test_idiom_rejects_nested_loop(self, createInterpreter):
+        program = compileTape(createInterpreter("[-[-]]").tape)
+
+        assert program.ops[0][0] == BFOpCode.JumpIfZero
+        assert program.ops[2][0] == BFOpCode.LinearLoop
+
+    def test_idioms_disabled(self):
+        interpreter = BFInterpreter(1)
+        interpreter.setTape("[-]")
+
+        assert compileTape(interpreter.tape, idioms=False).ops[0][0] == BFOpCode.JumpIfZero
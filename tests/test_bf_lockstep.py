@@ -0,0 +1,93 @@
+import pytest
+
+from src.bf import BFInitError, BFInterpreter, BFRuntimeError, ProgramState
+from src.bf_input import ListInputProvider
+from src.bf_lockstep import BFLockstep
+from src.bf_output import CollectorOutputSink
+
+
+def runScalar(program: str, values: list, memory_size: int, max_value: int, input_values: list = None,
+              max_steps: int = None) -> BFInterpreter:
+    interpreter = BFInterpreter(memory_size, max_value)
+    interpreter.setMemory(values)
+    interpreter.setTape(program)
+    interpreter.output = CollectorOutputSink(max_value)
+    interpreter.input = ListInputProvider(input_values or [])
+    try:
+        while interpreter.canStep() and (max_steps is None or interpreter.step_count < max_steps):
+            interpreter.step()
+    except BFRuntimeError:
+        pass
+    return interpreter
+
+
+def assertLanesMatch(lockstep: BFLockstep, program: str, memories: list, memory_size: int, max_value: int,
+                     input_values: list = None, max_steps: int = None):
+    for lane, values in enumerate(memories):
+        expected = runScalar(program, values, memory_size, max_value, input_values, max_steps)
+        assert lockstep.memory[lane].tolist() == list(expected.memory)
+        assert lockstep.ptrs[lane] == expected.ptr
+        assert lockstep.pcs[lane] == expected.pc
+        assert lockstep.step_counts[lane] == expected.step_count
+        assert lockstep.states[lane] == expected.state
+        assert lockstep.stateDetails[lane] == expected.stateDetail
+        assert lockstep.outputs[lane] == list(expected.output.values)
+
+
+# Groups tests for running one program over many memories in lockstep
+class TestBFLockstep:
+
+    def test_lanes_match_scalar(self):
+        program = ">[->+++[->+>+<<]>[-<+>]<[-]<]>>>."
+        memories = [[0, v] for v in range(0, 40)]
+        lockstep = BFLockstep(program, memories, 6, 255)
+
+        assert lockstep.run() == 0
+        assert lockstep.memory[:, 4].tolist() == [3 * v for v in range(0, 40)]
+        assertLanesMatch(lockstep, program, memories, 6, 255)
+
+    def test_lane_errors(self):
+        program = ">[->++<]>[->+<]>[>]"
+        memories = [[0, 0], [0, 1], [0, 9]]
+        lockstep = BFLockstep(program, memories, 4, 16)
+        lockstep.run()
+
+        assert lockstep.states == [ProgramState.Halted, ProgramState.Error, ProgramState.Error]
+        assert lockstep.stateDetails[1] == "Memory pointer out of bounds at command 17. Maximum allowed: 3"
+        assert lockstep.stateDetails[2] == "Cell Overflow at command 4: Maximum value 16"
+        assertLanesMatch(lockstep, program, memories, 4, 16)
+
+    def test_step_budget(self):
+        program = "++[>+++<-]>[-]"
+        memories = [[0], [3], [6]]
+        for max_steps in [1, 2, 5, 11, 20]:
+            lockstep = BFLockstep(program, memories, 2, 32)
+            lockstep.run(max_steps)
+
+            assertLanesMatch(lockstep, program, memories, 2, 32, max_steps=max_steps)
+
+        # Lanes stopped part way through a fused run resume exactly where step() would
+        lockstep = BFLockstep(program, memories, 2, 32)
+        while lockstep.run(3) > 0:
+            pass
+        assertLanesMatch(lockstep, program, memories, 2, 32)
+
+    def test_input(self):
+        program = ",[.,]"
+        memories = [[], [], []]
+        lockstep = BFLockstep(program, memories, 2, 16, input_values=[4, 5])
+        lockstep.run()
+
+        assert lockstep.states == [ProgramState.WaitingForInput] * 3
+        assert lockstep.outputs == [[4, 5]] * 3
+        assertLanesMatch(lockstep, program, memories, 2, 16, [4, 5])
+
+    def test_init_errors(self):
+        with pytest.raises(BFInitError):
+            BFLockstep("+", [], 2, 16)
+        with pytest.raises(BFInitError):
+            BFLockstep("+[", [[0]], 2, 16)
+        with pytest.raises(BFInitError):
+            BFLockstep("+", [[0], [17]], 2, 16)
+        with pytest.raises(BFInitError):
+            BFLockstep(",", [[0]], 2, 16, input_values=[20])
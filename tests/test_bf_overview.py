@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from src.bf import BFInterpreter
+from src.bf_memory import PagedMemory
+from src.bf_overview import OVERVIEW_SWEEP_CELLS, BFMemoryOverview
+
+
+# Groups tests for reducing memory to a fixed number of columns
+class TestBFMemoryOverview:
+
+    def test_reductions(self):
+        interpreter = BFInterpreter(1005, 100)
+        interpreter.setMemory([(i * 7) % 101 for i in range(0, 1005)])
+        values = np.array(interpreter.memoryView(), dtype=np.float64)
+        for reduction in ["max", "mean"]:
+            overview = BFMemoryOverview(100, reduction)
+            overview.refresh(interpreter.memoryView())
+            assert overview.bucket == 11 and overview.column_count == 92
+
+            # The last column only holds the 4 cells left over
+            for column in [0, 30, 91]:
+                bucket = values[column * 11:(column + 1) * 11]
+                assert overview.columns[column] == pytest.approx(bucket.max() if reduction == "max" else bucket.mean())
+
+    def test_paged_memory(self):
+        memory = PagedMemory(1 << 20, 255, 3, page_size=256)
+        memory[1000] = 200
+        memory[1001] = 1
+        for reduction in ["max", "mean"]:
+            overview = BFMemoryOverview(64, reduction)
+            overview.refresh(memory)
+
+            # Unallocated pages count as the default value
+            assert overview.bucket == 1 << 14
+            column = overview.columns[0]
+            assert column == (200 if reduction == "max" else (200 + 1 + 3 * ((1 << 14) - 2)) / (1 << 14))
+            assert list(overview.columns[1:]) == [3] * 63
+
+        # A page whose cells are all below the default shows them rather than the default
+        memory = PagedMemory(512, 255, 9, page_size=256)
+        for cell in range(256, 512):
+            memory[cell] = 2
+        overview = BFMemoryOverview(2)
+        overview.refresh(memory)
+        assert list(overview.columns) == [9, 2]
+
+    def test_sweep(self):
+        cell_count = 4 * OVERVIEW_SWEEP_CELLS
+        memory = PagedMemory(cell_count, 255, page_size=4096)
+        overview = BFMemoryOverview(64)
+        overview.refresh(memory)
+
+        # Writes away from the pointer show once the sweep reaches them, a quarter of memory at a time
+        memory[cell_count - 1] = 50
+        memory[0] = 40
+        for _ in range(0, 3):
+            overview.refresh(memory, 0)
+            assert overview.columns[0] == 40 and overview.columns[-1] == 0
+        overview.refresh(memory, 0)
+        assert overview.columns[-1] == 50
+
+    def test_growing_memory(self):
+        interpreter = BFInterpreter(100, 255, grow_memory=True)
+        overview = BFMemoryOverview(10)
+        overview.refresh(interpreter.memoryView())
+        assert (overview.capacity, overview.bucket) == (100, 10)
+
+        # Growing past the covered cells doubles them, and columns past the end of memory are empty
+        interpreter.memory.grow(150)
+        interpreter.memory[149] = 7
+        overview.refresh(interpreter.memoryView(), 149)
+        assert (overview.capacity, overview.bucket, overview.cell_count) == (200, 20, 150)
+        assert list(overview.columns[7:]) == [7, 0, 0]
+        assert overview.cellAt(1.0) == 149
+
+    def test_list_memory(self):
+        interpreter = BFInterpreter(30, 1 << 70)
+        interpreter.setMemory([1 << 69, 5])
+        overview = BFMemoryOverview(3)
+        overview.refresh(interpreter.memoryView())
+        assert list(overview.columns) == [float(1 << 69), 0, 0]
+
+    def test_reduction_error(self):
+        with pytest.raises(ValueError):
+            BFMemoryOverview(100, reduction="median")
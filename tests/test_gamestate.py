@@ -0,0 +1,38 @@
+from src.gamestate import Gamestate
+
+
+# Groups tests for stepping through execution rates
+class TestGamestate:
+
+    def test_multiply_cycles_through_unlimited(self):
+        gs = Gamestate(step_hertz=1)
+        rates = []
+        for _ in range(0, 23):
+            gs.multiplyStepHertz(factor=2, loop=True)
+            rates.append(gs.step_hertz)
+
+        assert rates[:6] == [2, 4, 8, 16, 32, 64]
+        assert rates[19] == Gamestate.maxHertz
+        assert rates[20] is None
+        assert rates[21:] == [1, 2]
+
+    def test_clamped_without_loop(self):
+        gs = Gamestate(step_hertz=Gamestate.maxHertz)
+        gs.multiplyStepHertz(factor=2, loop=False)
+        assert gs.step_hertz == Gamestate.maxHertz
+
+        gs.setStepHertz(0)
+        assert gs.step_hertz == Gamestate.minHertz
+
+        gs.setStepHertz(None)
+        gs.multiplyStepHertz(factor=2, loop=False)
+        assert gs.step_hertz is None
+
+    def test_down_from_unlimited(self):
+        gs = Gamestate(step_hertz=None)
+        gs.incrementStepHertz(-1)
+        assert gs.step_hertz == Gamestate.maxHertz
+
+        gs = Gamestate(step_hertz=1)
+        gs.incrementStepHertz(-1)
+        assert gs.step_hertz is None
@@ -0,0 +1,123 @@
+import json
+import pytest
+
+from src.bf import RunStopReason
+from src.environment import BFEnvironment, EnvironmentInitError, parseEnvironment
+from src.grader import BFChallenge, ChallengeInitError, gradeDirectory, gradeProgram, loadChallenge, main, resultsTable
+
+
+def environmentJson(**memory) -> dict:
+    content = {"cell_count": 4, "cell_max_value": 16, "cell_default_value": 0, "cell_initial_values": [3, 2]}
+    content.update(memory)
+    return {"version": "1", "memory": content}
+
+
+# Groups tests for loading environments outside of main.py
+class TestEnvironment:
+
+    def test_parse_environment(self):
+        environment = parseEnvironment(environmentJson(cell_growable=True))
+
+        assert environment.cell_count == 4
+        assert environment.max_value == 16
+        assert environment.initial_values == [3, 2]
+        assert environment.growable
+
+        interpreter = environment.createInterpreter("+")
+        assert list(interpreter.memory)[:3] == [3, 2, 0]
+
+    def test_parse_environment_input(self):
+        environment = parseEnvironment(dict(environmentJson(), input=[4, 5]))
+
+        interpreter = environment.createInterpreter(",>,")
+        assert interpreter.run().reason == RunStopReason.Halted
+        assert list(interpreter.memory)[:2] == [4, 5]
+
+        with pytest.raises(EnvironmentInitError):
+            parseEnvironment(dict(environmentJson(), input=[17]))
+
+    def test_parse_environment_errors(self):
+        with pytest.raises(EnvironmentInitError):
+            parseEnvironment(environmentJson(cell_count=0))
+        with pytest.raises(EnvironmentInitError):
+            parseEnvironment(environmentJson(cell_initial_values=[17]))
+        with pytest.raises(EnvironmentInitError):
+            parseEnvironment(environmentJson(cell_growable="yes"))
+
+
+# Groups tests for grading submissions against a challenge
+class TestGrader:
+
+    def createChallenge(self) -> BFChallenge:
+        return BFChallenge(BFEnvironment(4, 16, 0, [3, 2]), expected_memory=[0, 5], expected_pointer=0,
+                           expected_output=[5], max_steps=1000)
+
+    def test_grade_pass(self):
+        result = gradeProgram(self.createChallenge(), "a.bf", "[->+<]>.<")
+
+        assert result.passed
+        assert result.step_count == 22
+        assert result.state == "Halted"
+
+    def test_grade_failures(self):
+        challenge = self.createChallenge()
+
+        assert gradeProgram(challenge, "b.bf", "[->+<]").detail == "Output expected [5], found []"
+        assert gradeProgram(challenge, "c.bf", "[->+<]>.").detail == "Pointer expected at 0, found 1"
+        assert gradeProgram(challenge, "d.bf", "[->++<]>.").detail == "Cell 1 expected 5, found 8"
+        assert gradeProgram(challenge, "e.bf", "+[]").detail == "Step limit of 1000 reached"
+        assert gradeProgram(challenge, "f.bf", ",").detail == "Program is waiting for input"
+        assert gradeProgram(challenge, "g.bf", "<").detail == "Memory pointer less than 0 at command 0"
+        assert gradeProgram(challenge, "h.bf", "x").detail == "Illegal symbol 'x' at command 0"
+
+    def test_grade_detects_loops(self):
+        challenge = self.createChallenge()
+        challenge.max_steps = 10_000_000
+        challenge.detect_loops = True
+        result = gradeProgram(challenge, "a.bf", "+[>+[-]<]")
+
+        assert not result.passed
+        assert result.state == "InfiniteLoop"
+        assert result.step_count < 100
+        assert gradeProgram(challenge, "b.bf", "[->+<]>.<").passed
+
+    def test_load_challenge(self, tmp_path):
+        (tmp_path / "env.json").write_text(json.dumps(environmentJson()))
+        (tmp_path / "challenge.json").write_text(json.dumps({
+            "version": "1",
+            "environment": "env.json",
+            "expected": {"memory": [0, 5]},
+            "limits": {"max_steps": 50, "detect_loops": True}
+        }))
+
+        challenge = loadChallenge(str(tmp_path / "challenge.json"))
+        assert challenge.environment.initial_values == [3, 2]
+        assert challenge.expected_memory == [0, 5]
+        assert challenge.expected_pointer is None
+        assert challenge.max_steps == 50
+        assert challenge.detect_loops
+
+    def test_load_challenge_errors(self, tmp_path):
+        path = tmp_path / "challenge.json"
+        path.write_text(json.dumps(dict(environmentJson(), expected={"memory": "0, 5"})))
+
+        with pytest.raises(ChallengeInitError):
+            loadChallenge(str(path))
+
+    def test_grade_directory(self, tmp_path):
+        for name, program in [("b.bf", "[->+<]"), ("a.bf", "[->+<]>.<"), ("notes.txt", "")]:
+            (tmp_path / name).write_text(program)
+
+        results = gradeDirectory(self.createChallenge(), str(tmp_path), workers=2)
+        assert [(r.submission, r.passed) for r in results] == [("a.bf", True), ("b.bf", False)]
+        assert resultsTable(results).splitlines()[-1] == "1/2 passed"
+
+    def test_missing_submissions(self, tmp_path, capsys):
+        (tmp_path / "env.json").write_text(json.dumps(environmentJson()))
+        (tmp_path / "challenge.json").write_text(json.dumps({"version": "1", "environment": "env.json"}))
+        (tmp_path / "prg.bf").write_text("+")
+
+        # A missing directory or a file in its place is reported like a bad challenge file
+        for submissions in ["missing", "prg.bf"]:
+            assert main([str(tmp_path / "challenge.json"), str(tmp_path / submissions)]) == 2
+            assert "Unable to read submissions" in capsys.readouterr().err
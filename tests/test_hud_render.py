@@ -0,0 +1,48 @@
+import pygame as pg
+
+from src.bf import BFInterpreter
+from src.bf_output import RingOutputSink
+from src.hud_render import HudRenderer, rateString
+
+
+# Groups tests for the HUD text
+class TestHudRenderer:
+
+    def createRenderer(self) -> HudRenderer:
+        if not pg.get_init():
+            pg.init()
+        interpreter = BFInterpreter(8, 16)
+        interpreter.setTape("+.+.")
+        interpreter.output = RingOutputSink(4)
+        return HudRenderer(interpreter=interpreter, output=interpreter.output)
+
+    def test_rate_string(self):
+        assert rateString(1) == "1Hz"
+        assert rateString(1 << 20) == "1,048,576Hz"
+        assert rateString(None) == "Unlimited"
+
+    def test_update_reports_changed_lines(self):
+        hud = self.createRenderer()
+        hud_rect = pg.Rect(50, 50, 0, 0)
+        assert len(hud.update(hud_rect, 1, 0.0)) == 4
+        assert hud.update(hud_rect, 1, 0.0) == []
+
+        # Printing changes the step count and the output line, any other step only the step count
+        hud.interpreter.step()
+        hud.update(hud_rect, 1, 0.0)
+        hud.interpreter.step()
+        assert len(hud.update(hud_rect, 1, 0.0)) == 2
+        hud.interpreter.step()
+        assert hud.update(hud_rect, 1, 0.0) == [hud.text_rects[2]]
+
+        # Rendered text is reused until the rate changes
+        surface = hud.hertz_text_surface
+        hud.update(hud_rect, 1, 0.2)
+        assert hud.hertz_text_surface is surface
+        assert len(hud.update(hud_rect, None, 2000.0)) == 1
+        assert hud.hertz_text_surface is not surface
+
+        # Losing undo is shown on the rate line
+        surface = hud.hertz_text_surface
+        assert len(hud.update(hud_rect, None, 2000.0, undo=False)) == 1
+        assert hud.hertz_text_surface.get_width() > surface.get_width()
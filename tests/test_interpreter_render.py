@@ -0,0 +1,151 @@
+import pygame as pg
+import src.rendering_contants as rc
+
+from src.bf import BFInterpreter
+from src.bf_driver import BFSnapshot
+from src.interpreter_render import BFRenderer
+
+
+def drawEveryCell(renderer: BFRenderer, screen: pg.Surface, interpreter_rect: pg.Rect):
+
+    # The memory cells drawn one rect at a time for every cell, as the renderer did before culling
+    memory = renderer.interpreter.memoryView()
+    for i in range(0, len(memory)):
+        height = memory[i] * renderer.cell_unit_height
+        draw_x = interpreter_rect.left + (renderer.cell_width + renderer.cell_buffer) * i - renderer.camera_offset
+        pg.draw.rect(screen, rect=pg.Rect(draw_x - renderer.cell_buffer/4, interpreter_rect.top + renderer.cell_base_y,
+                                          renderer.cell_width + renderer.cell_buffer/2, 10), color=rc.CLR_RED)
+        pg.draw.rect(screen, rect=pg.Rect(draw_x, interpreter_rect.top + renderer.cell_base_y - height,
+                                          renderer.cell_width, height), color=rc.CLR_WHITE)
+
+
+# Groups tests for drawing the memory cells
+class TestBFRenderer:
+
+    def createRenderer(self, memory_size: int) -> BFRenderer:
+        if not pg.get_init():
+            pg.init()
+        interpreter = BFInterpreter(memory_size, 100)
+        interpreter.setMemory([(i * 7) % 101 for i in range(0, memory_size)])
+        return BFRenderer(interpreter=interpreter, cell_width=50, cell_buffer=24, cell_max_height=300)
+
+    def test_visible_cells(self):
+        renderer = self.createRenderer(100)
+        for offset in [-2000, -400, -37, 0, 12, 74, 1000, 7000, 9000]:
+            renderer.setCameraOffset(offset)
+            first, stop = renderer.visibleCells(800, 50, 100)
+
+            # Every cell with a base on screen is in the range, which is at most one cell wider on each side
+            visible = [i for i in range(0, 100) if 50 + 74 * i - offset - 6 + 62 > 0 and 50 + 74 * i - offset - 6 < 800]
+            assert all(first <= i < stop for i in visible)
+            assert stop - first <= len(visible) + 2
+
+    def test_matches_drawing_every_cell(self):
+        renderer = self.createRenderer(40)
+        renderer.first_render = False
+        culled = pg.Surface((800, 600))
+        every = pg.Surface((800, 600))
+        for offset in [-300, 0, 500, 2000]:
+
+            # With no time passed the camera stays where it is
+            renderer.setCameraOffset(offset)
+            culled.fill(rc.CLR_BLACK)
+            renderer.render(culled, pg.Rect(50, 200, 0, 0), 0)
+
+            every.fill(rc.CLR_BLACK)
+            drawEveryCell(renderer, every, pg.Rect(50, 200, 0, 0))
+
+            # The pointer is drawn below the cell bases
+            culled.fill(rc.CLR_BLACK, pg.Rect(0, 520, 800, 80))
+            assert pg.image.tobytes(culled, "RGB") == pg.image.tobytes(every, "RGB")
+
+    def test_sprites_per_height(self):
+        renderer = self.createRenderer(100000)
+        screen = pg.Surface((800, 600))
+        renderer.render(screen, pg.Rect(50, 200, 0, 0), 0)
+
+        # One sprite for each distinct visible height, never one per cell
+        assert 0 < len(renderer.column_sprites) <= 12
+
+    def test_update_reports_changed_cells(self):
+        renderer = self.createRenderer(40)
+        screen = pg.Surface((800, 600))
+        rect = pg.Rect(50, 200, 0, 0)
+        assert renderer.update(screen, rect, 0) == [renderer.area(800, rect)]
+        assert renderer.update(screen, rect, 0) == []
+
+        # Without time passing the camera stays put, so only the written cell and the pointer change
+        interpreter = renderer.interpreter
+        interpreter.memory[interpreter.ptr + 1] = 3
+        assert renderer.update(screen, rect, 0) == [renderer.cellArea(rect, interpreter.ptr + 1)]
+
+        interpreter.ptr += 1
+        dirty = renderer.update(screen, rect, 0)
+        assert dirty == [renderer.pointerRect(rect, interpreter.ptr - 1).inflate(2, 2),
+                         renderer.pointerRect(rect, interpreter.ptr).inflate(2, 2)]
+
+        # Once the camera starts following the pointer everything moves
+        assert renderer.update(screen, rect, 0.1) == [renderer.area(800, rect)]
+
+    def test_dirty_rects_match_full_redraw(self):
+        renderer = self.createRenderer(40)
+        interpreter = renderer.interpreter
+        rect = pg.Rect(50, 200, 0, 0)
+        partial = pg.Surface((800, 600))
+        full = pg.Surface((800, 600))
+
+        for change in range(0, 20):
+            interpreter.memory[(change * 3) % 40] = (change * 11) % 101
+            if change % 4 == 0:
+                interpreter.ptr = (interpreter.ptr + 1) % 40
+
+            for dirty in renderer.update(partial, rect, 0.05 if change % 5 == 0 else 0):
+                partial.set_clip(dirty)
+                partial.fill(rc.CLR_BLACK)
+                renderer.draw(partial, rect)
+            partial.set_clip(None)
+
+            full.fill(rc.CLR_BLACK)
+            renderer.draw(full, rect)
+            assert pg.image.tobytes(partial, "RGB") == pg.image.tobytes(full, "RGB")
+
+    def test_look_at(self):
+        renderer = self.createRenderer(100)
+        screen = pg.Surface((800, 600))
+        rect = pg.Rect(50, 200, 0, 0)
+        renderer.update(screen, rect, 0)
+
+        # The camera stays on the cell it was sent to while the pointer moves, until it follows the pointer again
+        renderer.lookAt(60, 800)
+        assert renderer.update(screen, rect, 0) == [renderer.area(800, rect)]
+        renderer.interpreter.ptr = 3
+        renderer.update(screen, rect, 1.0)
+        assert renderer.camera_offset == renderer.cameraFor(60, 800)
+
+        renderer.followPointer()
+        renderer.update(screen, rect, 1.0)
+        assert renderer.camera_offset == renderer.cameraFor(60, 800) - 100
+
+    def test_windowed_snapshot(self):
+        interpreter = BFInterpreter(5000, 100)
+        interpreter.setTape("+[>+>++<]" * 300)
+        interpreter.enableProfiler()
+        interpreter.run(4000)
+        screen = pg.Surface((800, 600))
+        rect = pg.Rect(50, 200, 0, 0)
+
+        # Drawing from a snapshot of the cells in view and the commands around the pc looks the same as drawing
+        # from a copy of everything
+        drawn = []
+        for view in [None, (0, 0)]:
+            renderer = self.createRenderer(1)
+            renderer.heatmap = True
+            renderer.interpreter = BFSnapshot(interpreter, False, 0, True)
+            renderer.update(screen, rect, 0)
+            if view is not None:
+                view = renderer.visibleCells(800, rect.left, 5000)
+                renderer.interpreter = BFSnapshot(interpreter, False, 0, True, view=view)
+            screen.fill(rc.CLR_BLACK)
+            renderer.draw(screen, rect)
+            drawn.append(pg.image.tobytes(screen, "RGB"))
+        assert drawn[0] == drawn[1]
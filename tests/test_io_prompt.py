@@ -1,4 +1,6 @@
-from src.io_prompt import IOPrompt
+import pytest
+
+from src.io_prompt import IOPrompt, IOPromptError
 import pygame as pg
 
 
@@ -127,3 +129,28 @@ class TestIOPrompt:
         assert prompt.prompt == "test:"
         assert prompt.response == "hell"
         assert prompt.redraw is True
+
+    def test_response_values(self):
+
+        self.initialize_pygame()
+
+        prompt = IOPrompt("test:", "3,14,0")
+        assert prompt.responseValues() == [3, 14, 0]
+
+        prompt.setResponse("3,,4")
+        with pytest.raises(IOPromptError):
+            prompt.responseValues()
+
+    def test_update_reports_changes(self):
+        self.initialize_pygame()
+
+        prompt = IOPrompt("test:")
+        prompt_rect = pg.Rect(100, 200, 400, 50)
+        assert prompt.update(prompt_rect) == [prompt.area(prompt_rect)]
+        assert prompt.update(prompt_rect) == []
+
+        # Shorter text still covers where the longer text was
+        prompt.appendResponse("12345")
+        longer = prompt.update(prompt_rect)[0]
+        prompt.backspaceResponse()
+        assert prompt.update(prompt_rect) == [longer]
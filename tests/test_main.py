@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def runMain(*args) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "main.py", *args], cwd=ROOT, capture_output=True, text=True, timeout=60)
+
+
+# Groups tests for running programs from the command line without the visualizer
+class TestHeadless:
+
+    def test_headless_result(self):
+        process = runMain("--headless", "-s", "samples/memory_set/prg.bf", "-e", "samples/user_io/env.json")
+
+        assert process.returncode == 0
+        result = json.loads(process.stdout)
+        assert result["state"] == "Halted"
+        assert result["step_count"] == 48
+        assert result["pointer"] == 2
+        assert result["memory"] == [0, 0, 0, 15, 0, 0, 0, 0]
+
+    def test_headless_error(self):
+        process = runMain("--headless", "-s", "samples/memory_set/prg.bf", "-e", "samples/memory_set/env.json")
+
+        assert process.returncode == 1
+        result = json.loads(process.stdout)
+        assert result["state"] == "Error"
+        assert result["detail"] == "Cell Overflow at command 10: Maximum value 16"
+
+    def test_headless_does_not_import_pygame(self):
+        script = ("import sys; sys.argv = ['main.py', '--headless', '-s', 'samples/memory_set/prg.bf']; "
+                  "import main; main.main(); print('pygame' in sys.modules)")
+        process = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True,
+                                 timeout=60)
+
+        assert process.stdout.splitlines()[-1] == "False"
+
+    def test_headless_checkpoint_resume(self, tmp_path):
+        path = str(tmp_path / "run.bfcp")
+        process = runMain("--headless", "-s", "samples/memory_set/prg.bf", "--max-steps", "10", "--checkpoint", path)
+        assert json.loads(process.stdout)["step_count"] == 10
+
+        process = runMain("--headless", "-s", "samples/memory_set/prg.bf", "--checkpoint", path, "--resume")
+        result = json.loads(process.stdout)
+        assert result["state"] == "Halted"
+        assert result["step_count"] == 48
+
+    def test_headless_input_file(self, tmp_path):
+        (tmp_path / "prg.bf").write_text(",>,[-<+>]<.")
+        (tmp_path / "input.txt").write_text("3, 4\n")
+        process = runMain("--headless", "-s", str(tmp_path / "prg.bf"), "-i", str(tmp_path / "input.txt"))
+
+        result = json.loads(process.stdout)
+        assert result["state"] == "Halted"
+        assert result["output"] == [7]
+
+    def test_analyze(self, tmp_path):
+        (tmp_path / "prg.bf").write_text(">>>>>>>>>+[<]")
+        process = runMain("--analyze", "-s", str(tmp_path / "prg.bf"))
+
+        assert process.returncode == 0
+        report = json.loads(process.stdout)
+        assert report["cell_count"] == 10
+        assert report["low"] is None
+        assert [loop["start"] for loop in report["unbalanced_loops"]] == [10]
+        assert "Set 'cell_count' to at least 10" in process.stderr
+
+    def test_headless_detect_loops(self, tmp_path):
+        (tmp_path / "prg.bf").write_text("+[>+[-]<]")
+        process = runMain("--headless", "--detect-loops", "-s", str(tmp_path / "prg.bf"))
+
+        assert process.returncode == 1
+        assert json.loads(process.stdout)["state"] == "InfiniteLoop"
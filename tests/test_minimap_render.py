@@ -0,0 +1,96 @@
+import numpy as np
+import pygame as pg
+import pytest
+import src.rendering_contants as rc
+
+from src.bf import BFInterpreter
+from src.bf_driver import BFSnapshot
+from src.minimap_render import MinimapRenderer
+
+
+# Groups tests for drawing the whole memory as one strip
+class TestMinimapRenderer:
+
+    rect = pg.Rect(10, 14, 100, 30)
+
+    def createMinimap(self, memory_size: int, reduction: str = "max", grow_memory: bool = False) -> tuple:
+        if not pg.get_init():
+            pg.init()
+        interpreter = BFInterpreter(memory_size, 100, grow_memory=grow_memory)
+        interpreter.setMemory([(i * 7) % 101 for i in range(0, min(memory_size, 5000))])
+        return interpreter, MinimapRenderer(BFSnapshot(interpreter, False, 0, False), 100, reduction=reduction)
+
+    def refresh(self, minimap: MinimapRenderer, interpreter: BFInterpreter) -> list:
+        minimap.interpreter = BFSnapshot(interpreter, False, 0, False)
+        return minimap.update(self.rect)
+
+    def test_bars(self):
+        interpreter, minimap = self.createMinimap(50)
+        interpreter.setMemory([0, 100, 50])
+        minimap.interpreter = BFSnapshot(interpreter, False, 0, False)
+        minimap.update(self.rect)
+
+        # One column per cell when they fit, filled from the bottom in proportion to the value
+        assert minimap.overview.bucket == 1
+        pixels = pg.surfarray.array2d(minimap.surface)
+        white = minimap.surface.map_rgb(rc.CLR_WHITE)
+        assert list((pixels[:3] == white).sum(axis=1)) == [0, 30, 15]
+        assert pixels[1, 29] == white and pixels[2, 14] != white
+
+    def test_incremental_columns(self):
+        interpreter, minimap = self.createMinimap(1000)
+        assert minimap.update(self.rect)[0] == self.rect
+        assert self.refresh(minimap, interpreter) == []
+
+        # Only the columns whose value changed are painted again, and sent as one rect
+        interpreter.memory[40] = 100
+        interpreter.memory[200] = 99
+        dirty = self.refresh(minimap, interpreter)
+        assert dirty == [minimap.columnRect(self.rect, 4).union(minimap.columnRect(self.rect, 20))]
+        assert minimap.overview.columns[4] == 100 and minimap.overview.columns[20] == 99
+
+    def test_matches_full_rebuild(self):
+        interpreter, minimap = self.createMinimap(1000, "mean")
+        minimap.update(self.rect)
+        for change in range(0, 20):
+            interpreter.memory[(change * 97) % 1000] = (change * 13) % 101
+            self.refresh(minimap, interpreter)
+
+        fresh = MinimapRenderer(BFSnapshot(interpreter, False, 0, False), 100, reduction="mean")
+        fresh.update(self.rect)
+        assert np.array_equal(minimap.overview.columns, fresh.overview.columns)
+        assert np.array_equal(pg.surfarray.array2d(minimap.surface), pg.surfarray.array2d(fresh.surface))
+
+    def test_pointer_marker(self):
+        interpreter, minimap = self.createMinimap(1000)
+        minimap.update(self.rect)
+
+        # Moving the pointer redraws the marker where it was and where it is
+        interpreter.ptr = 500
+        assert self.refresh(minimap, interpreter) == [minimap.markerRect(self.rect, 0),
+                                                      minimap.markerRect(self.rect, 500)]
+        assert minimap.markerRect(self.rect, 500).centerx == self.rect.centerx
+
+        screen = pg.Surface((200, 60))
+        minimap.draw(screen, self.rect)
+        assert screen.get_at((self.rect.centerx, self.rect.top - 2))[:3] == rc.CLR_RED
+
+    def test_cell_at(self):
+        interpreter, minimap = self.createMinimap(1000)
+        minimap.update(self.rect)
+        assert minimap.cellAt(self.rect, self.rect.left) == 0
+        assert minimap.cellAt(self.rect, self.rect.centerx) == 500
+        assert minimap.cellAt(self.rect, self.rect.right + 50) == 999
+        assert minimap.cellAt(self.rect, 0) == 0
+
+    def test_grown_memory(self):
+        interpreter, minimap = self.createMinimap(1000, grow_memory=True)
+        minimap.update(self.rect)
+
+        # Memory that grows past the cells the strip covers rebuilds it with twice the cells
+        interpreter.memory.grow(1500)
+        interpreter.ptr = 1499
+        assert self.refresh(minimap, interpreter)[0] == self.rect
+        assert minimap.surface.get_width() == 100 and minimap.overview.capacity == 2000
+        assert minimap.markerRect(self.rect, 1499).centerx == self.rect.left + 74
+        assert minimap.cellAt(self.rect, self.rect.right) == 1499